@@ -0,0 +1,30 @@
+from typing import Iterable
+from sqlalchemy import exists
+from sqlmodel import Session, select, func, delete
+from models import Review, ReviewAspect
+
+
+def set_review_aspects(session: Session, review_id: int, aspects: Iterable[str]):
+    # Replace the association rows for one review; Review.aspects keeps the JSON copy for the API
+    session.exec(delete(ReviewAspect).where(ReviewAspect.review_id == review_id))
+    for aspect in sorted({a for a in aspects if a}):
+        session.add(ReviewAspect(review_id=review_id, aspect=aspect))
+
+
+def filter_by_aspect(query, aspect: str, paged: bool = False):
+    if paged:
+        # Ordered pages: probe the (review_id, aspect) key per review while walking the sort index,
+        # so a page stops after `limit` hits instead of sorting every review with the aspect.
+        # Aspects are a few broad categories, so the probes per page stay few.
+        return query.where(exists().where(ReviewAspect.review_id == Review.id, ReviewAspect.aspect == aspect))
+    # Primary key (review_id, aspect) guarantees at most one joined row per review
+    return query.join(ReviewAspect, ReviewAspect.review_id == Review.id).where(ReviewAspect.aspect == aspect)
+
+
+def aspect_count_query():
+    # Unfiltered this is a grouped scan of ix_review_aspect_aspect_review_id alone
+    return (
+        select(ReviewAspect.aspect, func.count(ReviewAspect.review_id))
+        .group_by(ReviewAspect.aspect)
+        .order_by(func.count(ReviewAspect.review_id).desc(), ReviewAspect.aspect)
+    )
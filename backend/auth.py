@@ -1,39 +1,112 @@
+import asyncio
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Dict, Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlmodel import Session, select
+from sqlalchemy import event
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from database import get_session
 from models import Admin
+import cluster
 
 # Secret key for JWT (should be in env, using hardcoded for demo simplicity if not found)
 import os
 SECRET_KEY = os.getenv("SECRET_KEY", "supersecretkey")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+# EventSource cannot send headers, so the stream takes a token in its URL: a short-lived one
+# that opens /analytics/stream and nothing else, never the login token
+STREAM_TOKEN_EXPIRE_SECONDS = int(os.getenv("STREAM_TOKEN_EXPIRE_SECONDS", "60"))
+STREAM_SCOPE = "stream"
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("AUTH_PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+PRINCIPAL_CACHE_MAX_ITEMS = 4096
+# bcrypt is deliberately slow: cap how many hashes run at once, off the event loop
+HASH_CONCURRENCY = int(os.getenv("AUTH_HASH_CONCURRENCY", "2"))
 
 pwd_context = CryptContext(schemes=["bcrypt", "sha256_crypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token")
 
+_hash_executor = ThreadPoolExecutor(max_workers=HASH_CONCURRENCY, thread_name_prefix="password-hash")
+
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
 
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+async def verify_and_update_password(plain_password, hashed_password) -> Tuple[bool, Optional[str]]:
+    """(valid, new hash or None); a new hash is returned when the stored one uses a deprecated scheme."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_hash_executor, pwd_context.verify_and_update, plain_password, hashed_password)
+
+async def hash_password(password) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_hash_executor, pwd_context.hash, password)
+
+# Principal cache: token id -> (expires at, Admin), so authenticated requests skip the DB
+_principals: Dict[str, Tuple[float, Admin]] = {}
+
+def cache_principal(key: str, user: Admin, token_exp: Optional[float]):
+    expires_at = time.time() + PRINCIPAL_CACHE_TTL_SECONDS
+    if token_exp is not None:
+        expires_at = min(expires_at, token_exp)
+    if len(_principals) >= PRINCIPAL_CACHE_MAX_ITEMS:
+        now = time.time()
+        for stale_key in [k for k, (exp, _) in _principals.items() if exp <= now]:
+            del _principals[stale_key]
+        if len(_principals) >= PRINCIPAL_CACHE_MAX_ITEMS:
+            _principals.clear()
+    _principals[key] = (expires_at, user)
+
+def cached_principal(key: str) -> Optional[Admin]:
+    entry = _principals.get(key)
+    if entry is None:
+        return None
+    if entry[0] <= time.time():
+        _principals.pop(key, None)
+        return None
+    return entry[1]
+
+def invalidate_principals(admin_id: Optional[int] = None):
+    """Drop cached principals for one admin (or all of them)."""
+    if admin_id is None:
+        _principals.clear()
+        return
+    for key in [k for k, (_, user) in _principals.items() if user.id == admin_id]:
+        _principals.pop(key, None)
+
+@event.listens_for(Admin, "after_update")
+@event.listens_for(Admin, "after_delete")
+def _admin_changed(mapper, connection, target):
+    # Keyed by id: a rename must also drop entries cached under the old username
+    invalidate_principals(target.id)
+    cluster.bus.publish("auth.invalidate", target.id)
+
+cluster.bus.subscribe("auth.invalidate", invalidate_principals)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: str = Depends(oauth2_scheme), session: Session = Depends(get_session)):
+def create_stream_token(user: Admin) -> str:
+    return create_access_token(
+        data={"sub": user.username, "scope": STREAM_SCOPE}, expires_delta=timedelta(seconds=STREAM_TOKEN_EXPIRE_SECONDS)
+    )
+
+async def _authenticate(token: str, session: AsyncSession, scope: Optional[str]) -> Admin:
+    # Login tokens carry no scope; a scoped token is only accepted where that scope is asked for
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -42,13 +115,26 @@ async def get_current_user(token: str = Depends(oauth2_scheme), session: Session
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
-        if username is None:
+        if username is None or payload.get("scope") != scope:
             raise credentials_exception
     except JWTError:
         raise credentials_exception
-    
+
+    # Tokens issued before jti was added fall back to the subject
+    cache_key = payload.get("jti") or f"sub:{username}"
+    user = cached_principal(cache_key)
+    if user is not None and user.username == username:
+        return user
+
     statement = select(Admin).where(Admin.username == username)
-    user = session.exec(statement).first()
+    user = (await session.exec(statement)).first()
     if user is None:
         raise credentials_exception
+    cache_principal(cache_key, user, payload.get("exp"))
     return user
+
+async def get_current_user(token: str = Depends(oauth2_scheme), session: AsyncSession = Depends(get_session)):
+    return await _authenticate(token, session, scope=None)
+
+async def get_current_user_from_query(token: str = Query(..., description="Stream token from POST /auth/stream-token; EventSource cannot send headers"), session: AsyncSession = Depends(get_session)):
+    return await _authenticate(token, session, scope=STREAM_SCOPE)
@@ -0,0 +1,153 @@
+import argparse
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime
+
+from dotenv import load_dotenv
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+load_dotenv()
+
+from sqlmodel import Session, select, or_
+from database import engine
+from migrate import check_schema
+from models import Review, EnrichmentJob
+import llm_service
+from llm_client import llm_client
+import enrichment
+
+# Summaries written by the seed scripts or by failed LLM calls: rows carrying them are stale
+PLACEHOLDER_SUMMARIES = (
+    "Seeded review summary.",
+    llm_service.MISSING_KEY_RESULT["summary"],
+    llm_service.ERROR_RESULT["summary"],
+)
+
+
+class RateLimiter:
+    """Spaces request starts so at most `per_minute` LLM calls begin per minute."""
+    def __init__(self, per_minute: float):
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+def needs_enrichment_clause():
+    return or_(
+        Review.summary.is_(None),
+        Review.summary.in_(PLACEHOLDER_SUMMARIES),
+        Review.sentiment.is_(None),
+        Review.enrichment_status == "failed",
+    )
+
+
+def fetch_chunk(session: Session, after_id: int, chunk_size: int):
+    # Keyset walk in id order: each chunk is an index range scan, never an OFFSET
+    query = (
+        select(Review.id, Review.rating, Review.content)
+        .where(Review.id > after_id)
+        .where(needs_enrichment_clause())
+        .where(or_(Review.enrichment_status.is_(None), Review.enrichment_status.not_in(("pending", "processing"))))
+        .order_by(Review.id)
+        .limit(chunk_size)
+    )
+    return session.exec(query).all()
+
+
+def save_results(results, errors):
+    with Session(engine) as session:
+        for review_id, result in results.items():
+            review = session.get(Review, review_id)
+            if review is None:
+                continue
+            job = session.exec(select(EnrichmentJob).where(EnrichmentJob.review_id == review_id)).first()
+            enrichment.apply_result(session, review, result, job is not None and job.keep_labels)
+            review.enrichment_status = "done"
+            session.add(review)
+
+            if job is not None:
+                job.status = "done"
+                job.last_error = None
+                job.updated_at = datetime.utcnow()
+                session.add(job)
+
+        for review_id in errors:
+            review = session.get(Review, review_id)
+            if review is not None and review.enrichment_status != "done":
+                review.enrichment_status = "failed"
+                session.add(review)
+        session.commit()
+
+
+async def backfill(chunk_size: int, token_budget: int, concurrency: int, per_minute: float, limit: int = None, dry_run: bool = False):
+    if not llm_service.API_KEY and not dry_run:
+        print("❌ GROQ_API_KEY not found. Set it in backend/.env before running a backfill.")
+        return
+
+    limiter = RateLimiter(per_minute)
+    after_id = 0
+    processed = enriched = failed = 0
+    calls = 0
+    started = time.monotonic()
+
+    async def counted_wait():
+        nonlocal calls
+        calls += 1
+        await limiter.wait()
+
+    while limit is None or processed < limit:
+        size = chunk_size if limit is None else min(chunk_size, limit - processed)
+        with Session(engine) as session:
+            rows = fetch_chunk(session, after_id, size)
+        if not rows:
+            break
+        after_id = rows[-1][0]
+        processed += len(rows)
+
+        if dry_run:
+            batches = llm_service.pack_batches(list(rows), token_budget)
+            print(f"Chunk ending at id {after_id}: {len(rows)} reviews -> {len(batches)} LLM calls")
+            continue
+
+        results, errors = await llm_service.enrich_reviews_batch(
+            list(rows), token_budget=token_budget, max_concurrency=concurrency, before_call=counted_wait
+        )
+        save_results(results, errors)
+        enriched += len(results)
+        failed += len(errors)
+
+        elapsed = time.monotonic() - started
+        print(f"Up to id {after_id}: {enriched} enriched, {failed} failed, {calls} LLM calls, {elapsed:.1f}s")
+
+    print(f"✅ Backfill finished: {processed} reviews scanned, {enriched} enriched, {failed} failed, {calls} LLM calls")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Enrich unenriched or stale reviews in bulk with batched LLM calls.")
+    parser.add_argument("--chunk-size", type=int, default=200, help="Reviews read from the DB per chunk")
+    parser.add_argument("--batch-tokens", type=int, default=llm_service.BATCH_TOKEN_BUDGET, help="Token budget per LLM request")
+    parser.add_argument("--concurrency", type=int, default=4, help="Max LLM requests in flight")
+    parser.add_argument("--rpm", type=float, default=30, help="Max LLM requests started per minute (0 = unlimited)")
+    parser.add_argument("--limit", type=int, default=None, help="Stop after this many reviews")
+    parser.add_argument("--dry-run", action="store_true", help="Only report how many reviews/calls would be made")
+    args = parser.parse_args()
+
+    check_schema()
+
+    async def main():
+        try:
+            await backfill(args.chunk_size, args.batch_tokens, args.concurrency, args.rpm, args.limit, args.dry_run)
+        finally:
+            await llm_client.close()
+
+    asyncio.run(main())
@@ -0,0 +1,124 @@
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+# OpenAI-compatible stand-in for Groq: answers every prompt llm_service sends with
+# well-formed, deterministic content after a configurable delay.
+# Point the app at it with GROQ_BASE_URL=http://127.0.0.1:<port> and any GROQ_API_KEY.
+
+RATING_RE = re.compile(r"rating (\d)/5")
+BATCH_ITEM_RE = re.compile(r'\{"id": (\d+), "rating": (\d)')
+ASPECT_WORDS = {"Food": ("food", "pasta", "steak", "salad", "dessert", "menu"),
+                "Service": ("staff", "waiter", "server", "service", "host", "manager"),
+                "Time": ("wait", "quickly", "hour", "seated"),
+                "Price": ("price", "expensive", "value", "charge"),
+                "Ambience": ("loud", "cozy", "terrace", "music", "lighting", "cramped")}
+
+
+class FakeLLMConfig:
+    def __init__(self, latency_ms: float = 300, jitter_ms: float = 100, error_rate: float = 0.0,
+                 rate_limit_rate: float = 0.0, seed: int = 42):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.rng = random.Random(seed)
+        self.requests = 0
+        self.failures = 0
+
+
+def sentiment_for(rating: int) -> str:
+    return "Positive" if rating >= 4 else "Neutral" if rating == 3 else "Negative"
+
+
+def aspects_in(text: str):
+    text = text.lower()
+    return [aspect for aspect, words in ASPECT_WORDS.items() if any(word in text for word in words)]
+
+
+def enrichment(rating: int, text: str = "") -> dict:
+    sentiment = sentiment_for(rating)
+    return {
+        "summary": f"Customer left a {sentiment.lower()} {rating}-star review.",
+        "suggestedAction": "Follow up with the customer" if rating <= 3 else "Thank the customer",
+        "response": "Thank you for your feedback!",
+        "sentiment": sentiment,
+        "aspects": aspects_in(text),
+    }
+
+
+def answer(prompt: str, json_mode: bool) -> str:
+    """Content for one chat completion, shaped like the prompt in llm_service that produced it."""
+    if not json_mode:
+        # Weekly insight: plain text
+        return "This week customers complained mostly about wait times, while praise for the food held steady."
+    if '{"results": [...]}' in prompt:
+        return json.dumps({"results": [{"id": int(i), **enrichment(int(r))} for i, r in BATCH_ITEM_RE.findall(prompt)]})
+    if "Provide a JSON with" in prompt:
+        return json.dumps({"summary": "Steady month with mostly positive feedback.",
+                           "complaints": "Slow service at peak hours.",
+                           "highlights": "Food quality and friendly staff.",
+                           "actions": "Add staff on weekend evenings."})
+    match = RATING_RE.search(prompt)
+    return json.dumps(enrichment(int(match.group(1)) if match else 3, prompt))
+
+
+def create_app(config: FakeLLMConfig) -> FastAPI:
+    app = FastAPI(title="Fake LLM")
+
+    @app.post("/chat/completions")
+    async def chat_completions(request: Request):
+        config.requests += 1
+        payload = await request.json()
+        delay = max(0.0, config.latency_ms + config.rng.uniform(-config.jitter_ms, config.jitter_ms)) / 1000
+        await asyncio.sleep(delay)
+
+        roll = config.rng.random()
+        if roll < config.rate_limit_rate:
+            config.failures += 1
+            return JSONResponse({"error": {"message": "rate limited"}}, status_code=429, headers={"Retry-After": "1"})
+        if roll < config.rate_limit_rate + config.error_rate:
+            config.failures += 1
+            return JSONResponse({"error": {"message": "upstream error"}}, status_code=503)
+
+        prompt = "\n".join(message.get("content", "") for message in payload.get("messages", []))
+        json_mode = (payload.get("response_format") or {}).get("type") == "json_object"
+        content = answer(prompt, json_mode)
+        return {
+            "id": f"fake-{config.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": payload.get("model", "fake"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4,
+                      "total_tokens": (len(prompt) + len(content)) // 4},
+        }
+
+    @app.get("/stats")
+    async def stats():
+        return {"requests": config.requests, "failures": config.failures}
+
+    return app
+
+
+if __name__ == "__main__":
+    # Usage: python benchmarks/fake_llm.py --port 9100 --latency-ms 300 --error-rate 0.05
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve a fake OpenAI-compatible chat completions API.")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency-ms", type=float, default=300)
+    parser.add_argument("--jitter-ms", type=float, default=100)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with HTTP 503")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Share answered with HTTP 429")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    config = FakeLLMConfig(args.latency_ms, args.jitter_ms, args.error_rate, args.rate_limit_rate, args.seed)
+    uvicorn.run(create_app(config), host="127.0.0.1", port=args.port, log_level="warning")
@@ -0,0 +1,206 @@
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+SCALES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000, "10m": 10_000_000}
+
+# J-shaped like real review sites: mostly 5s, a bump of angry 1s, few 2s and 3s
+RATING_WEIGHTS = [0.14, 0.07, 0.10, 0.23, 0.46]
+SENTIMENT_BY_RATING = {
+    1: [("Negative", 0.95), ("Neutral", 0.05)],
+    2: [("Negative", 0.80), ("Neutral", 0.20)],
+    3: [("Neutral", 0.60), ("Negative", 0.25), ("Positive", 0.15)],
+    4: [("Positive", 0.85), ("Neutral", 0.15)],
+    5: [("Positive", 0.97), ("Neutral", 0.03)],
+}
+# (aspect, share of reviews that mention it)
+ASPECTS = [("Food", 0.55), ("Service", 0.45), ("Time", 0.22), ("Price", 0.18), ("Ambience", 0.15)]
+
+PHRASES = {
+    "Food": {
+        "good": ["The food was excellent and came out hot", "Best pasta I have had in a long time",
+                 "Portions were generous and everything tasted fresh", "The dessert alone is worth the trip"],
+        "bad": ["The food arrived cold and bland", "My steak was overcooked and dry",
+                "Half the menu was unavailable", "The salad looked like it had been sitting out for hours"],
+    },
+    "Service": {
+        "good": ["Our waiter was friendly and attentive", "Staff went out of their way to help us",
+                 "The manager checked on every table", "Service was warm without being pushy"],
+        "bad": ["The staff ignored us for twenty minutes", "Our server was rude when we asked for the bill",
+                "Nobody came to refill our water", "The host lost our reservation"],
+    },
+    "Time": {
+        "good": ["We were seated right away", "Food came out quickly even on a busy night"],
+        "bad": ["We waited over an hour for our mains", "The wait for a table was far longer than quoted"],
+    },
+    "Price": {
+        "good": ["Great value for the quality", "Prices are fair for the portion sizes"],
+        "bad": ["Way too expensive for what you get", "They added a service charge we were not told about"],
+    },
+    "Ambience": {
+        "good": ["The place is cozy with nice lighting", "Lovely terrace and relaxed music"],
+        "bad": ["It was so loud we could not talk", "The dining room felt cramped and dirty"],
+    },
+}
+FILLER = ["We came here for a birthday dinner", "I have been here a few times now", "Came with a group of friends",
+          "Stopped by after work", "It was a Saturday night", "We ordered a bit of everything",
+          "Would probably come back", "Overall a mixed experience", "Not sure what else to say"]
+ACTIONS = {"Positive": ["Thank the customer and share with staff", "Feature this review on social media"],
+           "Neutral": ["Follow up to learn what could improve", "Review consistency with the kitchen"],
+           "Negative": ["Contact the customer to resolve the issue", "Retrain staff on the reported problem"]}
+
+
+def parse_scale(value: str) -> int:
+    value = value.lower()
+    return SCALES[value] if value in SCALES else int(value.replace("_", ""))
+
+
+def pick(rng: random.Random, weighted):
+    r = rng.random()
+    for value, weight in weighted:
+        r -= weight
+        if r <= 0:
+            return value
+    return weighted[-1][0]
+
+
+def month_weights(month_starts: List[datetime], growth: float) -> List[float]:
+    # Volume grows towards the present, with a holiday bump every December
+    weights = [growth ** i * (1.6 if start.month == 12 else 1.0) for i, start in enumerate(month_starts)]
+    total = sum(weights)
+    return [w / total for w in weights]
+
+
+class ReviewGenerator:
+    """Deterministic synthetic reviews: same seed, count and end date, same corpus."""
+
+    def __init__(self, seed: int = 42, months: int = 24, growth: float = 1.08, enriched: float = 0.8,
+                 end: Optional[datetime] = None):
+        self.rng = random.Random(seed)
+        self.enriched = enriched
+        today = (end or datetime.utcnow()).replace(hour=0, minute=0, second=0, microsecond=0)
+        first = today.replace(day=1)
+        for _ in range(months - 1):
+            first = (first - timedelta(days=1)).replace(day=1)
+        self.month_starts = []
+        start = first
+        for _ in range(months):
+            self.month_starts.append(start)
+            start = (start + timedelta(days=32)).replace(day=1)
+        self.today = today
+        self.cumulative = []
+        acc = 0.0
+        for w in month_weights(self.month_starts, growth):
+            acc += w
+            self.cumulative.append(acc)
+
+    def created_at(self) -> datetime:
+        rng = self.rng
+        r = rng.random()
+        index = next((i for i, c in enumerate(self.cumulative) if r <= c), len(self.cumulative) - 1)
+        start = self.month_starts[index]
+        end = self.month_starts[index + 1] if index + 1 < len(self.month_starts) else self.today + timedelta(days=1)
+        while True:
+            day = start + timedelta(days=rng.randrange(max((end - start).days, 1)))
+            # Weekends get about 1.5x the reviews of weekdays
+            if day.weekday() >= 5 or rng.random() < 0.67:
+                break
+        hour = min(max(int(rng.gauss(19, 3)), 0), 23)
+        return day + timedelta(hours=hour, minutes=rng.randrange(60), seconds=rng.randrange(60))
+
+    def review(self) -> Dict[str, Any]:
+        rng = self.rng
+        rating = rng.choices(range(1, 6), RATING_WEIGHTS)[0]
+        tone = "good" if rating >= 4 else "bad" if rating <= 2 else rng.choice(("good", "bad"))
+        mentioned = [aspect for aspect, share in ASPECTS if rng.random() < share]
+
+        # Log-normal length: most reviews are a few sentences, a long tail runs to paragraphs
+        sentences = max(1, min(40, int(rng.lognormvariate(1.1, 0.7))))
+        parts = [rng.choice(PHRASES[aspect][tone]) for aspect in mentioned]
+        while len(parts) < sentences:
+            parts.append(rng.choice(FILLER))
+        rng.shuffle(parts)
+        content = ". ".join(parts[:max(sentences, len(mentioned))]) + "."
+
+        row = {"rating": rating, "content": content, "createdAt": self.created_at(),
+               "summary": None, "suggestedAction": None, "response": None, "sentiment": None, "aspects": None}
+        if rng.random() < self.enriched:
+            sentiment = pick(rng, SENTIMENT_BY_RATING[rating])
+            row.update(
+                sentiment=sentiment,
+                aspects=json.dumps(mentioned),
+                summary=" ".join(content.split()[:15]),
+                suggestedAction=rng.choice(ACTIONS[sentiment]),
+                response="Thank you for your feedback, we appreciate you taking the time to write.",
+            )
+        return row
+
+    def reviews(self, count: int) -> Iterator[Dict[str, Any]]:
+        for _ in range(count):
+            yield self.review()
+
+
+def generate(workdir: str, count: int, seed: int, months: int, enriched: float, batch_size: int,
+             end: Optional[datetime] = None):
+    """Build workdir/reviews.db through the same insert path as bulk imports (rollups, aspects, FTS)."""
+    os.makedirs(workdir, exist_ok=True)
+    os.chdir(workdir) # database.py opens reviews.db relative to the working directory
+
+    from sqlmodel import Session
+    from database import engine
+    import ingest
+    import migrate
+
+    engine.echo = False
+    migrate.upgrade() # a new corpus database: create the schema, the same step as `python migrate.py`
+
+    generator = ReviewGenerator(seed=seed, months=months, enriched=enriched, end=end)
+    started = time.monotonic()
+    inserted = 0
+    batch: List[Dict[str, Any]] = []
+    with Session(engine) as session:
+        for row in generator.reviews(count):
+            batch.append(row)
+            if len(batch) == batch_size:
+                inserted += ingest.insert_batch(session, batch, enrich="backfill")
+                session.commit()
+                batch = []
+                if inserted % (batch_size * 50) == 0:
+                    elapsed = time.monotonic() - started
+                    print(f"{inserted}/{count} rows, {inserted / max(elapsed, 1e-6):.0f} rows/s")
+        if batch:
+            inserted += ingest.insert_batch(session, batch, enrich="backfill")
+            session.commit()
+    print(f"✅ Generated {inserted} reviews in {os.path.join(workdir, 'reviews.db')} ({time.monotonic() - started:.1f}s)")
+
+
+def default_workdir(scale: str) -> str:
+    return os.path.join(BACKEND_DIR, "benchmarks", "data", scale.lower())
+
+
+if __name__ == "__main__":
+    # Usage: python benchmarks/generate.py --scale 100k
+    parser = argparse.ArgumentParser(description="Generate a synthetic review database for benchmarks.")
+    parser.add_argument("--scale", default="10k", help=f"One of {', '.join(SCALES)} or a row count")
+    parser.add_argument("--workdir", default=None, help="Directory for reviews.db (default benchmarks/data/<scale>)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--months", type=int, default=24, help="History length; recent months get more reviews")
+    parser.add_argument("--enriched", type=float, default=0.8, help="Share of reviews that already have AI fields")
+    parser.add_argument("--end", type=lambda v: datetime.strptime(v, "%Y-%m-%d"), default=None,
+                        help="Last day of the history (YYYY-MM-DD, default today); fix it to compare runs across days")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    workdir = os.path.abspath(args.workdir or default_workdir(args.scale))
+    if os.path.exists(os.path.join(workdir, "reviews.db")):
+        print(f"❌ {workdir}/reviews.db already exists; delete it to regenerate")
+        sys.exit(1)
+    generate(workdir, parse_scale(args.scale), args.seed, args.months, args.enriched, args.batch_size, args.end)
@@ -0,0 +1,349 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_DIR = os.path.join(BACKEND_DIR, "benchmarks")
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+sys.path.append(BENCH_DIR)
+
+from generate import default_workdir, parse_scale
+
+SENTIMENTS = ["Positive", "Neutral", "Negative"]
+ASPECTS = ["Food", "Service", "Time", "Price", "Ambience"]
+RSS_SAMPLE_SECONDS = 0.05
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def git_commit() -> Dict[str, Any]:
+    def git(*args):
+        return subprocess.run(["git", *args], cwd=BACKEND_DIR, capture_output=True, text=True).stdout.strip()
+    return {"commit": git("rev-parse", "--short", "HEAD") or None, "dirty": bool(git("status", "--porcelain", "--", "."))}
+
+
+def percentile(sorted_values: List[float], q: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(q / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+# --- Peak RSS of the server process tree (Linux /proc) ---
+
+def _children(pid: int) -> List[int]:
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return [int(child) for child in f.read().split()]
+    except OSError:
+        return []
+
+
+def tree_rss_bytes(pid: int) -> Optional[int]:
+    """RSS of a process plus its descendants (report render workers included); None off Linux."""
+    total, stack, seen = 0, [pid], False
+    while stack:
+        current = stack.pop()
+        try:
+            with open(f"/proc/{current}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1]) * 1024
+                        seen = True
+                        break
+        except OSError:
+            continue
+        stack.extend(_children(current))
+    return total if seen else None
+
+
+class RssSampler:
+    def __init__(self, pid: int):
+        self.pid = pid
+        self.peak: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        while True:
+            rss = tree_rss_bytes(self.pid)
+            if rss is not None and (self.peak is None or rss > self.peak):
+                self.peak = rss
+            await asyncio.sleep(RSS_SAMPLE_SECONDS)
+
+    def __enter__(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        return self
+
+    def __exit__(self, *exc):
+        self._task.cancel()
+
+
+# --- Scenarios: (name, build request from rng) ---
+
+def random_filters(rng: random.Random, months: List[str]) -> Dict[str, Any]:
+    params = {}
+    if rng.random() < 0.3:
+        params["min_rating"] = rng.randint(1, 5)
+    if rng.random() < 0.3:
+        params["month"] = rng.choice(months)
+    if rng.random() < 0.2:
+        params["sentiment"] = rng.choice(SENTIMENTS)
+    if rng.random() < 0.2:
+        params["aspect"] = rng.choice(ASPECTS)
+    if rng.random() < 0.1:
+        params["search"] = rng.choice(["food", "service", "wait", "expensive"])
+    return params
+
+
+def reviews_request(rng, months, counter):
+    return "GET", "/reviews/", {"params": {"cursor": "", "limit": 20, **random_filters(rng, months)}}
+
+
+def dashboard_request(rng, months, counter):
+    return "GET", "/analytics/dashboard", {"params": random_filters(rng, months)}
+
+
+def report_request(rng, months, counter):
+    params = {"min_rating": rng.randint(1, 5)} if rng.random() < 0.3 else {}
+    return "GET", f"/analytics/report/{rng.choice(months)}", {"params": params}
+
+
+def create_request(rng, months, counter):
+    body = {"rating": rng.randint(1, 5), "content": f"Benchmark review {counter}: the food was fine and the staff were quick."}
+    return "POST", "/reviews/", {"json": body}
+
+
+SCENARIOS = {
+    "GET /reviews/": reviews_request,
+    "GET /analytics/dashboard": dashboard_request,
+    "GET /analytics/report/{month}": report_request,
+    "POST /reviews/": create_request,
+}
+
+
+async def run_scenario(client: httpx.AsyncClient, name: str, build, requests: int, concurrency: int,
+                       months: List[str], seed: int, server_pid: int) -> Dict[str, Any]:
+    rng = random.Random(f"{seed}:{name}")
+    plan = [build(rng, months, i) for i in range(requests)]
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    queue = iter(plan)
+
+    async def worker():
+        for method, url, options in queue:
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, url, **options)
+                status = response.status_code
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies.append((time.perf_counter() - started) * 1000)
+            if not isinstance(status, int) or status >= 400:
+                errors[str(status)] = errors.get(str(status), 0) + 1
+
+    with RssSampler(server_pid) as sampler:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "errors": sum(errors.values()),
+        "error_codes": errors,
+        "p50_ms": round(percentile(latencies, 50), 2),
+        "p95_ms": round(percentile(latencies, 95), 2),
+        "p99_ms": round(percentile(latencies, 99), 2),
+        "max_ms": round(latencies[-1], 2),
+        "throughput_rps": round(requests / elapsed, 2),
+        "peak_rss_mb": round(sampler.peak / 2**20, 1) if sampler.peak else None,
+    }
+
+
+# --- Processes ---
+
+def start_process(args: List[str], cwd: str, env: Dict[str, str], log_path: str) -> subprocess.Popen:
+    log = open(log_path, "w")
+    return subprocess.Popen(args, cwd=cwd, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+
+def wait_for_http(url: str, process: subprocess.Popen, timeout: float = 300):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{url} exited with code {process.returncode} before becoming ready")
+        try:
+            httpx.get(url, timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} not ready after {timeout}s")
+
+
+def stop_process(process: subprocess.Popen):
+    if process.poll() is None:
+        process.terminate()
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def prepare_database(scale: str, template_dir: Optional[str], run_dir: str, seed: int) -> str:
+    # A fresh copy per run: POST scenarios write, and results should not depend on earlier runs
+    template_dir = os.path.abspath(template_dir or default_workdir(scale))
+    template = os.path.join(template_dir, "reviews.db")
+    if not os.path.exists(template):
+        print(f"Generating {scale} corpus in {template_dir} (one-time)...")
+        subprocess.run([sys.executable, os.path.join(BENCH_DIR, "generate.py"), "--scale", scale,
+                        "--workdir", template_dir, "--seed", str(seed)], check=True)
+    shutil.rmtree(run_dir, ignore_errors=True)
+    os.makedirs(run_dir)
+    shutil.copy(template, os.path.join(run_dir, "reviews.db"))
+    # Corpora generated by older code need the newer migrations before the app will start on them
+    subprocess.run([sys.executable, os.path.join(BACKEND_DIR, "migrate.py")], cwd=run_dir, check=True,
+                   env={**os.environ, "PYTHONPATH": BACKEND_DIR})
+    return run_dir
+
+
+def corpus_months(db_path: str) -> List[str]:
+    import sqlite3
+    with sqlite3.connect(db_path) as conn:
+        rows = conn.execute("SELECT DISTINCT bucket FROM review_rollup WHERE grain = 'month' ORDER BY bucket").fetchall()
+    return [row[0] for row in rows]
+
+
+async def run_benchmark(args) -> Dict[str, Any]:
+    run_dir = prepare_database(args.scale, args.data_dir, os.path.join(BENCH_DIR, "data", "run"), args.seed)
+    months = corpus_months(os.path.join(run_dir, "reviews.db"))
+
+    llm_port, app_port = free_port(), free_port()
+    env = {**os.environ, "PYTHONPATH": BACKEND_DIR, "GROQ_API_KEY": "benchmark",
+           "GROQ_BASE_URL": f"http://127.0.0.1:{llm_port}", "REPORTS_DIR": os.path.join(run_dir, "reports"),
+           "LLM_CACHE_PATH": os.path.join(run_dir, "llm_cache.db")}
+    fake_llm = start_process(
+        [sys.executable, os.path.join(BENCH_DIR, "fake_llm.py"), "--port", str(llm_port),
+         "--latency-ms", str(args.llm_latency_ms), "--jitter-ms", str(args.llm_jitter_ms),
+         "--error-rate", str(args.llm_error_rate), "--rate-limit-rate", str(args.llm_rate_limit_rate)],
+        run_dir, env, os.path.join(run_dir, "fake_llm.log"))
+    server = start_process(
+        [sys.executable, os.path.join(BACKEND_DIR, "serve.py"), "--port", str(app_port), "--workers", str(args.workers),
+         "--log-level", "warning", "--no-access-log"],
+        run_dir, env, os.path.join(run_dir, "server.log"))
+    try:
+        wait_for_http(f"http://127.0.0.1:{llm_port}/stats", fake_llm)
+        base_url = f"http://127.0.0.1:{app_port}"
+        wait_for_http(base_url + "/", server)
+        # Let startup work (report pre-rendering, insight refresh) settle first
+        await asyncio.sleep(args.warmup_seconds)
+
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+            token = (await client.post("/auth/token", data={"username": "admin", "password": "password123"})).json()["access_token"]
+            client.headers["Authorization"] = f"Bearer {token}"
+
+            endpoints = {}
+            for name, build in SCENARIOS.items():
+                if args.only and name not in args.only:
+                    continue
+                endpoints[name] = await run_scenario(
+                    client, name, build, args.requests, args.concurrency, months, args.seed, server.pid)
+                print(format_row(name, endpoints[name]))
+        llm_stats = httpx.get(f"http://127.0.0.1:{llm_port}/stats").json()
+    finally:
+        stop_process(server)
+        stop_process(fake_llm)
+
+    return {
+        **git_commit(),
+        "timestamp": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "scale": args.scale,
+        "rows": parse_scale(args.scale),
+        "config": {"requests": args.requests, "concurrency": args.concurrency, "workers": args.workers, "seed": args.seed,
+                   "llm_latency_ms": args.llm_latency_ms, "llm_jitter_ms": args.llm_jitter_ms,
+                   "llm_error_rate": args.llm_error_rate, "llm_rate_limit_rate": args.llm_rate_limit_rate},
+        "fake_llm": llm_stats,
+        "endpoints": endpoints,
+    }
+
+
+def format_row(name: str, stats: Dict[str, Any]) -> str:
+    rss = f"{stats['peak_rss_mb']:.0f}MB" if stats["peak_rss_mb"] else "n/a"
+    return (f"{name:32} p50 {stats['p50_ms']:8.1f}ms  p95 {stats['p95_ms']:8.1f}ms  p99 {stats['p99_ms']:8.1f}ms  "
+            f"{stats['throughput_rps']:8.1f} req/s  errors {stats['errors']:4}  rss {rss}")
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float) -> int:
+    """Print per-endpoint changes against a stored run; returns the number of regressions."""
+    print(f"\nCompared with {baseline.get('commit')} ({baseline.get('timestamp')}, scale {baseline.get('scale')}):")
+    regressions = 0
+    for name, stats in current["endpoints"].items():
+        old = baseline.get("endpoints", {}).get(name)
+        if not old:
+            continue
+        changes = []
+        for metric, higher_is_worse in (("p50_ms", True), ("p95_ms", True), ("p99_ms", True), ("throughput_rps", False)):
+            if not old.get(metric):
+                continue
+            delta = (stats[metric] - old[metric]) / old[metric]
+            worse = delta > threshold if higher_is_worse else delta < -threshold
+            regressions += worse
+            changes.append(f"{metric} {delta:+.0%}{' ⚠️' if worse else ''}")
+        print(f"  {name:32} {'  '.join(changes)}")
+    return regressions
+
+
+if __name__ == "__main__":
+    # Usage: python benchmarks/load.py --scale 100k [--requests 500] [--concurrency 16] [--compare results/<run>.json]
+    parser = argparse.ArgumentParser(description="Load-test the API against a synthetic corpus and a fake LLM.")
+    parser.add_argument("--scale", default="10k", help="Corpus size: 10k, 100k, 1m, 10m or a row count")
+    parser.add_argument("--data-dir", default=None, help="Directory holding the generated reviews.db template")
+    parser.add_argument("--requests", type=int, default=300, help="Requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=1, help="API worker processes (serve.py)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--only", action="append", choices=list(SCENARIOS), help="Run only these endpoints")
+    parser.add_argument("--warmup-seconds", type=float, default=5)
+    parser.add_argument("--llm-latency-ms", type=float, default=300)
+    parser.add_argument("--llm-jitter-ms", type=float, default=100)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--llm-rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--output", default=None, help="Result file (default benchmarks/results/<scale>-<commit>-<time>.json)")
+    parser.add_argument("--compare", default=None, help="Earlier result JSON to compare against")
+    parser.add_argument("--regression-threshold", type=float, default=0.10,
+                        help="Relative change counted as a regression (exit code 1 with --compare)")
+    args = parser.parse_args()
+
+    result = asyncio.run(run_benchmark(args))
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+    output = args.output or os.path.join(RESULTS_DIR, f"{args.scale}-{result['commit'] or 'nogit'}-{stamp}.json")
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"✅ Results written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), result, args.regression_threshold)
+        if regressions:
+            print(f"❌ {regressions} metrics regressed by more than {args.regression_threshold:.0%}")
+            sys.exit(1)
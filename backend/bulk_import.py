@@ -0,0 +1,46 @@
+import argparse
+import os
+import sys
+import time
+
+from dotenv import load_dotenv
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+load_dotenv()
+
+from sqlmodel import Session
+from database import engine
+from migrate import check_schema
+import ingest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream a CSV or NDJSON file of reviews into the database.")
+    parser.add_argument("path", help="CSV (header row required) or NDJSON file")
+    parser.add_argument("--format", choices=ingest.FORMATS, default=None, help="Defaults from the file extension")
+    parser.add_argument("--batch-size", type=int, default=ingest.BATCH_SIZE, help="Rows per insert transaction")
+    parser.add_argument("--enrich", choices=ingest.ENRICH_MODES, default="backfill",
+                        help="backfill: leave for `python backfill.py`; queue: enrichment jobs for the app workers; "
+                             "classify: local classifier, LLM jobs only for low-confidence rows")
+    args = parser.parse_args()
+
+    fmt = args.format or ("csv" if args.path.lower().endswith(".csv") else "ndjson")
+    engine.echo = False
+    check_schema()
+
+    started = time.monotonic()
+
+    def progress(report):
+        elapsed = time.monotonic() - started
+        print(f"{report.inserted} inserted, {report.failed} failed, {report.inserted / max(elapsed, 1e-6):.0f} rows/s")
+
+    with Session(engine) as session:
+        report = ingest.ingest_file(session, args.path, fmt, args.batch_size, args.enrich, progress=progress)
+
+    for error in report.errors[:20]:
+        print(f"  row {error['row']}: {error['error']}")
+    if report.failed > 20:
+        print(f"  ... and {report.failed - 20} more errors")
+    print(f"✅ Import finished: {report.inserted} inserted, {report.failed} failed in {time.monotonic() - started:.1f}s")
+    if args.enrich == "backfill" and report.inserted:
+        print("Run `python backfill.py` to generate AI summaries for the imported reviews.")
@@ -0,0 +1,464 @@
+import argparse
+import json
+import os
+import re
+import sys
+import time
+import zlib
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+MODEL_PATH = os.getenv("CLASSIFIER_PATH", "classifier.npz")
+# Below this confidence a prediction is only a placeholder until the LLM has looked at the review
+MIN_CONFIDENCE = float(os.getenv("CLASSIFIER_MIN_CONFIDENCE", "0.8"))
+
+HASH_BITS = 18
+N_FEATURES = 1 << HASH_BITS
+MIN_TRAINING_ROWS = 200
+MIN_ASPECT_EXAMPLES = 20
+TOKEN_CACHE_SIZE = 200_000
+
+# Same labels the enrichment prompt asks the LLM for
+SENTIMENT_CLASSES = ("Positive", "Neutral", "Negative")
+
+TOKEN_RE = re.compile(r"[a-z0-9']+")
+
+# Cold-start lexicon, used until a model has been trained from LLM-labelled reviews (and as its starting point)
+POSITIVE_WORDS = ("great", "excellent", "amazing", "delicious", "friendly", "love", "loved", "best", "perfect",
+                  "fantastic", "wonderful", "fresh", "attentive", "recommend", "cozy", "tasty", "awesome", "nice")
+NEGATIVE_WORDS = ("bad", "terrible", "awful", "rude", "cold", "bland", "worst", "dirty", "slow", "overpriced",
+                  "disappointing", "disappointed", "horrible", "never", "ignored", "overcooked", "expensive", "poor")
+ASPECT_KEYWORDS = {
+    "Food": ("food", "dish", "dishes", "meal", "pasta", "pizza", "steak", "salad", "dessert", "menu", "taste", "tasted"),
+    "Service": ("staff", "waiter", "waitress", "server", "service", "host", "manager", "rude", "friendly", "attentive"),
+    "Time": ("wait", "waited", "waiting", "slow", "quickly", "hour", "minutes", "seated", "late"),
+    "Price": ("price", "prices", "expensive", "cheap", "value", "charge", "overpriced", "bill", "cost"),
+    "Ambience": ("ambience", "atmosphere", "loud", "noisy", "cozy", "music", "lighting", "decor", "cramped", "terrace"),
+}
+RATING_PRIOR = {1: ("Negative", 3.0), 2: ("Negative", 2.0), 3: ("Neutral", 1.0), 4: ("Positive", 2.0), 5: ("Positive", 3.0)}
+
+
+BIGRAM_MULTIPLIER = 0x9E3779B1 # odd 32-bit constant; keeps (a, b) and (b, a) apart
+
+
+class _WordHashes(dict):
+    # crc32 is stable across processes (unlike hash()); each distinct word is hashed once
+    def __missing__(self, word: str) -> int:
+        if len(self) >= TOKEN_CACHE_SIZE:
+            self.clear()
+        value = self[word] = zlib.crc32(word.encode())
+        return value
+
+
+class FeatureHasher:
+    """
+    Unigrams, bigrams and the star rating hashed into N_FEATURES buckets.
+
+    Words are hashed one by one (memoized); bigram buckets are derived from the two word
+    hashes for the whole batch at once in NumPy instead of building bigram strings.
+    """
+
+    def __init__(self):
+        self._hashes = _WordHashes()
+
+    def bucket(self, token: str) -> int:
+        """Bucket of one feature: a word, a "word word" bigram or "__rating=N"."""
+        first, _, second = token.partition(" ")
+        if second:
+            return ((self._hashes[first] * BIGRAM_MULTIPLIER) ^ self._hashes[second]) & (N_FEATURES - 1)
+        return self._hashes[first] & (N_FEATURES - 1)
+
+    def transform(self, ratings: Sequence[int], texts: Sequence[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """CSR rows (indptr, indices, values): per review its rating, then unigrams, then bigrams."""
+        lookup = self._hashes.__getitem__
+        hashes: List[int] = []
+        word_counts = np.empty(len(ratings), dtype=np.int64)
+        for i, text in enumerate(texts):
+            words = TOKEN_RE.findall((text or "").lower())
+            hashes.extend(map(lookup, words))
+            word_counts[i] = len(words)
+        rating_hashes = np.fromiter((lookup(f"__rating={rating}") for rating in ratings), dtype=np.uint64, count=len(ratings))
+        words = np.asarray(hashes, dtype=np.uint64)
+
+        bigram_counts = np.maximum(word_counts - 1, 0)
+        indptr = np.zeros(len(ratings) + 1, dtype=np.int64)
+        np.cumsum(1 + word_counts + bigram_counts, out=indptr[1:])
+        indices = np.empty(indptr[-1], dtype=np.int64)
+        mask = np.uint64(N_FEATURES - 1)
+
+        indices[indptr[:-1]] = rating_hashes & mask
+        # Word j of review r sits at indptr[r] + 1 + j; its bigram with word j + 1 after the unigrams
+        row = np.repeat(np.arange(len(ratings)), word_counts)
+        word_start = np.cumsum(word_counts) - word_counts
+        local = np.arange(len(words)) - word_start[row]
+        indices[indptr[row] + 1 + local] = words & mask
+        has_next = local < word_counts[row] - 1
+        bigrams = ((words[:-1] * np.uint64(BIGRAM_MULTIPLIER)) ^ words[1:])[has_next[:-1]] & mask
+        first = np.flatnonzero(has_next)
+        indices[indptr[row[first]] + 1 + word_counts[row[first]] + local[first]] = bigrams
+        return indptr, indices, np.ones(len(indices), dtype=np.float32)
+
+
+hasher = FeatureHasher()
+
+
+def _softmax(logits: np.ndarray) -> np.ndarray:
+    shifted = np.exp(logits - logits.max(axis=1, keepdims=True))
+    return shifted / shifted.sum(axis=1, keepdims=True)
+
+
+def _sigmoid(logits: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-np.clip(logits, -30, 30)))
+
+
+class HashedLinearModel:
+    """
+    One weight row per output over hashed n-gram features: softmax over sentiments,
+    an independent sigmoid per aspect.
+    """
+
+    def __init__(self, sentiments: Sequence[str], aspects: Sequence[str], weights: np.ndarray, bias: np.ndarray,
+                 source: str = "lexicon", trained_rows: int = 0):
+        self.sentiments = tuple(sentiments)
+        self.aspects = tuple(aspects)
+        self.weights = weights # (outputs, N_FEATURES)
+        self.bias = bias
+        self.source = source
+        self.trained_rows = trained_rows
+
+    @property
+    def outputs(self) -> int:
+        return len(self.sentiments) + len(self.aspects)
+
+    def logits(self, indptr: np.ndarray, indices: np.ndarray, values: np.ndarray) -> np.ndarray:
+        starts = indptr[:-1]
+        out = np.empty((len(starts), self.outputs), dtype=np.float32)
+        for k in range(self.outputs):
+            out[:, k] = np.add.reduceat(self.weights[k][indices] * values, starts) + self.bias[k]
+        return out
+
+    def probabilities(self, features) -> Tuple[np.ndarray, np.ndarray]:
+        logits = self.logits(*features)
+        split = len(self.sentiments)
+        return _softmax(logits[:, :split]), _sigmoid(logits[:, split:])
+
+    def predict(self, ratings: Sequence[int], texts: Sequence[str]) -> List[Dict[str, Any]]:
+        """{"sentiment", "aspects", "confidence"} per review; confidence is the least certain of its decisions."""
+        if not len(ratings):
+            return []
+        sentiment_p, aspect_p = self.probabilities(hasher.transform(ratings, texts))
+        best = sentiment_p.argmax(axis=1)
+        confidence = sentiment_p.max(axis=1)
+        if aspect_p.shape[1]:
+            confidence = np.minimum(confidence, np.maximum(aspect_p, 1 - aspect_p).min(axis=1))
+        present = aspect_p >= 0.5
+        return [
+            {
+                "sentiment": self.sentiments[best[i]],
+                "aspects": [aspect for aspect, flag in zip(self.aspects, present[i]) if flag],
+                "confidence": round(float(confidence[i]), 4),
+            }
+            for i in range(len(best))
+        ]
+
+    def save(self, path: str):
+        tmp = f"{path}.tmp.npz"
+        np.savez_compressed(tmp, sentiments=np.array(self.sentiments), aspects=np.array(self.aspects),
+                            weights=self.weights, bias=self.bias, source=np.array(self.source),
+                            trained_rows=np.array(self.trained_rows))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "HashedLinearModel":
+        with np.load(path, allow_pickle=False) as data:
+            return cls([str(s) for s in data["sentiments"]], [str(a) for a in data["aspects"]],
+                       data["weights"].astype(np.float32), data["bias"].astype(np.float32),
+                       str(data["source"]), int(data["trained_rows"]))
+
+
+def lexicon_model(aspects: Sequence[str] = tuple(ASPECT_KEYWORDS)) -> HashedLinearModel:
+    """Hand-set weights: the star rating sets a sentiment prior, lexicon words nudge it, keywords flag aspects."""
+    sentiments = SENTIMENT_CLASSES
+    weights = np.zeros((len(sentiments) + len(aspects), N_FEATURES), dtype=np.float32)
+    bias = np.zeros(len(sentiments) + len(aspects), dtype=np.float32)
+    positive, negative = sentiments.index("Positive"), sentiments.index("Negative")
+    for rating, (sentiment, weight) in RATING_PRIOR.items():
+        weights[sentiments.index(sentiment), hasher.bucket(f"__rating={rating}")] = weight
+    for word in POSITIVE_WORDS:
+        weights[positive, hasher.bucket(word)] += 1.0
+    for word in NEGATIVE_WORDS:
+        weights[negative, hasher.bucket(word)] += 1.0
+        weights[positive, hasher.bucket(f"not {word}")] += 1.0
+    for offset, aspect in enumerate(aspects, start=len(sentiments)):
+        bias[offset] = -2.5
+        for word in ASPECT_KEYWORDS.get(aspect, ()):
+            weights[offset, hasher.bucket(word)] = 5.0
+    return HashedLinearModel(sentiments, aspects, weights, bias)
+
+
+# --- Training ---
+
+def train(ratings: Sequence[int], texts: Sequence[str], sentiments: Sequence[str], aspects: Sequence[List[str]],
+          epochs: int = 80, learning_rate: float = 0.05, l2: float = 1e-6) -> HashedLinearModel:
+    """
+    Full-batch Adam on softmax + sigmoid cross-entropy, warm-started from the lexicon weights.
+
+    Aspects seen fewer than MIN_ASPECT_EXAMPLES times are dropped: too rare to learn.
+    """
+    counts: Dict[str, int] = {}
+    for labels in aspects:
+        for aspect in set(labels):
+            counts[aspect] = counts.get(aspect, 0) + 1
+    aspect_names = sorted(aspect for aspect, count in counts.items() if count >= MIN_ASPECT_EXAMPLES)
+    model = lexicon_model(aspect_names)
+    split = len(model.sentiments)
+
+    indptr, indices, values = hasher.transform(ratings, texts)
+    n = len(ratings)
+    rows = np.repeat(np.arange(n), np.diff(indptr))
+    y_sentiment = np.zeros((n, split), dtype=np.float32)
+    y_sentiment[np.arange(n), [model.sentiments.index(s) for s in sentiments]] = 1.0
+    y_aspects = np.array([[aspect in labels for aspect in aspect_names] for labels in aspects],
+                         dtype=np.float32).reshape(n, len(aspect_names))
+
+    w, b = model.weights, model.bias
+    m_w, v_w = np.zeros_like(w), np.zeros_like(w)
+    m_b, v_b = np.zeros_like(b), np.zeros_like(b)
+    beta1, beta2, eps = 0.9, 0.999, 1e-8
+    for step in range(1, epochs + 1):
+        sentiment_p, aspect_p = model.probabilities((indptr, indices, values))
+        grad_logits = np.hstack([sentiment_p - y_sentiment, aspect_p - y_aspects]) / n
+        grad_w = np.empty_like(w)
+        for k in range(model.outputs):
+            grad_w[k] = np.bincount(indices, weights=values * grad_logits[rows, k], minlength=N_FEATURES)
+        grad_w += l2 * w
+        grad_b = grad_logits.sum(axis=0)
+
+        m_w = beta1 * m_w + (1 - beta1) * grad_w
+        v_w = beta2 * v_w + (1 - beta2) * grad_w * grad_w
+        m_b = beta1 * m_b + (1 - beta1) * grad_b
+        v_b = beta2 * v_b + (1 - beta2) * grad_b * grad_b
+        correction = learning_rate * np.sqrt(1 - beta2 ** step) / (1 - beta1 ** step)
+        w -= correction * m_w / (np.sqrt(v_w) + eps)
+        b -= correction * m_b / (np.sqrt(v_b) + eps)
+
+    model.source = "trained"
+    model.trained_rows = n
+    return model
+
+
+def evaluate(model: HashedLinearModel, ratings, texts, sentiments, aspects) -> Dict[str, float]:
+    started = time.perf_counter()
+    predictions = model.predict(ratings, texts)
+    elapsed = time.perf_counter() - started
+
+    correct = [p["sentiment"] == s for p, s in zip(predictions, sentiments)]
+    confident = [i for i, p in enumerate(predictions) if p["confidence"] >= MIN_CONFIDENCE]
+    tp = fp = fn = 0
+    for prediction, labels in zip(predictions, aspects):
+        predicted, actual = set(prediction["aspects"]), set(labels) & set(model.aspects)
+        tp += len(predicted & actual)
+        fp += len(predicted - actual)
+        fn += len(actual - predicted)
+    return {
+        "sentiment_accuracy": sum(correct) / max(len(correct), 1),
+        "aspect_f1": 2 * tp / max(2 * tp + fp + fn, 1),
+        "confident_share": len(confident) / max(len(predictions), 1),
+        "confident_accuracy": sum(correct[i] for i in confident) / max(len(confident), 1),
+        "reviews_per_second": len(predictions) / max(elapsed, 1e-9),
+    }
+
+
+# --- Runtime ---
+
+class FastClassifier:
+    """
+    The model the app classifies with: CLASSIFIER_PATH when trained, the lexicon otherwise.
+
+    A retrained file is picked up on the next call without a restart.
+    """
+
+    def __init__(self, path: str = MODEL_PATH):
+        self.path = path
+        self._model: Optional[HashedLinearModel] = None
+        self._mtime: Optional[float] = None
+
+    @property
+    def model(self) -> HashedLinearModel:
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            mtime = None
+        if self._model is None or mtime != self._mtime:
+            model = None
+            if mtime is not None:
+                try:
+                    model = HashedLinearModel.load(self.path)
+                except (OSError, ValueError, KeyError) as e:
+                    print(f"Could not load classifier from {self.path}: {e}; using the lexicon")
+            self._model = model or lexicon_model()
+            self._mtime = mtime
+        return self._model
+
+    def classify(self, ratings: Sequence[int], texts: Sequence[str]) -> List[Dict[str, Any]]:
+        return self.model.predict(ratings, texts)
+
+    def labels(self, rating: int, text: str) -> Dict[str, Any]:
+        return self.classify([rating], [text])[0]
+
+
+fast_classifier = FastClassifier()
+
+
+# --- Offline jobs ---
+
+def load_training_rows(session, max_rows: int):
+    """Newest reviews whose sentiment/aspects came from the LLM (or arrived labelled in an import)."""
+    from sqlmodel import select
+    from models import Review
+
+    query = (
+        select(Review.rating, Review.content, Review.sentiment, Review.aspects)
+        .where(Review.enrichment_status == "done")
+        .where(Review.sentiment.in_(SENTIMENT_CLASSES))
+        .order_by(Review.id.desc())
+        .limit(max_rows)
+    )
+    return session.exec(query).all()
+
+
+def run_training(max_rows: int, epochs: int, holdout: float, path: str = MODEL_PATH) -> Optional[HashedLinearModel]:
+    from sqlmodel import Session
+    from database import engine
+    import rollups
+
+    with Session(engine) as session:
+        rows = load_training_rows(session, max_rows)
+    if len(rows) < MIN_TRAINING_ROWS:
+        print(f"❌ Only {len(rows)} LLM-labelled reviews; need {MIN_TRAINING_ROWS} to train (the lexicon stays in use)")
+        return None
+
+    rng = np.random.default_rng(42)
+    order = rng.permutation(len(rows))
+    cut = int(len(rows) * (1 - holdout))
+    columns = lambda picked: ([rows[i][0] for i in picked], [rows[i][1] for i in picked],
+                              [rows[i][2] for i in picked], [rollups.parse_aspects(rows[i][3]) for i in picked])
+
+    started = time.monotonic()
+    model = train(*columns(order[:cut]), epochs=epochs)
+    print(f"Trained on {cut} reviews, {len(model.aspects)} aspects ({', '.join(model.aspects)}) in {time.monotonic() - started:.1f}s")
+
+    test = columns(order[cut:])
+    for name, candidate in (("lexicon", lexicon_model(model.aspects)), ("trained", model)):
+        scores = evaluate(candidate, *test)
+        print(f"  {name:8} sentiment acc {scores['sentiment_accuracy']:.3f}, aspect F1 {scores['aspect_f1']:.3f}, "
+              f"{scores['confident_share']:.0%} above {MIN_CONFIDENCE} (acc {scores['confident_accuracy']:.3f}), "
+              f"{scores['reviews_per_second']:,.0f} reviews/s")
+
+    # Final model uses the held-out rows too
+    model = train(*columns(order), epochs=epochs)
+    model.save(path)
+    print(f"✅ Saved classifier to {path}")
+    return model
+
+
+def run_backfill(batch_size: int, relabel: bool, queue_uncertain: bool) -> Dict[str, int]:
+    """
+    Label reviews that have no sentiment (or, with relabel, every review the LLM has not labelled).
+
+    With queue_uncertain, low-confidence rows also get an enrichment job so the LLM settles them.
+    """
+    from sqlalchemy import delete, insert, or_, update
+    from sqlmodel import Session, select
+    from database import engine
+    from models import Review, ReviewAspect, EnrichmentJob
+    import data_version
+    import ingest
+    import rollups
+
+    condition = (
+        or_(Review.enrichment_status.is_(None), Review.enrichment_status.not_in(("done", "pending", "processing")))
+        if relabel else Review.sentiment.is_(None)
+    )
+    totals = {"labelled": 0, "queued": 0}
+    after_id = 0
+    with Session(engine) as session:
+        while True:
+            reviews = session.exec(
+                select(Review).where(Review.id > after_id).where(condition).order_by(Review.id).limit(batch_size)
+            ).all()
+            if not reviews:
+                break
+            after_id = reviews[-1].id
+            predictions = fast_classifier.classify([r.rating for r in reviews], [r.content for r in reviews])
+
+            updates, dimensions, aspect_rows, jobs = [], [], [], []
+            now = datetime.utcnow()
+            for review, prediction in zip(reviews, predictions):
+                before = rollups.review_dimensions(review)
+                status = review.enrichment_status
+                if queue_uncertain and prediction["confidence"] < MIN_CONFIDENCE:
+                    status = "pending"
+                    jobs.append({"review_id": review.id, "status": "pending", "attempts": 0,
+                                 "next_attempt_at": now, "created_at": now, "updated_at": now})
+                updates.append({"id": review.id, "sentiment": prediction["sentiment"],
+                                "aspects": json.dumps(prediction["aspects"]), "enrichment_status": status})
+                after = rollups.review_dimensions(Review(createdAt=review.createdAt, rating=review.rating,
+                                                        sentiment=prediction["sentiment"], aspects=updates[-1]["aspects"]))
+                dimensions.extend([(before, -1), (after, 1)])
+                aspect_rows.extend({"review_id": review.id, "aspect": aspect} for aspect in prediction["aspects"])
+            session.expunge_all()
+
+            ids = [row["id"] for row in updates]
+            session.execute(update(Review), updates)
+            session.execute(delete(ReviewAspect).where(ReviewAspect.review_id.in_(ids)))
+            if aspect_rows:
+                session.exec(ingest.INSERT_ASPECTS_SQL, params=aspect_rows)
+            if jobs:
+                session.execute(delete(EnrichmentJob).where(EnrichmentJob.review_id.in_([job["review_id"] for job in jobs])))
+                session.execute(insert(EnrichmentJob), jobs)
+            rollups.apply_dimensions(session, dimensions)
+            data_version.bump(session) # bulk UPDATEs bypass the flush listener
+            session.commit()
+
+            totals["labelled"] += len(updates)
+            totals["queued"] += len(jobs)
+            print(f"Up to id {after_id}: {totals['labelled']} labelled, {totals['queued']} queued for the LLM")
+    return totals
+
+
+if __name__ == "__main__":
+    # Usage: python classifier.py train | python classifier.py backfill [--relabel] [--queue-uncertain]
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Train or apply the local sentiment/aspect classifier.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    train_parser = commands.add_parser("train", help="Fit the model on LLM-labelled reviews and save it to CLASSIFIER_PATH")
+    train_parser.add_argument("--max-rows", type=int, default=50_000, help="Newest labelled reviews to learn from")
+    train_parser.add_argument("--epochs", type=int, default=80)
+    train_parser.add_argument("--holdout", type=float, default=0.1, help="Share kept aside to report accuracy")
+    backfill_parser = commands.add_parser("backfill", help="Label reviews that have no sentiment yet")
+    backfill_parser.add_argument("--batch-size", type=int, default=5000)
+    backfill_parser.add_argument("--relabel", action="store_true",
+                                 help="Also overwrite labels on every review the LLM has not enriched")
+    backfill_parser.add_argument("--queue-uncertain", action="store_true",
+                                 help=f"Queue reviews below CLASSIFIER_MIN_CONFIDENCE ({MIN_CONFIDENCE}) for LLM enrichment")
+    args = parser.parse_args()
+
+    from database import engine
+    from migrate import check_schema
+
+    engine.echo = False
+    check_schema()
+    if args.command == "train":
+        run_training(args.max_rows, args.epochs, args.holdout)
+    else:
+        started = time.monotonic()
+        totals = run_backfill(args.batch_size, args.relabel, args.queue_uncertain)
+        print(f"✅ Classifier backfill finished: {totals['labelled']} labelled, {totals['queued']} queued "
+              f"in {time.monotonic() - started:.1f}s (source: {fast_classifier.model.source})")
@@ -0,0 +1,187 @@
+import asyncio
+import json
+import os
+import time
+import uuid
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import text
+
+try:
+    import fcntl
+except ImportError: # Windows: no flock, so serve.py runs a single worker there
+    fcntl = None
+
+# serve.py sets WEB_CONCURRENCY for its workers (gunicorn and `uvicorn --workers` read it too)
+WORKERS = int(os.getenv("WEB_CONCURRENCY", "1"))
+ENABLED = WORKERS > 1 and fcntl is not None
+BUS_POLL_SECONDS = float(os.getenv("CLUSTER_BUS_POLL_SECONDS", "0.25"))
+BUS_RETENTION_SECONDS = 60
+LEADER_RETRY_SECONDS = 5.0
+LOCK_PATH = os.getenv("CLUSTER_LOCK_PATH", "reviews.db.leader")
+
+INSERT_SQL = text("INSERT INTO bus_event (origin, channel, payload, created_at) VALUES (:origin, :channel, :payload, :created_at)")
+READ_SQL = text("SELECT id, origin, channel, payload FROM bus_event WHERE id > :after ORDER BY id LIMIT 1000")
+HEAD_SQL = text("SELECT COALESCE(MAX(id), 0) FROM bus_event")
+PRUNE_SQL = text("DELETE FROM bus_event WHERE created_at < :cutoff")
+
+
+class LeaderElection:
+    """
+    One worker, the holder of an exclusive flock on LOCK_PATH, runs the singleton background
+    work (scheduled report rendering, insight regeneration, bus pruning).
+
+    The OS drops the lock when its holder exits, crashes included; a follower takes over on its
+    next attempt. Outside multi-worker mode the only process is the leader.
+    """
+
+    def __init__(self, path: str = LOCK_PATH):
+        self.path = path
+        self.is_leader = not ENABLED
+        self._file = None
+        self._on_elected: List[Callable[[], Any]] = []
+
+    def on_elected(self, callback: Callable[[], Any]):
+        # Runs now if this worker already leads, else when it wins an election
+        self._on_elected.append(callback)
+        if self.is_leader:
+            callback()
+
+    def try_acquire(self) -> bool:
+        if self.is_leader:
+            return True
+        lock_file = open(self.path, "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._file = lock_file
+        self.is_leader = True
+        print(f"Worker {os.getpid()} is the cluster leader")
+        for callback in self._on_elected:
+            callback()
+        return True
+
+    def release(self):
+        if self._file is not None:
+            self._file.close() # closing the descriptor releases the flock
+            self._file = None
+        self.is_leader = not ENABLED
+        self._on_elected = []
+
+
+class ClusterBus:
+    """
+    Broadcast channel between workers over the bus_event table: no broker process needed.
+
+    publish() only queues the message (it is safe from any thread); every BUS_POLL_SECONDS each
+    worker writes its queued messages in one transaction and reads the ones it has not seen, so
+    a message reaches the other workers within about two poll intervals. Handlers run on the
+    event loop and never see messages from their own worker, which acts on them directly.
+    """
+
+    def __init__(self):
+        self.origin = uuid.uuid4().hex
+        self._outbox: deque = deque()
+        self._handlers: Dict[str, List[Callable[[Any], Any]]] = {}
+        self._after = 0
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def subscribe(self, channel: str, handler: Callable[[Any], Any]):
+        self._handlers.setdefault(channel, []).append(handler)
+
+    def publish(self, channel: str, payload: Any):
+        if self._task is None:
+            return # single worker or CLI script: nobody else to tell
+        self._outbox.append((channel, json.dumps(payload)))
+
+    async def _exchange(self):
+        from database import async_engine
+        outgoing = []
+        while self._outbox:
+            outgoing.append(self._outbox.popleft())
+        try:
+            async with async_engine.begin() as conn:
+                if outgoing:
+                    now = datetime.utcnow()
+                    await conn.execute(INSERT_SQL, [
+                        {"origin": self.origin, "channel": channel, "payload": payload, "created_at": now}
+                        for channel, payload in outgoing
+                    ])
+                rows = (await conn.execute(READ_SQL, {"after": self._after})).all()
+        except BaseException:
+            self._outbox.extendleft(reversed(outgoing)) # retried on the next tick
+            raise
+
+        for event_id, origin, channel, payload in rows:
+            self._after = event_id
+            if origin == self.origin:
+                continue
+            for handler in self._handlers.get(channel, ()):
+                try:
+                    handler(json.loads(payload))
+                except Exception as e:
+                    print(f"Cluster bus handler for {channel} failed: {e}")
+
+    async def _prune(self):
+        from database import async_engine
+        async with async_engine.begin() as conn:
+            await conn.execute(PRUNE_SQL, {"cutoff": datetime.utcnow() - timedelta(seconds=BUS_RETENTION_SECONDS)})
+
+    async def _run(self):
+        last_election = last_prune = time.monotonic()
+        while True:
+            await asyncio.sleep(BUS_POLL_SECONDS)
+            try:
+                await self._exchange()
+                now = time.monotonic()
+                if not leader.is_leader and now - last_election >= LEADER_RETRY_SECONDS:
+                    last_election = now
+                    leader.try_acquire()
+                if leader.is_leader and now - last_prune >= BUS_RETENTION_SECONDS / 2:
+                    last_prune = now
+                    await self._prune()
+            except Exception as e:
+                print(f"Cluster bus exchange failed: {e}")
+
+    async def start(self):
+        from database import async_engine
+        # Start at the current end: messages from before this worker existed are not replayed
+        async with async_engine.connect() as conn:
+            self._after = (await conn.execute(HEAD_SQL)).scalar()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+            # Last chance for messages queued during shutdown
+            try:
+                await self._exchange()
+            except Exception:
+                pass
+
+
+leader = LeaderElection()
+bus = ClusterBus()
+
+
+async def start():
+    """Join the cluster: start the bus and stand for leader (no-op outside multi-worker mode)."""
+    if not ENABLED:
+        return
+    await bus.start()
+    leader.try_acquire()
+
+
+async def stop():
+    await bus.stop()
+    leader.release()
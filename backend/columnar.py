@@ -0,0 +1,378 @@
+import asyncio
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import bindparam, text
+from sqlmodel import Session
+from database import engine
+
+# In-memory columns of every review for ad-hoc time-series analytics: (id, createdAt as epoch
+# seconds and as a day number, rating, sentiment code, aspect bitmask words), about 40 bytes per
+# review with the query index, never the text.
+LOAD_BATCH_ROWS = 200_000
+PATCH_BATCH_IDS = 900
+CHANGE_LOG_RETENTION_DAYS = 1
+ROLLING_WINDOWS = (7, 30)
+MAX_BUCKETS = 5000
+ASPECT_WORD_BITS = 64 # aspects per bitmask column; another column is added for each further 64
+DAY_SECONDS = 86400
+EPOCH = datetime(1970, 1, 1)
+GRAINS = ("day", "week", "month")
+
+# Updates and deletes of the columns held here are logged into review_change by triggers
+# (migrations/0010_review_change_log.py), so every writer is covered; new reviews are picked up by id.
+
+# Last seq ever assigned (kept by sqlite_sequence after pruning) and the oldest one still logged
+CHANGE_HEAD_SQL = text("""
+    SELECT (SELECT seq FROM sqlite_sequence WHERE name = 'review_change'), (SELECT MIN(seq) FROM review_change)
+""")
+CHANGED_IDS_SQL = text("SELECT DISTINCT review_id FROM review_change WHERE seq > :after AND seq <= :until")
+PRUNE_CHANGES_SQL = text("DELETE FROM review_change WHERE changed_at < :cutoff")
+# One row per batch: SQLite joins each column into a comma-separated string that NumPy parses
+# in C, and sentiments/aspects come back as one id list per value, so loading creates a
+# handful of Python objects per batch instead of several per review.
+COLUMNS_SQL = """
+    SELECT COUNT(*), group_concat(id), group_concat(COALESCE(CAST(strftime('%s', "createdAt") AS INTEGER), 0)),
+           group_concat(rating)
+    FROM review WHERE {where}
+"""
+SENTIMENT_IDS_SQL = "SELECT sentiment, group_concat(id) FROM review WHERE sentiment IS NOT NULL AND {where} GROUP BY sentiment"
+ASPECT_IDS_SQL = "SELECT aspect, group_concat(review_id) FROM review_aspect WHERE {where} GROUP BY aspect"
+BATCH_END_SQL = text("SELECT MAX(id) FROM (SELECT id FROM review WHERE id > :after ORDER BY id LIMIT :limit)")
+
+
+def _statements(review_where: str, aspect_where: str, expanding: bool = False) -> List:
+    statements = [text(COLUMNS_SQL.format(where=review_where)), text(SENTIMENT_IDS_SQL.format(where=review_where)),
+                  text(ASPECT_IDS_SQL.format(where=aspect_where))]
+    if expanding:
+        statements = [statement.bindparams(bindparam("ids", expanding=True)) for statement in statements]
+    return statements
+
+
+RANGE_SQL = _statements("id > :after AND id <= :last", "review_id > :after AND review_id <= :last")
+BY_ID_SQL = _statements("id IN :ids", "review_id IN :ids", expanding=True)
+
+# Column name -> dtype; "day" (days since 1970-01-01) saves a division per row in every query.
+# The aspect bitmask columns ("aspects_0", "aspects_1", ...) are added as aspects appear.
+COLUMNS = {"id": np.int64, "created": np.int64, "day": np.int32, "rating": np.int8, "sentiment": np.int8}
+
+
+def prune_change_log(retention_days: int = CHANGE_LOG_RETENTION_DAYS) -> int:
+    # A store that has not synced for longer than this reloads in full (see ColumnStore._sync)
+    with Session(engine) as session:
+        result = session.exec(PRUNE_CHANGES_SQL, params={"cutoff": datetime.utcnow() - timedelta(days=retention_days)})
+        session.commit()
+        return result.rowcount
+
+
+def parse_ints(joined: Optional[str]) -> np.ndarray:
+    return np.array(joined.split(","), dtype=np.int64) if joined else np.empty(0, np.int64)
+
+
+def aspect_column(word: int) -> str:
+    return f"aspects_{word}"
+
+
+def locate(sorted_ids: np.ndarray, wanted: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """(positions, present): where each wanted id sits in sorted_ids, and whether it is there at all."""
+    if not len(sorted_ids):
+        return np.zeros(len(wanted), np.int64), np.zeros(len(wanted), bool)
+    positions = np.minimum(np.searchsorted(sorted_ids, wanted), len(sorted_ids) - 1)
+    return positions, sorted_ids[positions] == wanted
+
+
+def epoch_seconds(value: datetime) -> int:
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return int((value - EPOCH).total_seconds())
+
+
+def bucket_index(days: np.ndarray, grain: str) -> np.ndarray:
+    """Bucket number of each day number (days since 1970-01-01)."""
+    if grain == "day":
+        return days
+    if grain == "week":
+        return (days + 3) // 7 # ISO weeks start on Monday; 1970-01-01 was a Thursday
+    return days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+
+
+def bucket_bounds(index: int, grain: str) -> Tuple[str, int, int]:
+    """(label, first day, day after the last) of a bucket number."""
+    if grain == "day":
+        return str(np.datetime64(index, "D")), index, index + 1
+    if grain == "week":
+        first = index * 7 - 3
+        return str(np.datetime64(first, "D")), first, first + 7
+    month = np.datetime64(index, "M")
+    first = int(month.astype("datetime64[D]").astype(np.int64))
+    last = int((month + 1).astype("datetime64[D]").astype(np.int64))
+    return str(month), first, last
+
+
+class ColumnStore:
+    """
+    Review dimensions as NumPy arrays, loaded once and kept current incrementally.
+
+    Before answering, the store catches up with the data version: reviews above its id
+    high-water mark are appended, and ids logged in review_change since its last sync are
+    re-read (or dropped if deleted). Queries are then boolean masks and bincounts over the
+    arrays: milliseconds for millions of reviews, with no per-row Python.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._columns: Dict[str, np.ndarray] = {name: np.empty(0, dtype) for name, dtype in COLUMNS.items()}
+        self.size = 0
+        self.sentiments: List[Optional[str]] = [None] # code 0: not labelled yet
+        self.aspects: Dict[str, int] = {} # name -> bit number across the bitmask columns
+        self.synced_version: Optional[int] = None
+        self.change_seq = 0
+        self._cell_cache: Optional[np.ndarray] = None
+        self._warm_task: Optional[asyncio.Task] = None
+
+    def column(self, name: str) -> np.ndarray:
+        return self._columns[name][:self.size]
+
+    # --- Loading ---
+
+    def _sentiment_code(self, sentiment: str) -> int:
+        if sentiment not in self.sentiments:
+            self.sentiments.append(sentiment)
+        return self.sentiments.index(sentiment)
+
+    def _aspect_bit(self, aspect: str) -> int:
+        bit = self.aspects.get(aspect)
+        if bit is None:
+            bit = self.aspects[aspect] = len(self.aspects)
+            name = aspect_column(bit // ASPECT_WORD_BITS)
+            if name not in self._columns:
+                # Every review held so far lacks the new aspects
+                self._columns[name] = np.zeros(len(self._columns["id"]), np.uint64)
+        return bit
+
+    def _read(self, session: Session, statements: List, params: Dict[str, Any]) -> Optional[Dict[str, np.ndarray]]:
+        """Columns of the reviews selected by RANGE_SQL or BY_ID_SQL, in id order."""
+        columns_sql, sentiments_sql, aspects_sql = statements
+        count, ids, created, ratings = session.exec(columns_sql, params=params).one()
+        if not count:
+            return None
+        ids, created, ratings = parse_ints(ids), parse_ints(created), parse_ints(ratings)
+        order = np.argsort(ids)
+        columns = {"id": ids[order], "created": created[order], "rating": np.clip(ratings[order], 1, 5).astype(np.int8)}
+        columns["day"] = (columns["created"] // DAY_SECONDS).astype(np.int32)
+        columns["sentiment"] = np.zeros(count, np.int8)
+        # Separate statements may straddle a concurrent write: ids not in this batch are skipped,
+        # and the write itself is in the change log for the next sync
+        for sentiment, member_ids in session.exec(sentiments_sql, params=params).all():
+            positions, present = locate(columns["id"], parse_ints(member_ids))
+            columns["sentiment"][positions[present]] = self._sentiment_code(sentiment)
+        aspect_rows = session.exec(aspects_sql, params=params).all()
+        bits = [self._aspect_bit(aspect) for aspect, _ in aspect_rows]
+        for word in range(-(-len(self.aspects) // ASPECT_WORD_BITS)):
+            columns[aspect_column(word)] = np.zeros(count, np.uint64)
+        for bit, (_, member_ids) in zip(bits, aspect_rows):
+            word, bit = divmod(bit, ASPECT_WORD_BITS)
+            positions, present = locate(columns["id"], parse_ints(member_ids))
+            columns[aspect_column(word)][positions[present]] |= np.uint64(1 << bit)
+        return columns
+
+    def _append(self, columns: Dict[str, np.ndarray]):
+        count = len(columns["id"])
+        end = self.size + count
+        for name, values in columns.items():
+            array = self._columns[name]
+            if end > len(array):
+                # Amortized growth: appends of a few reviews at a time stay O(batch)
+                bigger = np.empty(max(end, 2 * len(array), 1024), array.dtype)
+                bigger[:self.size] = array[:self.size]
+                array = self._columns[name] = bigger
+            array[self.size:end] = values
+        self.size = end
+
+    def _load_after(self, session: Session, after: int) -> int:
+        # Keyset batches: the whole table is never materialized at once
+        loaded = 0
+        while True:
+            last = session.exec(BATCH_END_SQL, params={"after": after, "limit": LOAD_BATCH_ROWS}).one()[0]
+            if last is None:
+                return loaded
+            columns = self._read(session, RANGE_SQL, {"after": after, "last": last})
+            if columns is not None:
+                self._append(columns)
+                loaded += len(columns["id"])
+            after = last
+
+    def _patch(self, session: Session, changed_ids: List[int]):
+        ids = self.column("id")
+        changed = np.array(sorted(changed_ids), np.int64)
+        changed = changed[changed <= (ids[-1] if self.size else 0)] # newer ids arrive with the append
+        deleted = []
+        for i in range(0, len(changed), PATCH_BATCH_IDS):
+            batch = changed[i:i + PATCH_BATCH_IDS]
+            columns = self._read(session, BY_ID_SQL, {"ids": batch.tolist()})
+            found = columns["id"] if columns else np.empty(0, np.int64)
+            positions, present = locate(ids, found)
+            for name, values in (columns or {}).items():
+                self._columns[name][positions[present]] = values[present]
+            deleted.extend(np.setdiff1d(batch, found).tolist())
+        if deleted:
+            keep = ~np.isin(ids, deleted)
+            columns = {name: self.column(name)[keep] for name in self._columns}
+            self.size = 0
+            self._append(columns)
+
+    def _sync(self, version: int):
+        with Session(engine) as session:
+            # Watermark first: anything changed while the rows are read is re-read next time
+            last_seq, first_logged = session.exec(CHANGE_HEAD_SQL).one()
+            last_seq = last_seq or 0
+            first_available = first_logged if first_logged is not None else last_seq + 1
+            if self.synced_version is None or first_available > self.change_seq + 1:
+                # First load, or changes were pruned before this store saw them
+                self.size = 0
+                loaded = self._load_after(session, 0)
+                print(f"Column store loaded {loaded} reviews")
+            else:
+                changed = session.exec(CHANGED_IDS_SQL, params={"after": self.change_seq, "until": last_seq}).all()
+                high_water = int(self.column("id")[-1]) if self.size else 0
+                if changed:
+                    self._patch(session, [row[0] for row in changed])
+                self._load_after(session, high_water)
+        self.change_seq = last_seq
+        self.synced_version = version
+        self._cell_cache = None
+
+    def sync(self, version: int):
+        with self._lock:
+            if self.synced_version != version:
+                self._sync(version)
+
+    def start(self):
+        # Load in the background so the first time-series request does not pay for it
+        from data_version import data_version
+        self._warm_task = asyncio.create_task(asyncio.to_thread(self.sync, data_version.value))
+
+    async def stop(self):
+        if self._warm_task is not None:
+            await asyncio.gather(self._warm_task, return_exceptions=True)
+            self._warm_task = None
+
+    # --- Queries ---
+
+    def _filter_mask(self, rating: Optional[int], sentiment: Optional[str], aspect: Optional[str]) -> Optional[np.ndarray]:
+        # None: no filter, every review counts
+        mask = None
+        if rating:
+            mask = self.column("rating") == rating
+        if sentiment:
+            code = self.sentiments.index(sentiment) if sentiment in self.sentiments else -1
+            mask = (self.column("sentiment") == code) if mask is None else mask & (self.column("sentiment") == code)
+        if aspect:
+            bit = self.aspects.get(aspect)
+            if bit is None:
+                matches = np.zeros(self.size, bool)
+            else:
+                word, bit = divmod(bit, ASPECT_WORD_BITS)
+                matches = (self.column(aspect_column(word)) & np.uint64(1 << bit)) != 0
+            mask = matches if mask is None else mask & matches
+        return mask
+
+    def _cells(self) -> np.ndarray:
+        """
+        Per review, its (day, sentiment, rating) cell of a day x sentiment x rating histogram,
+        flattened: one bincount over a slice of these answers every breakdown. Rebuilt after a sync.
+        """
+        if self._cell_cache is None:
+            stride = 5 * len(self.sentiments)
+            self._cell_cache = (self.column("day").astype(np.int64) * stride
+                                + self.column("sentiment").astype(np.int64) * 5 + self.column("rating") - 1)
+        return self._cell_cache
+
+    def timeseries(self, version: int, grain: str = "day", start: Optional[datetime] = None, end: Optional[datetime] = None,
+                   rating: Optional[int] = None, sentiment: Optional[str] = None, aspect: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Review count, average rating, rating and sentiment breakdowns per day/week/month bucket,
+        plus trailing 7- and 30-day average ratings as of each bucket's last day in the range.
+
+        Buckets are whole UTC days, so start and end are widened to midnight (the response says
+        which range was used); either defaults to the first/last review matching the filters.
+        """
+        self.sync(version)
+        with self._lock:
+            day = self.column("day")
+            mask = self._filter_mask(rating, sentiment, aspect)
+            first_day = epoch_seconds(start) // DAY_SECONDS if start else None
+            end_day = -(-epoch_seconds(end) // DAY_SECONDS) if end else None
+            if first_day is None or end_day is None:
+                matching = day if mask is None else day[mask]
+                if not len(matching):
+                    return {"grain": grain, "start": start, "end": end, "total_reviews": 0, "average_rating": 0, "buckets": []}
+                first_day = int(matching.min()) if first_day is None else first_day
+                end_day = int(matching.max()) + 1 if end_day is None else end_day
+            if end_day <= first_day:
+                raise ValueError("end must be after start")
+
+            first_bucket = int(bucket_index(np.array([first_day]), grain)[0])
+            bucket_count = int(bucket_index(np.array([end_day - 1]), grain)[0]) - first_bucket + 1
+            if bucket_count > MAX_BUCKETS:
+                raise ValueError(f"{bucket_count} {grain} buckets requested; narrow the range or use a coarser grain")
+
+            # The one pass over individual reviews. Rolling windows reach back before the range;
+            # those days feed the averages only.
+            lookback_day = first_day - max(ROLLING_WINDOWS) + 1
+            sentiment_names = list(self.sentiments)
+            stride = 5 * len(sentiment_names)
+            cells = self._cells()
+            selected = (cells >= lookback_day * stride) & (cells < end_day * stride)
+            if mask is not None:
+                selected &= mask
+            days = end_day - lookback_day
+            histogram = np.bincount(cells[selected] - lookback_day * stride, minlength=days * stride)
+            histogram = histogram.reshape(days, len(sentiment_names), 5)
+
+        # Everything below works on per-day totals: a few thousand rows at most
+        stars = np.arange(1, 6)
+        by_day_rating = histogram.sum(axis=1)
+        cumulative_counts = np.concatenate(([0], np.cumsum(by_day_rating.sum(axis=1))))
+        cumulative_sums = np.concatenate(([0], np.cumsum(by_day_rating @ stars)))
+        in_range = slice(first_day - lookback_day, None)
+        day_buckets = bucket_index(np.arange(first_day, end_day), grain) - first_bucket
+        bucket_ratings = np.zeros((bucket_count, 5), np.int64)
+        np.add.at(bucket_ratings, day_buckets, by_day_rating[in_range])
+        bucket_sentiments = np.zeros((bucket_count, len(sentiment_names)), np.int64)
+        np.add.at(bucket_sentiments, day_buckets, histogram[in_range].sum(axis=2))
+        counts, rating_sums = bucket_ratings.sum(axis=1), bucket_ratings @ stars
+
+        series = []
+        for i in range(bucket_count):
+            label, _, bucket_end = bucket_bounds(first_bucket + i, grain)
+            last = min(bucket_end, end_day) - lookback_day # days [lookback_day, last) precede it
+            rolling = {}
+            for window in ROLLING_WINDOWS:
+                n = cumulative_counts[last] - cumulative_counts[last - window]
+                rolling[f"{window}d"] = round(float(cumulative_sums[last] - cumulative_sums[last - window]) / n, 2) if n else None
+            count = int(counts[i])
+            series.append({
+                "bucket": label,
+                "count": count,
+                "avg_rating": round(float(rating_sums[i]) / count, 2) if count else None,
+                "ratings": {star: int(bucket_ratings[i, star - 1]) for star in range(1, 6)},
+                # Reviews not labelled yet are in count but in no sentiment
+                "sentiments": {name: int(bucket_sentiments[i, code]) for code, name in enumerate(sentiment_names) if name},
+                "rolling_avg_rating": rolling,
+            })
+
+        total = int(counts.sum())
+        return {
+            "grain": grain,
+            "start": EPOCH + timedelta(days=first_day),
+            "end": EPOCH + timedelta(days=end_day),
+            "total_reviews": total,
+            "average_rating": round(float(rating_sums.sum()) / total, 2) if total else 0,
+            "buckets": series,
+        }
+
+
+column_store = ColumnStore()
@@ -0,0 +1,93 @@
+import asyncio
+import os
+from itertools import chain
+from typing import Optional
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+from models import Review, AdminNote
+import cluster
+
+POLL_SECONDS = float(os.getenv("DATA_VERSION_POLL_SECONDS", "2"))
+
+# Writes to these tables change what the cached read endpoints return
+VERSIONED_MODELS = (Review, AdminNote)
+
+BUMP_SQL = text("UPDATE data_version SET version = version + 1 WHERE id = 1 RETURNING version")
+READ_SQL = text("SELECT version FROM data_version WHERE id = 1")
+
+
+def bump(session: Session):
+    """Increment the persisted data version once per transaction; it becomes visible on commit."""
+    if "data_version" in session.info:
+        return
+    session.info["data_version"] = session.connection().execute(BUMP_SQL).scalar()
+
+
+@event.listens_for(Session, "after_flush")
+def _bump_on_flush(session: Session, flush_context):
+    # ORM writes (new reviews, enrichment, notes, seed scripts) are picked up here; Core
+    # INSERTs such as ingest.insert_batch call bump() themselves
+    changed = chain(session.new, session.dirty, session.deleted)
+    if any(isinstance(obj, VERSIONED_MODELS) for obj in changed):
+        bump(session)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_version(session: Session):
+    version = session.info.pop("data_version", None)
+    if version is not None:
+        data_version.observe(version)
+        cluster.bus.publish("data_version", version)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_version(session: Session):
+    session.info.pop("data_version", None)
+
+
+class DataVersionTracker:
+    """
+    In-memory copy of the data version, so validating a cached response needs no query.
+
+    Commits in this process update it immediately, commits in other workers arrive over the
+    cluster bus, and a light poll picks up writes made by CLI scripts (bulk_import.py,
+    backfill.py) running against the same database.
+    """
+
+    def __init__(self):
+        self.value = 0
+        self._poller: Optional[asyncio.Task] = None
+
+    def observe(self, version: int):
+        if version > self.value:
+            self.value = version
+
+    async def refresh(self):
+        from database import async_engine
+        async with async_engine.connect() as conn:
+            version = (await conn.execute(READ_SQL)).scalar()
+        if version is not None:
+            self.observe(version)
+
+    async def _poll(self):
+        while True:
+            await asyncio.sleep(POLL_SECONDS)
+            try:
+                await self.refresh()
+            except Exception as e:
+                print(f"Data version refresh failed: {e}")
+
+    async def start(self):
+        await self.refresh()
+        self._poller = asyncio.create_task(self._poll())
+
+    async def stop(self):
+        if self._poller is not None:
+            self._poller.cancel()
+            await asyncio.gather(self._poller, return_exceptions=True)
+            self._poller = None
+
+
+data_version = DataVersionTracker()
+cluster.bus.subscribe("data_version", data_version.observe)
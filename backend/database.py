@@ -1,33 +1,50 @@
-from sqlmodel import SQLModel, create_engine, Session
+import os
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlmodel import create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+import metrics
 
 sqlite_file_name = "reviews.db"
 sqlite_url = f"sqlite:///{sqlite_file_name}"
+async_sqlite_url = f"sqlite+aiosqlite:///{sqlite_file_name}"
 
-connect_args = {"check_same_thread": False}
-engine = create_engine(sqlite_url, echo=True, connect_args=connect_args)
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+# Echoing every statement floods stdout and costs throughput; slow statements are logged by metrics.py instead
+SQL_ECHO = os.getenv("SQL_ECHO", "").lower() in ("1", "true", "yes")
 
-def create_db_and_tables():
-    SQLModel.metadata.create_all(engine)
-    migrate_db()
+connect_args = {"check_same_thread": False}
+# Sync engine: migrations, CLI scripts and background workers (run in threads)
+engine = create_engine(sqlite_url, echo=SQL_ECHO, connect_args=connect_args)
+# Async engine: request handlers; each aiosqlite connection runs queries on its own thread
+async_engine = create_async_engine(
+    async_sqlite_url,
+    echo=SQL_ECHO,
+    poolclass=AsyncAdaptedQueuePool, # aiosqlite defaults to NullPool: a new connection per request
+    pool_size=POOL_SIZE,
+    max_overflow=MAX_OVERFLOW,
+    pool_timeout=30,
+)
 
-def migrate_db():
-    from sqlalchemy import text
-    with Session(engine) as session:
-        # Check if helper columns exist, if not add them
-        try:
-            session.exec(text("ALTER TABLE review ADD COLUMN sentiment VARCHAR"))
-            session.commit()
-            print("Migrated: Added sentiment column")
-        except Exception:
-            pass # Column likely exists
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL lets readers run alongside the single writer; NORMAL is durable enough under WAL
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+    cursor.execute("PRAGMA busy_timeout=5000")
+    cursor.close()
 
-        try:
-            session.exec(text("ALTER TABLE review ADD COLUMN aspects VARCHAR"))
-            session.commit()
-            print("Migrated: Added aspects column")
-        except Exception:
-            pass # Column likely exists
+event.listen(engine, "connect", _set_sqlite_pragmas)
+event.listen(async_engine.sync_engine, "connect", _set_sqlite_pragmas)
+metrics.instrument_engine(engine)
+metrics.instrument_engine(async_engine.sync_engine)
 
-def get_session():
-    with Session(engine) as session:
+async def get_session():
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
         yield session
+
+import data_version # noqa: E402,F401 - registers the listeners that bump the data version on writes
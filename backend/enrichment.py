@@ -0,0 +1,303 @@
+import asyncio
+import json
+import os
+import random
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from sqlmodel import Session, and_, select, update
+from database import engine
+from models import Review, ReviewRead, EnrichmentJob
+from llm_service import enrich_review, fallback_result, LLMError
+from aspects import set_review_aspects
+import rollups
+import metrics
+import cluster
+from events import broker
+
+WORKER_COUNT = int(os.getenv("ENRICHMENT_WORKERS", "4"))
+MAX_ATTEMPTS = int(os.getenv("ENRICHMENT_MAX_ATTEMPTS", "5"))
+BACKOFF_BASE_SECONDS = float(os.getenv("ENRICHMENT_BACKOFF_SECONDS", "5"))
+BACKOFF_MAX_SECONDS = 600
+POLL_INTERVAL_SECONDS = 2.0
+# A claimed job is leased to its worker, which renews the lease every third of it while the LLM
+# call runs; a job whose lease ran out (worker crashed, killed, redeployed) is claimable again
+LEASE_SECONDS = float(os.getenv("ENRICHMENT_LEASE_SECONDS", "60"))
+
+TERMINAL_STATUSES = ("done", "failed")
+
+
+def enqueue(session: Session, review: Review, keep_labels: bool = False):
+    """
+    Mark a flushed review as pending and add its queue row (committed by the caller).
+
+    With keep_labels the review's sentiment and aspects stay as they are; the LLM fills in the text fields.
+    """
+    review.enrichment_status = "pending"
+    session.add(review)
+    job = session.exec(select(EnrichmentJob).where(EnrichmentJob.review_id == review.id)).first()
+    if job is None:
+        job = EnrichmentJob(review_id=review.id)
+    else:
+        job.status = "pending"
+        job.attempts = 0
+        job.last_error = None
+    job.next_attempt_at = datetime.utcnow()
+    job.updated_at = datetime.utcnow()
+    job.lease_expires_at = None
+    job.keep_labels = keep_labels
+    session.add(job)
+
+
+def apply_result(session: Session, review: Review, result: Dict[str, Any], keep_labels: bool = False):
+    # Copies LLM output onto the review and keeps review_aspect + rollups in step
+    before = rollups.review_dimensions(review)
+
+    review.summary = result.get("summary")
+    review.suggestedAction = result.get("suggestedAction")
+    review.response = result.get("response")
+    if not keep_labels and (result.get("sentiment") or "aspects" in result):
+        review.sentiment = result.get("sentiment")
+        aspects_list = result.get("aspects", [])
+        review.aspects = json.dumps(aspects_list) if isinstance(aspects_list, list) else json.dumps([])
+        set_review_aspects(session, review.id, rollups.parse_aspects(review.aspects))
+
+    session.add(review)
+    rollups.record_enrichment(session, before, review)
+
+
+def backoff_delay(attempts: int) -> float:
+    # Exponential backoff with full jitter
+    ceiling = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** max(attempts - 1, 0)))
+    return random.uniform(ceiling / 2, ceiling)
+
+
+def _lease(session: Session, due, order, now: datetime) -> Optional[int]:
+    next_id = select(EnrichmentJob.id).where(due).order_by(*order).limit(1).scalar_subquery()
+    return session.exec(
+        update(EnrichmentJob)
+        .where(EnrichmentJob.id == next_id)
+        .where(due)
+        .values(status="processing", lease_expires_at=now + timedelta(seconds=LEASE_SECONDS), updated_at=now)
+        .returning(EnrichmentJob.id)
+    ).scalar()
+
+
+def claim_next_job(session: Session) -> Optional[EnrichmentJob]:
+    """Atomically lease a job whose previous worker's lease expired, else the oldest due job, and return it."""
+    now = datetime.utcnow()
+    # Two index seeks rather than one OR: ordering an OR over the whole due backlog would sort it on every claim
+    claimed_id = _lease(
+        session, and_(EnrichmentJob.status == "processing", EnrichmentJob.lease_expires_at <= now),
+        (EnrichmentJob.lease_expires_at,), now,
+    )
+    if claimed_id is not None:
+        print(f"Reclaimed enrichment job {claimed_id} after its lease expired")
+    else:
+        claimed_id = _lease(
+            session, and_(EnrichmentJob.status == "pending", EnrichmentJob.next_attempt_at <= now),
+            (EnrichmentJob.next_attempt_at, EnrichmentJob.id), now,
+        )
+    session.commit()
+    if claimed_id is None:
+        return None
+    return session.get(EnrichmentJob, claimed_id)
+
+
+def renew_lease(session: Session, job_id: int) -> bool:
+    """Extend this worker's lease; False when the job is no longer processing (finished or deleted)."""
+    now = datetime.utcnow()
+    result = session.exec(
+        update(EnrichmentJob)
+        .where(EnrichmentJob.id == job_id)
+        .where(EnrichmentJob.status == "processing")
+        .values(lease_expires_at=now + timedelta(seconds=LEASE_SECONDS))
+    )
+    session.commit()
+    return result.rowcount > 0
+
+
+class EnrichmentWorkerPool:
+    def __init__(self, worker_count: int = WORKER_COUNT):
+        self.worker_count = worker_count
+        self._tasks = []
+        self._wakeup = asyncio.Event()
+        self._finished: Dict[int, asyncio.Event] = {}
+
+    def start(self):
+        # Jobs left "processing" by a previous run are picked up by claim_next_job once their lease expires
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.worker_count)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self):
+        # Called after a job is committed so an idle worker picks it up without waiting for the poll
+        self._wakeup.set()
+
+    def mark_finished(self, review_id: int):
+        # Wakes long-polls waiting on this review; called by other workers through the cluster bus too
+        event = self._finished.get(review_id)
+        if event is not None:
+            event.set()
+
+    async def wait_for(self, review_id: int, timeout: float):
+        event = self._finished.setdefault(review_id, asyncio.Event())
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            self._finished.pop(review_id, None)
+
+    async def _worker(self):
+        while True:
+            try:
+                job_id, review_id = await asyncio.to_thread(self._claim)
+            except Exception as e:
+                # e.g. the database is locked or briefly unavailable; the worker must outlive it
+                print(f"Enrichment worker could not claim a job: {e}")
+                await asyncio.sleep(POLL_INTERVAL_SECONDS)
+                continue
+
+            if job_id is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), POLL_INTERVAL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            try:
+                await self._process(job_id, review_id)
+            except Exception as e:
+                print(f"Enrichment worker error on job {job_id}: {e}")
+            finally:
+                self.mark_finished(review_id)
+                cluster.bus.publish("enrichment.finished", review_id)
+
+    def _claim(self):
+        # Blocking DB work runs in a thread so workers never stall the event loop
+        with Session(engine) as session:
+            job = claim_next_job(session)
+            return (job.id, job.review_id) if job else (None, None)
+
+    def _load(self, job_id: int, review_id: int):
+        with Session(engine) as session:
+            review = session.get(Review, review_id)
+            if review is None:
+                session.delete(session.get(EnrichmentJob, job_id))
+                session.commit()
+                return None
+            return review.rating, review.content
+
+    async def _process(self, job_id: int, review_id: int):
+        heartbeat = asyncio.create_task(self._heartbeat(job_id))
+        try:
+            await self._enrich(job_id, review_id)
+        finally:
+            heartbeat.cancel()
+
+    async def _heartbeat(self, job_id: int):
+        while True:
+            await asyncio.sleep(LEASE_SECONDS / 3)
+            try:
+                if not await asyncio.to_thread(self._renew, job_id):
+                    return
+            except Exception as e:
+                print(f"Could not renew the lease on enrichment job {job_id}: {e}")
+
+    def _renew(self, job_id: int) -> bool:
+        with Session(engine) as session:
+            return renew_lease(session, job_id)
+
+    async def _enrich(self, job_id: int, review_id: int):
+        try:
+            loaded = await asyncio.to_thread(self._load, job_id, review_id)
+            if loaded is None:
+                return
+
+            result = None
+            error = None
+            try:
+                result = await enrich_review(*loaded)
+            except LLMError as e:
+                error = e
+
+            if error is not None:
+                result = fallback_result(*loaded, error) # only stored once retries run out
+            await asyncio.to_thread(self._finish, job_id, review_id, result, error)
+        except Exception as e:
+            # Anything else (a failed commit, a bug in apply_result) still counts as an attempt,
+            # or the job would be reclaimed and fail the same way forever
+            print(f"Enrichment job {job_id} failed: {e!r}")
+            await asyncio.to_thread(self._record_failure, job_id, review_id, e)
+
+    def _finish(self, job_id: int, review_id: int, result: Optional[Dict[str, Any]], error: Optional[LLMError]):
+        with Session(engine) as session:
+            job = session.get(EnrichmentJob, job_id)
+            if job is None or job.status != "processing":
+                return # finished by a worker that took over after this one's lease expired
+            review = session.get(Review, review_id)
+            if review is None:
+                # Deleted while the LLM call ran
+                session.delete(job)
+                session.commit()
+                return
+            job.attempts += 1
+            job.updated_at = datetime.utcnow()
+            job.lease_expires_at = None
+
+            if error is None:
+                apply_result(session, review, result, job.keep_labels)
+                job.status = "done"
+                job.last_error = None
+                review.enrichment_status = "done"
+            elif error.retryable and job.attempts < MAX_ATTEMPTS:
+                job.status = "pending"
+                job.last_error = str(error)
+                job.next_attempt_at = datetime.utcnow() + timedelta(seconds=backoff_delay(job.attempts))
+                review.enrichment_status = "pending"
+            else:
+                # Out of retries (or not retryable): fallback text with classifier labels
+                metrics.llm_fallbacks.inc(error.reason)
+                apply_result(session, review, result, job.keep_labels)
+                job.status = "failed"
+                job.last_error = str(error)
+                review.enrichment_status = "failed"
+
+            session.add(job)
+            session.add(review)
+            session.commit()
+            if review.enrichment_status != "pending":
+                broker.publish("review.enriched", ReviewRead.model_validate(review))
+
+    def _record_failure(self, job_id: int, review_id: int, error: Exception):
+        # Fresh session: the one that raised may be unusable
+        with Session(engine) as session:
+            job = session.get(EnrichmentJob, job_id)
+            if job is None or job.status != "processing":
+                return
+            review = session.get(Review, review_id)
+            job.attempts += 1
+            job.updated_at = datetime.utcnow()
+            job.lease_expires_at = None
+            job.last_error = repr(error)
+            if job.attempts < MAX_ATTEMPTS:
+                job.status = "pending"
+                job.next_attempt_at = datetime.utcnow() + timedelta(seconds=backoff_delay(job.attempts))
+            else:
+                job.status = "failed"
+            if review is not None:
+                review.enrichment_status = job.status
+                session.add(review)
+            session.add(job)
+            session.commit()
+
+
+worker_pool = EnrichmentWorkerPool()
+cluster.bus.subscribe("enrichment.finished", worker_pool.mark_finished)
@@ -0,0 +1,143 @@
+import asyncio
+import json
+import os
+import threading
+from collections import Counter
+from datetime import datetime
+from typing import Any, Iterable, Optional, Set, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+import cluster
+
+QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "256"))
+HEARTBEAT_SECONDS = 15.0
+
+
+class EventBroker:
+    """
+    Publisher for dashboard events: every subscriber gets its own bounded queue.
+
+    publish() is safe to call from worker threads; it hands the event to the event loop,
+    and to the other workers over the cluster bus in multi-worker mode.
+    A subscriber that falls QUEUE_SIZE events behind is told to resync and dropped.
+    """
+
+    def __init__(self, queue_size: int = QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+
+    def stop(self):
+        for queue in list(self._subscribers):
+            self._close(queue)
+        self._loop = None
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+
+    def publish(self, event_type: str, data: Any):
+        if self._loop is None:
+            return # CLI scripts: nobody is listening in this process
+        message = format_sse(event_type, data) # encode once for every subscriber
+        cluster.bus.publish("sse", message)
+        if threading.get_ident() == self._loop_thread:
+            self._fan_out(message)
+        else:
+            self._loop.call_soon_threadsafe(self._fan_out, message)
+
+    def _fan_out(self, message: str):
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                self._close(queue)
+
+    def _close(self, queue: asyncio.Queue):
+        # Slow client: make room for a final resync notice and end its stream
+        self._subscribers.discard(queue)
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(format_sse("resync", {}))
+        queue.put_nowait(None)
+
+
+def format_sse(event_type: str, data: Any) -> str:
+    return f"event: {event_type}\ndata: {json.dumps(data, default=_json_default)}\n\n"
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if hasattr(value, "model_dump"):
+        return value.model_dump()
+    return str(value)
+
+
+broker = EventBroker()
+# Events published by other workers; the bus calls handlers on the event loop
+cluster.bus.subscribe("sse", broker._fan_out)
+
+
+# --- Metric deltas ---
+# rollups.apply_dimensions() records every counter change on the session; they are
+# published only once the transaction commits, so rolled-back writes never reach dashboards.
+
+def record_metric_changes(session: Session, dims_with_delta: Iterable[Tuple[Tuple, int]]):
+    changes: Counter = session.info.setdefault("metric_changes", Counter())
+    for (created_at, rating, sentiment, aspects), delta in dims_with_delta:
+        changes[(created_at.strftime("%Y-%m"), rating, sentiment, tuple(aspects))] += delta
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_metric_changes(session: Session):
+    changes = session.info.pop("metric_changes", None)
+    if not changes:
+        return
+    payload = [
+        {"month": month, "rating": rating, "sentiment": sentiment, "aspects": list(aspects), "delta": delta}
+        for (month, rating, sentiment, aspects), delta in changes.items()
+        if delta != 0
+    ]
+    if payload:
+        broker.publish("metrics.delta", {"changes": payload})
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_metric_changes(session: Session):
+    session.info.pop("metric_changes", None)
+
+
+async def sse_stream(is_disconnected):
+    """Yield SSE text for one subscriber until it disconnects or is dropped."""
+    # Subscribe once the response starts so an aborted request never leaves a queue behind
+    queue = broker.subscribe()
+    try:
+        yield "retry: 3000\n\n"
+        while True:
+            try:
+                message = await asyncio.wait_for(queue.get(), HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                if await is_disconnected():
+                    return
+                yield ": keep-alive\n\n"
+                continue
+            if message is None:
+                return
+            yield message
+    finally:
+        broker.unsubscribe(queue)
@@ -0,0 +1,135 @@
+import csv
+import io
+import json
+import os
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Sequence
+
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from database import async_engine
+from models import Review
+
+CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", "2000"))
+
+COLUMNS = [
+    Review.id, Review.createdAt, Review.rating, Review.content, Review.sentiment, Review.aspects,
+    Review.summary, Review.suggestedAction, Review.response, Review.enrichment_status,
+]
+FIELD_NAMES = [column.key for column in COLUMNS]
+
+FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+
+def iso_default(value: Any) -> Any:
+    # Timestamps as ISO-8601, the same as the JSON API, in every text format
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def text_row(row: Sequence[Any]) -> List[Any]:
+    return [value.isoformat() if isinstance(value, datetime) else value for value in row]
+
+
+def export_query():
+    # Same order as GET /reviews/ so an export matches what the dashboard lists
+    return select(*COLUMNS).order_by(Review.id.desc())
+
+
+async def stream_rows(query) -> AsyncIterator[Sequence[Sequence[Any]]]:
+    """Yield the query's rows CHUNK_ROWS at a time from a server-side cursor."""
+    # Own session: a dependency-provided one is closed before a streaming response is sent
+    async with AsyncSession(async_engine) as session:
+        result = await session.stream(query.execution_options(yield_per=CHUNK_ROWS))
+        async for chunk in result.partitions(CHUNK_ROWS):
+            yield chunk
+
+
+async def csv_chunks(query) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(FIELD_NAMES)
+    yield buffer.getvalue().encode("utf-8")
+    async for rows in stream_rows(query):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(text_row(row) for row in rows)
+        yield buffer.getvalue().encode("utf-8")
+
+
+async def ndjson_chunks(query) -> AsyncIterator[bytes]:
+    async for rows in stream_rows(query):
+        lines = [json.dumps(dict(zip(FIELD_NAMES, row)), ensure_ascii=False, default=iso_default) for row in rows]
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+class _ChunkSink:
+    """Write-only file object for ParquetWriter whose bytes are drained after every row group."""
+
+    def __init__(self):
+        self._parts: List[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def parquet_schema():
+    import pyarrow as pa
+    return pa.schema([
+        ("id", pa.int64()), ("createdAt", pa.timestamp("us")), ("rating", pa.int64()), ("content", pa.string()),
+        ("sentiment", pa.string()), ("aspects", pa.string()), ("summary", pa.string()),
+        ("suggestedAction", pa.string()), ("response", pa.string()), ("enrichment_status", pa.string()),
+    ])
+
+
+async def parquet_chunks(query) -> AsyncIterator[bytes]:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = parquet_schema()
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression="snappy")
+    try:
+        async for rows in stream_rows(query):
+            # One row group per chunk, so the client receives data while the export runs
+            columns: Dict[str, list] = {name: [row[i] for row in rows] for i, name in enumerate(FIELD_NAMES)}
+            writer.write_table(pa.Table.from_pydict(columns, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def parquet_available() -> bool:
+    try:
+        import pyarrow.parquet # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+CHUNK_WRITERS = {"csv": csv_chunks, "ndjson": ndjson_chunks, "parquet": parquet_chunks}
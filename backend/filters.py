@@ -0,0 +1,58 @@
+from datetime import datetime
+from typing import Optional, Tuple
+from sqlalchemy import false
+from models import Review
+import fulltext
+import aspects
+
+
+def month_range(month: str) -> Optional[Tuple[datetime, datetime]]:
+    """Half-open [first day, first day of next month) range for "YYYY-MM"; None if malformed."""
+    try:
+        start = datetime.strptime(month, "%Y-%m")
+    except ValueError:
+        return None
+    end = datetime(start.year + 1, 1, 1) if start.month == 12 else datetime(start.year, start.month + 1, 1)
+    return start, end
+
+
+def apply_review_filters(
+    query,
+    min_rating: Optional[int] = None,
+    search: Optional[str] = None,
+    month: Optional[str] = None,
+    sentiment: Optional[str] = None,
+    aspect: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    paged: bool = False,
+):
+    # Shared by /reviews/, /analytics/dashboard and /analytics/report so all three agree;
+    # paged=True for ordered, limited lists (see aspects.filter_by_aspect)
+    if min_rating:
+        query = query.where(Review.rating == min_rating)
+
+    if search:
+        query = fulltext.filter_matching(query, search)
+
+    if month:
+        # Range predicates on the bare column so the createdAt indexes apply
+        bounds = month_range(month)
+        if bounds is None:
+            query = query.where(false())
+        else:
+            query = query.where(Review.createdAt >= bounds[0]).where(Review.createdAt < bounds[1])
+
+    if start:
+        query = query.where(Review.createdAt >= start)
+
+    if end:
+        query = query.where(Review.createdAt < end)
+
+    if sentiment:
+        query = query.where(Review.sentiment == sentiment)
+
+    if aspect:
+        query = aspects.filter_by_aspect(query, aspect, paged)
+
+    return query
@@ -0,0 +1,76 @@
+import re
+from typing import Optional
+
+from sqlalchemy import column, false, table, text
+from sqlmodel import select
+from models import Review
+
+# Column weights for bm25(): matches in the review itself rank above the AI summary/reply
+BM25_WEIGHTS = (1.0, 0.5, 0.25)
+
+# External-content FTS5 index over the review text, kept in sync by triggers (migrations/0005_fulltext.py)
+review_fts = table("review_fts", column("rowid"))
+
+_TERM_RE = re.compile(r'"([^"]*)"|(\S+)')
+_WORD_RE = re.compile(r"\w+")
+
+
+def build_match_query(search: str) -> Optional[str]:
+    """
+    Translate user input into a safe FTS5 MATCH expression.
+
+    `"quoted text"` is a phrase, `word*` is a prefix query and every other word is a
+    plain token; all terms must match. Returns None when the input has no searchable words.
+    """
+    terms = []
+    for phrase, word in _TERM_RE.findall(search):
+        if phrase:
+            words = _WORD_RE.findall(phrase)
+            if words:
+                terms.append('"' + " ".join(words) + '"')
+            continue
+
+        is_prefix = word.endswith("*")
+        words = _WORD_RE.findall(word)
+        if not words:
+            continue
+        if len(words) > 1:
+            # "wi-fi" / "don't" -> adjacent tokens, same as the tokenizer sees them
+            term = '"' + " ".join(words) + '"'
+        else:
+            term = '"' + words[0] + '"'
+        terms.append(term + "*" if is_prefix else term)
+
+    if not terms:
+        return None
+    return " AND ".join(terms)
+
+
+def _match(match_query: str):
+    return text("review_fts MATCH :fts_query").bindparams(fts_query=match_query)
+
+
+def filter_matching(query, search: str):
+    match_query = build_match_query(search)
+    if match_query is None:
+        # Blank input is no search at all; punctuation-only input ('"', '--') matches nothing
+        return query if not search.strip() else query.where(false())
+    return query.where(Review.id.in_(select_matching_ids(match_query)))
+
+
+def select_matching_ids(match_query: str):
+    return select(review_fts.c.rowid).where(_match(match_query))
+
+
+def order_by_relevance(query, search: str):
+    """Restrict to matches and order by BM25 score (best first), newest first on ties."""
+    match_query = build_match_query(search)
+    if match_query is None:
+        query = query if not search.strip() else query.where(false())
+        return query.order_by(Review.id.desc())
+    weights = ", ".join(str(w) for w in BM25_WEIGHTS)
+    return (
+        query.join(review_fts, review_fts.c.rowid == Review.id)
+        .where(_match(match_query))
+        .order_by(text(f"bm25(review_fts, {weights})"), Review.id.desc())
+    )
@@ -0,0 +1,248 @@
+import codecs
+import csv
+import json
+import os
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlmodel import Session, text
+from models import Review, ReviewCreate, EnrichmentJob
+import rollups
+import data_version
+from llm_service import SENTIMENTS
+from classifier import fast_classifier, MIN_CONFIDENCE
+
+BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "1000"))
+MAX_REPORTED_ERRORS = 1000 # keep the error report (and memory) bounded on bad files
+READ_CHUNK_BYTES = 64 * 1024
+
+FORMATS = ("csv", "ndjson")
+# How imported rows get their AI fields:
+#   backfill - marked "deferred" and picked up by `python backfill.py` (batched LLM calls)
+#   queue    - an enrichment_job per row, drained by the app's worker pool
+#   classify - local classifier labels only; rows below CLASSIFIER_MIN_CONFIDENCE also get an enrichment_job
+#   none     - left as-is
+# Except with "none", rows without a sentiment get instant classifier labels that the LLM later replaces.
+ENRICH_MODES = ("backfill", "queue", "classify", "none")
+
+# Column names used by the Yelp export the seed scripts read
+COLUMN_ALIASES = {"stars": "rating", "text": "content", "date": "createdAt"}
+
+INSERT_ASPECTS_SQL = text("INSERT OR IGNORE INTO review_aspect (review_id, aspect) VALUES (:review_id, :aspect)")
+
+RowResult = Union[Dict[str, Any], Exception]
+
+
+def format_from_content_type(content_type: Optional[str]) -> Optional[str]:
+    content_type = (content_type or "").split(";")[0].strip().lower()
+    if content_type in ("text/csv", "application/csv"):
+        return "csv"
+    if content_type in ("application/x-ndjson", "application/ndjson", "application/jsonl", "application/json-lines"):
+        return "ndjson"
+    return None
+
+
+class StreamParser:
+    """
+    Incremental CSV / NDJSON parser: feed() raw byte chunks, get (row number, dict or error) back.
+
+    Only the current line (or multi-line quoted CSV record) is kept in memory.
+    """
+
+    def __init__(self, fmt: str):
+        self.fmt = fmt
+        self._decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+        self._buffer = ""
+        self._record = None # CSV record spanning several lines (open quote)
+        self._header: Optional[List[str]] = None
+        self.row_number = 0
+
+    def feed(self, chunk: bytes) -> Iterator[Tuple[int, RowResult]]:
+        self._buffer += self._decoder.decode(chunk)
+        *lines, self._buffer = self._buffer.split("\n")
+        for line in lines:
+            yield from self._line(line.rstrip("\r"))
+
+    def finish(self) -> Iterator[Tuple[int, RowResult]]:
+        self._buffer += self._decoder.decode(b"", final=True)
+        if self._buffer:
+            yield from self._line(self._buffer.rstrip("\r"))
+            self._buffer = ""
+        if self._record is not None:
+            self.row_number += 1
+            self._record = None
+            yield self.row_number, ValueError("unterminated quoted field at end of input")
+
+    def _line(self, line: str) -> Iterator[Tuple[int, RowResult]]:
+        if self.fmt == "ndjson":
+            if not line.strip():
+                return
+            self.row_number += 1
+            try:
+                row = json.loads(line)
+                if not isinstance(row, dict):
+                    raise ValueError("expected a JSON object per line")
+            except ValueError as e:
+                yield self.row_number, e
+                return
+            yield self.row_number, row
+            return
+
+        # CSV: a quoted field may contain newlines, so a record ends only when its quotes balance
+        record = line if self._record is None else f"{self._record}\n{line}"
+        if record.count('"') % 2 == 1:
+            self._record = record
+            return
+        self._record = None
+        if not record.strip():
+            return
+
+        try:
+            fields = next(csv.reader([record]))
+        except csv.Error as e:
+            self.row_number += 1
+            yield self.row_number, e
+            return
+
+        if self._header is None:
+            self._header = [COLUMN_ALIASES.get(name.strip(), name.strip()) for name in fields]
+            return
+
+        self.row_number += 1
+        if len(fields) != len(self._header):
+            yield self.row_number, ValueError(f"expected {len(self._header)} fields, got {len(fields)}")
+            return
+        # Empty CSV cells mean "not set"
+        yield self.row_number, {name: value for name, value in zip(self._header, fields) if value != ""}
+
+
+def validate_row(raw: Dict[str, Any]) -> Dict[str, Any]:
+    """Validate against ReviewCreate; returns the column values to insert or raises ValueError."""
+    raw = {COLUMN_ALIASES.get(key, key): value for key, value in raw.items()}
+    if isinstance(raw.get("aspects"), list):
+        raw["aspects"] = json.dumps(raw["aspects"])
+    try:
+        review = ReviewCreate.model_validate(raw)
+    except ValidationError as e:
+        raise ValueError("; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())) from e
+    if not 1 <= review.rating <= 5:
+        raise ValueError("rating: must be between 1 and 5")
+    if not review.content.strip():
+        raise ValueError("content: must not be empty")
+    if review.sentiment is not None and review.sentiment not in SENTIMENTS:
+        raise ValueError(f"sentiment: must be one of {', '.join(SENTIMENTS)}")
+
+    values = review.model_dump()
+    if values["createdAt"] is None:
+        values["createdAt"] = datetime.utcnow()
+    return values
+
+
+def insert_batch(session: Session, rows: List[Dict[str, Any]], enrich: str = "backfill") -> int:
+    """Insert validated rows with executemany-style statements; the caller commits."""
+    status = {"backfill": "deferred", "queue": "pending", "classify": "classified", "none": None}[enrich]
+    for row in rows:
+        # Historical rows that already carry AI fields need no enrichment
+        row["enrichment_status"] = "done" if row.get("summary") and row.get("sentiment") else status
+
+    unlabelled = [row for row in rows if row.get("sentiment") is None] if enrich != "none" else []
+    if unlabelled:
+        # One vectorized call for the whole batch
+        predictions = fast_classifier.classify([row["rating"] for row in unlabelled], [row["content"] for row in unlabelled])
+        for row, prediction in zip(unlabelled, predictions):
+            row["sentiment"] = prediction["sentiment"]
+            row["aspects"] = json.dumps(prediction["aspects"])
+            if enrich == "classify" and prediction["confidence"] < MIN_CONFIDENCE:
+                row["enrichment_status"] = "pending"
+
+    ids = session.execute(
+        insert(Review).returning(Review.id, sort_by_parameter_order=True), rows
+    ).scalars().all()
+
+    aspect_params = []
+    dimensions = []
+    for review_id, row in zip(ids, rows):
+        review = Review(id=review_id, **row)
+        dims = rollups.review_dimensions(review)
+        dimensions.append((dims, 1))
+        aspect_params.extend({"review_id": review_id, "aspect": aspect} for aspect in dims[3])
+    if aspect_params:
+        session.exec(INSERT_ASPECTS_SQL, params=aspect_params)
+    rollups.apply_dimensions(session, dimensions)
+    data_version.bump(session) # Core INSERTs bypass the flush listener
+
+    if enrich in ("queue", "classify"):
+        now = datetime.utcnow()
+        jobs = [
+            {"review_id": review_id, "status": "pending", "attempts": 0,
+             "next_attempt_at": now, "created_at": now, "updated_at": now}
+            for review_id, row in zip(ids, rows)
+            if row["enrichment_status"] == "pending"
+        ]
+        if jobs:
+            session.execute(insert(EnrichmentJob), jobs)
+    return len(ids)
+
+
+class IngestReport:
+    def __init__(self):
+        self.inserted = 0
+        self.failed = 0
+        self.errors: List[Dict[str, Any]] = []
+
+    def add_error(self, row_number: int, error: Exception):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row_number, "error": str(error)})
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "inserted": self.inserted,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+        }
+
+
+def collect(parsed: Iterator[Tuple[int, RowResult]], pending: List[Dict[str, Any]], report: IngestReport):
+    # Validated rows go into `pending`, bad ones into the report
+    for row_number, row in parsed:
+        if isinstance(row, Exception):
+            report.add_error(row_number, row)
+            continue
+        try:
+            pending.append(validate_row(row))
+        except ValueError as e:
+            report.add_error(row_number, e)
+
+
+def take_batches(pending: List[Dict[str, Any]], batch_size: int, final: bool = False) -> List[List[Dict[str, Any]]]:
+    """Remove and return the full batches from `pending` (and the remainder when final)."""
+    cut = len(pending) if final else len(pending) - len(pending) % batch_size
+    ready = [pending[i:i + batch_size] for i in range(0, cut, batch_size)]
+    del pending[:cut]
+    return ready
+
+
+def ingest_file(session: Session, path: str, fmt: str, batch_size: int = BATCH_SIZE, enrich: str = "backfill", progress=None) -> IngestReport:
+    """Stream a file from disk into the review table, one transaction per batch."""
+    parser = StreamParser(fmt)
+    report = IngestReport()
+    pending: List[Dict[str, Any]] = []
+
+    def flush(final: bool = False):
+        for batch in take_batches(pending, batch_size, final):
+            report.inserted += insert_batch(session, batch, enrich)
+            session.commit()
+            if progress:
+                progress(report)
+
+    with open(path, "rb") as f:
+        while chunk := f.read(READ_CHUNK_BYTES):
+            collect(parser.feed(chunk), pending, report)
+            flush()
+    collect(parser.finish(), pending, report)
+    flush(final=True)
+    return report
@@ -0,0 +1,159 @@
+import asyncio
+import contextvars
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlmodel import Session, select, func
+from sqlmodel.ext.asyncio.session import AsyncSession
+from database import engine
+from models import Review, InsightSnapshot
+import llm_service
+import summarizer
+import cluster
+from events import broker
+
+# New reviews refresh the insight at most this often; a new day always does
+MIN_REFRESH_SECONDS = int(os.getenv("INSIGHT_MIN_REFRESH_SECONDS", "300"))
+RETRY_AFTER_FAILURE_SECONDS = 60
+REFRESH_REQUEST_SECONDS = 10
+
+
+def weekly_window(now: Optional[datetime] = None):
+    # Day-aligned so the window (and the prompt) only changes once per day
+    now = now or datetime.utcnow()
+    window_end = datetime(now.year, now.month, now.day) + timedelta(days=1)
+    return window_end - timedelta(days=7), window_end
+
+
+def review_lines(session: Session, start: datetime, end: datetime) -> List[summarizer.Item]:
+    # Id order keeps summarizer chunks stable as the week fills up
+    rows = session.exec(
+        select(Review.id, Review.createdAt, Review.rating, Review.content)
+        .where(Review.createdAt >= start).where(Review.createdAt < end)
+        .order_by(Review.id)
+    ).all()
+    return [(review_id, f"- {created_at:%Y-%m-%d} {rating}/5: {content}") for review_id, created_at, rating, content in rows]
+
+
+class WeeklyInsightService:
+    """
+    Serves the weekly insight from storage (stale-while-revalidate).
+
+    Reads never wait on the LLM: a stale snapshot is returned as-is and a single
+    background task regenerates it (its blocking DB work runs in a thread).
+    """
+    kind = "weekly"
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self._failed_at: Optional[datetime] = None
+        self._requested_at = float("-inf")
+
+    @property
+    def refreshing(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def get(self, session: AsyncSession) -> Dict[str, Any]:
+        snapshot = (await session.exec(select(InsightSnapshot).where(InsightSnapshot.kind == self.kind))).first()
+        stale = await self.is_stale(session, snapshot)
+        if stale:
+            self.schedule_refresh()
+
+        if snapshot is None:
+            # Nothing stored yet: the first generation is running (here, or on the leader when this worker
+            # is not it) unless it failed here. Report it as refreshing so the dashboard keeps polling
+            if self._failed_at is not None and not self.refreshing:
+                return {"summary": "Could not generate insight.", "generated_at": None, "stale": True, "refreshing": False}
+            return {"summary": None, "generated_at": None, "stale": True, "refreshing": True}
+        return {
+            "summary": snapshot.summary,
+            "generated_at": snapshot.generated_at,
+            "stale": stale,
+            "refreshing": self.refreshing,
+        }
+
+    async def is_stale(self, session: AsyncSession, snapshot: Optional[InsightSnapshot]) -> bool:
+        if snapshot is None:
+            return True
+        _, window_end = weekly_window()
+        if snapshot.window_end != window_end:
+            return True # the window rolled over
+        high_water = (await session.exec(select(func.max(Review.id)))).one() or 0
+        if high_water <= snapshot.high_water_id:
+            return False
+        return datetime.utcnow() - snapshot.generated_at >= timedelta(seconds=MIN_REFRESH_SECONDS)
+
+    def schedule_refresh(self):
+        if not cluster.leader.is_leader:
+            # Only the cluster leader regenerates; other workers ask it, at most every few seconds
+            if time.monotonic() - self._requested_at >= REFRESH_REQUEST_SECONDS:
+                self._requested_at = time.monotonic()
+                cluster.bus.publish("insight.refresh", None)
+            return
+        if self.refreshing or not llm_service.API_KEY:
+            return
+        # Back off after a failed attempt instead of calling the LLM on every dashboard load
+        if self._failed_at and datetime.utcnow() - self._failed_at < timedelta(seconds=RETRY_AFTER_FAILURE_SECONDS):
+            return
+        # Fresh context: the refresh outlives the request that triggered it, so its SQL isn't billed to that route
+        self._task = asyncio.create_task(self.regenerate(), context=contextvars.Context())
+
+    async def regenerate(self):
+        window_start, window_end = weekly_window()
+        high_water, current_lines, prev_lines = await asyncio.to_thread(self._load_texts, window_start, window_end)
+
+        try:
+            # Each week gets half of the prompt; chunk summaries from the last run are reused
+            current_text, prev_text = await asyncio.gather(
+                summarizer.condense(current_lines, summarizer.INPUT_TOKENS // 2),
+                summarizer.condense(prev_lines, summarizer.INPUT_TOKENS // 2),
+            )
+            summary = await llm_service.generate_weekly_insight(current_text, prev_text)
+        except Exception as e:
+            print(f"Weekly insight generation failed: {e}")
+            self._failed_at = datetime.utcnow()
+            return
+        self._failed_at = None
+        await asyncio.to_thread(self._store, window_start, window_end, high_water, summary)
+
+    def _load_texts(self, window_start: datetime, window_end: datetime):
+        prev_start = window_start - timedelta(days=7)
+        with Session(engine) as session:
+            high_water = session.exec(select(func.max(Review.id))).one() or 0
+            current_lines = review_lines(session, window_start, window_end)
+            prev_lines = review_lines(session, prev_start, window_start)
+        return high_water, current_lines, prev_lines
+
+    def _store(self, window_start: datetime, window_end: datetime, high_water: int, summary: str):
+        with Session(engine) as session:
+            snapshot = session.exec(select(InsightSnapshot).where(InsightSnapshot.kind == self.kind)).first()
+            if snapshot is None:
+                snapshot = InsightSnapshot(kind=self.kind, window_start=window_start, window_end=window_end, summary=summary)
+            snapshot.window_start = window_start
+            snapshot.window_end = window_end
+            snapshot.high_water_id = high_water
+            snapshot.summary = summary
+            snapshot.generated_at = datetime.utcnow()
+            session.add(snapshot)
+            session.commit()
+            broker.publish("insight.updated", {
+                "summary": summary,
+                "generated_at": snapshot.generated_at,
+                "stale": False,
+                "refreshing": False,
+            })
+
+    def _on_refresh_requested(self, _):
+        if cluster.leader.is_leader:
+            self.schedule_refresh()
+
+    async def stop(self):
+        if self.refreshing:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+
+weekly_insight = WeeklyInsightService()
+cluster.bus.subscribe("insight.refresh", weekly_insight._on_refresh_requested)
@@ -0,0 +1,186 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+CACHE_PATH = os.getenv("LLM_CACHE_PATH", "llm_cache.db")
+MEMORY_ITEMS = int(os.getenv("LLM_CACHE_MEMORY_ITEMS", "2048"))
+MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "100000"))
+TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(30 * 24 * 3600)))
+EVICT_EVERY = 500 # writes between persistent-tier eviction sweeps
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_TRAILING_PUNCT_RE = re.compile(r"[\s.!?]+$")
+
+
+def normalize_text(text: str) -> str:
+    # "Great service!" and "great  service!!" should share one cache entry
+    text = _WHITESPACE_RE.sub(" ", text.casefold()).strip()
+    return _TRAILING_PUNCT_RE.sub("", text)
+
+
+def make_key(*parts: Any) -> str:
+    """Content address for an LLM call: hash of (prompt version, model, inputs...)."""
+    payload = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    Two-tier cache for LLM results: in-process LRU in front of a SQLite table with TTL.
+
+    The async methods answer memory hits on the event loop and run SQLite work in a thread;
+    get()/set() are the blocking equivalents for scripts and threads.
+    """
+
+    def __init__(self, path: str = CACHE_PATH, memory_items: int = MEMORY_ITEMS,
+                 max_entries: int = MAX_ENTRIES, ttl_seconds: int = TTL_SECONDS):
+        self.path = path
+        self.memory_items = memory_items
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock() # the memory tier; never held across SQLite work
+        self._db_lock = threading.Lock() # the shared SQLite connection
+        self._conn: Optional[sqlite3.Connection] = None
+        self._writes = 0
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ix_llm_cache_last_access ON llm_cache (last_access)")
+        return self._conn
+
+    def _memory_get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None or entry[1] <= time.time():
+                return None
+            self._memory.move_to_end(key)
+            self.memory_hits += 1
+            return entry[0]
+
+    def _disk_get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._db_lock:
+            row = self._db().execute("SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None or row[1] <= now:
+                self.misses += 1
+                return None
+            self._db().execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+            self.disk_hits += 1
+        value = json.loads(row[0])
+        self._remember(key, value, row[1])
+        return value
+
+    def _disk_set(self, key: str, value: Any, expires_at: float):
+        now = time.time()
+        with self._db_lock:
+            self._db().execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, expires_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), expires_at, now),
+            )
+            self._writes += 1
+            if self._writes % EVICT_EVERY == 0:
+                self._evict(now)
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self._memory_get(key)
+        return value if value is not None else self._disk_get(key)
+
+    def set(self, key: str, value: Any):
+        expires_at = time.time() + self.ttl_seconds
+        self._remember(key, value, expires_at)
+        self._disk_set(key, value, expires_at)
+
+    async def lookup(self, key: str) -> Optional[Any]:
+        value = self._memory_get(key)
+        return value if value is not None else await asyncio.to_thread(self._disk_get, key)
+
+    async def store(self, key: str, value: Any):
+        # Served from memory at once; the SQLite write follows in a thread
+        expires_at = time.time() + self.ttl_seconds
+        self._remember(key, value, expires_at)
+        await asyncio.to_thread(self._disk_set, key, value, expires_at)
+
+    def _remember(self, key: str, value: Any, expires_at: float):
+        with self._lock:
+            self._memory[key] = (value, expires_at)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    def _evict(self, now: float):
+        db = self._db()
+        db.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (now,))
+        (count,) = db.execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+        if count > self.max_entries:
+            # Least recently used rows go first
+            db.execute(
+                "DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache ORDER BY last_access LIMIT ?)",
+                (count - self.max_entries,),
+            )
+
+    async def get_or_compute(self, key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """Return the cached value or compute it once; concurrent callers for a key share the call."""
+        value = await self.lookup(key)
+        if value is not None:
+            return value
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await compute()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception() # mark retrieved when nobody else was waiting
+            raise
+        else:
+            future.set_result(value)
+            await self.store(key, value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        with self._db_lock:
+            disk_items = self._db().execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        memory_items = len(self._memory)
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            "memory_items": memory_items,
+            "disk_items": disk_items,
+        }
+
+
+llm_cache = LLMCache()
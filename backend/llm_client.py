@@ -0,0 +1,188 @@
+import asyncio
+import os
+import random
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+import metrics
+
+# Any OpenAI-compatible endpoint works, e.g. a local fake server for tests and benchmarks
+BASE_URL = os.getenv("GROQ_BASE_URL", "https://api.groq.com/openai/v1")
+MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "30"))
+MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+BACKOFF_BASE_SECONDS = float(os.getenv("LLM_BACKOFF_SECONDS", "0.5"))
+BACKOFF_MAX_SECONDS = 8.0
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class LLMError(Exception):
+    """The LLM call failed; `retryable` is False when retrying cannot help (e.g. no API key)."""
+    def __init__(self, message: str, retryable: bool = True, reason: str = "error"):
+        super().__init__(message)
+        self.retryable = retryable
+        self.reason = reason # short, fixed-vocabulary label for metrics
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failed calls and rejects calls for
+    `reset_seconds`; then lets a single trial call through (half-open) to decide.
+    """
+    def __init__(self, failure_threshold: int = BREAKER_FAILURE_THRESHOLD, reset_seconds: float = BREAKER_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self._trial_in_flight or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+        self._trial_in_flight = False
+
+    def end_trial(self):
+        # The trial call ended without a verdict (cancelled): let the next call be the trial
+        self._trial_in_flight = False
+
+
+def backoff_delay(attempt: int, retry_after: Optional[str] = None) -> float:
+    if retry_after:
+        try:
+            return min(float(retry_after), BACKOFF_MAX_SECONDS)
+        except ValueError:
+            pass
+    # Exponential backoff with full jitter
+    return random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** attempt)))
+
+
+class LLMClient:
+    """Shared async chat-completions client: one pooled HTTP connection set for the whole app."""
+
+    def __init__(self, base_url: str = BASE_URL, api_key: Optional[str] = None,
+                 max_concurrency: int = MAX_CONCURRENCY, timeout: float = TIMEOUT_SECONDS,
+                 max_retries: int = MAX_RETRIES):
+        self.base_url = base_url
+        self.api_key = api_key
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.breaker = CircuitBreaker()
+        self._http: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def start(self):
+        if self._http is not None:
+            return
+        api_key = self.api_key or os.getenv("GROQ_API_KEY") or ""
+        self._http = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers={"Authorization": f"Bearer {api_key}"},
+            timeout=httpx.Timeout(self.timeout),
+            limits=httpx.Limits(max_connections=self.max_concurrency, max_keepalive_connections=self.max_concurrency),
+        )
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    async def close(self):
+        if self._http is not None:
+            await self._http.aclose()
+        self._http = None
+        self._semaphore = None
+
+    async def chat(self, messages: List[Dict[str, str]], model: str, **options: Any) -> Tuple[str, Dict[str, Any]]:
+        """POST /chat/completions; returns (message content, usage). Raises LLMError."""
+        started = time.perf_counter()
+        try:
+            content, usage = await self._chat(messages, model, **options)
+        except LLMError as e:
+            metrics.llm_duration.observe(time.perf_counter() - started, "error")
+            metrics.llm_errors.inc(e.reason)
+            raise
+        metrics.llm_duration.observe(time.perf_counter() - started, "ok")
+        for kind in ("prompt_tokens", "completion_tokens"):
+            if isinstance(usage.get(kind), int):
+                metrics.llm_tokens.inc(kind.split("_")[0], amount=usage[kind])
+        return content, usage
+
+    async def _chat(self, messages: List[Dict[str, str]], model: str, **options: Any) -> Tuple[str, Dict[str, Any]]:
+        if self._http is None:
+            # CLI scripts use the client without the app lifespan
+            await self.start()
+
+        trial = self.breaker.state == "half_open"
+        if not self.breaker.allow():
+            raise LLMError("LLM provider circuit open, failing fast", reason="circuit_open")
+        try:
+            return await self._attempts({"model": model, "messages": messages, **options})
+        finally:
+            if trial:
+                self.breaker.end_trial() # no-op once the trial recorded success or failure
+
+    async def _attempts(self, payload: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+        last_error = "LLM request failed"
+        last_reason = "error"
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            # Hold a concurrency slot for the request only, not while backing off
+            async with self._semaphore:
+                try:
+                    response = await self._http.post("/chat/completions", json=payload)
+                except (httpx.TimeoutException, httpx.TransportError) as e:
+                    response = None
+                    last_error = f"{type(e).__name__}: {e}"
+                    last_reason = "timeout" if isinstance(e, httpx.TimeoutException) else "transport"
+
+            if response is not None:
+                if response.status_code < 400:
+                    try:
+                        data = response.json()
+                        content = data["choices"][0]["message"]["content"]
+                    except (ValueError, KeyError, IndexError, TypeError) as e:
+                        self.breaker.record_failure()
+                        raise LLMError(f"Malformed completion response: {e}", reason="malformed")
+                    self.breaker.record_success()
+                    return content, data.get("usage") or {}
+
+                last_error = f"HTTP {response.status_code}: {response.text[:200]}"
+                last_reason = f"http_{response.status_code}"
+                if response.status_code not in RETRYABLE_STATUS:
+                    # 4xx other than 429 (bad key, bad request): the provider is up, retrying won't help
+                    self.breaker.record_success()
+                    raise LLMError(last_error, retryable=False, reason=last_reason)
+                retry_after = response.headers.get("retry-after")
+
+            if attempt < self.max_retries:
+                await asyncio.sleep(backoff_delay(attempt, retry_after))
+
+        self.breaker.record_failure()
+        raise LLMError(last_error, reason=last_reason)
+
+
+llm_client = LLMClient()
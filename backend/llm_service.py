@@ -1,21 +1,77 @@
-from groq import Groq
+import asyncio
 import os
 import json
-from typing import Dict, Any
+from typing import Dict, Any, List, Tuple, Optional, Callable, Awaitable
+from llm_cache import llm_cache, make_key, normalize_text
+from llm_client import llm_client, LLMError
+from classifier import fast_classifier
+import metrics
 
 API_KEY = os.getenv("GROQ_API_KEY")
+MODEL = "llama-3.3-70b-versatile"
 
-async def process_review_with_llm(rating: int, text: str) -> Dict[str, str]:
+# Bump a version whenever its prompt changes so cached results from the old prompt are ignored
+REVIEW_PROMPT_VERSION = "review-enrichment-v1"
+WEEKLY_INSIGHT_PROMPT_VERSION = "weekly-insight-v2"
+MONTHLY_REPORT_PROMPT_VERSION = "monthly-report-v2"
+SUMMARY_CHUNK_PROMPT_VERSION = "summary-chunk-v1"
+
+# Batch enrichment limits: rough token budget for the reviews packed into one prompt
+BATCH_TOKEN_BUDGET = int(os.getenv("LLM_BATCH_TOKEN_BUDGET", "3000"))
+BATCH_MAX_ITEMS = int(os.getenv("LLM_BATCH_MAX_ITEMS", "20"))
+BATCH_RETRIES = 2
+
+SENTIMENTS = ("Positive", "Neutral", "Negative")
+
+MISSING_KEY_RESULT = {
+    "summary": "AI Summary Unavailable (Missing Key)",
+    "suggestedAction": "Check manually",
+    "response": "Thank you for your feedback."
+}
+
+ERROR_RESULT = {
+    "summary": "Error processing review",
+    "suggestedAction": "Manual review required",
+    "response": "Thank you for your review (System Error)."
+}
+
+async def _chat(prompt: str, temperature: Optional[float] = 0.5, json_mode: bool = True):
     if not API_KEY:
-        print("GROQ_API_KEY not found. Returning fallback AI response.")
-        return {
-            "summary": "AI Summary Unavailable (Missing Key)",
-            "suggestedAction": "Check manually",
-            "response": "Thank you for your feedback."
-        }
-
-    client = Groq(api_key=API_KEY)
-    
+        raise LLMError("GROQ_API_KEY not found", retryable=False, reason="missing_key")
+
+    options = {"response_format": {"type": "json_object"}} if json_mode else {} # Force JSON mode
+    if temperature is not None:
+        options["temperature"] = temperature
+
+    content, _usage = await llm_client.chat(
+        [
+            {
+                "role": "user",
+                "content": prompt,
+            }
+        ],
+        model=MODEL,
+        **options
+    )
+    if not json_mode:
+        return content
+
+    try:
+        result = json.loads(content)
+    except ValueError as e:
+        raise LLMError(f"LLM returned invalid JSON: {e}", reason="invalid_json") from e
+    if not isinstance(result, dict):
+        raise LLMError("LLM returned JSON that is not an object", reason="invalid_json")
+    return result
+
+async def _chat_json(prompt: str, temperature: Optional[float] = 0.5) -> Dict[str, Any]:
+    return await _chat(prompt, temperature, json_mode=True)
+
+def review_cache_key(rating: int, text: str) -> str:
+    return make_key(REVIEW_PROMPT_VERSION, MODEL, rating, normalize_text(text))
+
+async def enrich_review(rating: int, text: str) -> Dict[str, Any]:
+    # Raises LLMError instead of returning a fallback, so callers can decide whether to retry
     prompt = f"""
     You are a helpful assistant for a business.
     A user has left a review with rating {rating}/5 and text: "{text}".
@@ -29,27 +85,207 @@ async def process_review_with_llm(rating: int, text: str) -> Dict[str, str]:
 
     Return ONLY the valid JSON, no markdown formatting.
     """
+    async def compute():
+        # Validated before it is cached: the batch path reads the same keys
+        result = validate_enrichment(await _chat_json(prompt))
+        if result is None:
+            raise LLMError("LLM returned a malformed enrichment", retryable=True, reason="invalid_result")
+        return result
 
+    # Identical (or trivially different) reviews reuse an earlier result
+    return await llm_cache.get_or_compute(review_cache_key(rating, text), compute)
+
+def fallback_result(rating: int, text: str, error: LLMError) -> Dict[str, Any]:
+    # Placeholder text, but real sentiment/aspects from the local classifier so the review stays filterable
+    labels = fast_classifier.labels(rating, text)
+    base = MISSING_KEY_RESULT if error.reason == "missing_key" else ERROR_RESULT
+    return {**base, "sentiment": labels["sentiment"], "aspects": labels["aspects"]}
+
+async def process_review_with_llm(rating: int, text: str) -> Dict[str, str]:
     try:
-        chat_completion = client.chat.completions.create(
-            messages=[
-                {
-                    "role": "user",
-                    "content": prompt,
-                }
-            ],
-            model="llama-3.3-70b-versatile",
-            temperature=0.5,
-            response_format={"type": "json_object"} # Force JSON mode
-        )
-
-        content = chat_completion.choices[0].message.content
-        return json.loads(content)
-
-    except Exception as e:
-        print(f"LLM Error: {e}")
-        return {
-            "summary": "Error processing review",
-            "suggestedAction": "Manual review required",
-            "response": "Thank you for your review (System Error)."
-        }
+        return await enrich_review(rating, text)
+    except LLMError as e:
+        metrics.llm_fallbacks.inc(e.reason)
+        if e.reason == "missing_key":
+            print("GROQ_API_KEY not found. Returning fallback AI response.")
+        else:
+            print(f"LLM Error: {e}")
+        return fallback_result(rating, text, e)
+
+# --- Batch enrichment ---
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token is close enough for packing prompts
+    return len(text) // 4 + 1
+
+def pack_batches(items: List[Tuple[int, int, str]], token_budget: int = BATCH_TOKEN_BUDGET, max_items: int = BATCH_MAX_ITEMS):
+    """Greedily group (id, rating, text) items so each group fits the prompt token budget."""
+    batches, current, used = [], [], 0
+    for item in items:
+        cost = estimate_tokens(item[2]) + 20 # per-item JSON framing
+        if current and (used + cost > token_budget or len(current) >= max_items):
+            batches.append(current)
+            current, used = [], 0
+        current.append(item)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+def validate_enrichment(result: Any) -> Optional[Dict[str, Any]]:
+    if not isinstance(result, dict):
+        return None
+    for field in ("summary", "suggestedAction", "response"):
+        if not isinstance(result.get(field), str) or not result[field].strip():
+            return None
+    if result.get("sentiment") not in SENTIMENTS:
+        return None
+    aspects = result.get("aspects", [])
+    if not isinstance(aspects, list) or not all(isinstance(a, str) for a in aspects):
+        return None
+    return {
+        "summary": result["summary"],
+        "suggestedAction": result["suggestedAction"],
+        "response": result["response"],
+        "sentiment": result["sentiment"],
+        "aspects": aspects,
+    }
+
+async def _enrich_batch_once(batch: List[Tuple[int, int, str]]) -> Dict[int, Dict[str, Any]]:
+    reviews_json = json.dumps([{"id": i, "rating": r, "text": t} for i, r, t in batch], ensure_ascii=False)
+    prompt = f"""
+    You are a helpful assistant for a business.
+    Below is a JSON list of customer reviews, each with an "id", a "rating" out of 5 and a "text".
+
+    {reviews_json}
+
+    Return a JSON object {{"results": [...]}} with exactly one entry per review, each containing:
+    1. "id": The id of the review, unchanged.
+    2. "summary": A concise summary of the review (max 15 words).
+    3. "suggestedAction": A recommended short action for the admin (max 10 words).
+    4. "response": A polite, professional response to the user.
+    5. "sentiment": One of "Positive", "Neutral", "Negative".
+    6. "aspects": A JSON list of relevant aspects mentioned (e.g., ["Service", "Food", "Ambience", "Time", "Price"]). return [] if none.
+
+    Return ONLY the valid JSON, no markdown formatting.
+    """
+    data = await _chat_json(prompt)
+
+    wanted = {item[0] for item in batch}
+    results = {}
+    for entry in data.get("results", []) if isinstance(data.get("results"), list) else []:
+        if not isinstance(entry, dict):
+            continue
+        try:
+            review_id = int(entry.get("id"))
+        except (TypeError, ValueError):
+            continue
+        valid = validate_enrichment(entry)
+        if review_id in wanted and valid is not None:
+            results[review_id] = valid
+    return results
+
+async def enrich_reviews_batch(
+    items: List[Tuple[int, int, str]],
+    token_budget: int = BATCH_TOKEN_BUDGET,
+    max_concurrency: int = 4,
+    before_call: Optional[Callable[[], Awaitable[None]]] = None,
+) -> Tuple[Dict[int, Dict[str, Any]], Dict[int, str]]:
+    """
+    Enrich many (id, rating, text) reviews with as few LLM calls as possible.
+
+    Items are packed into prompts up to `token_budget`. Items missing or invalid in a
+    response are re-split into halves and retried, down to single-item calls.
+    At most `max_concurrency` requests are in flight; `before_call` is awaited before
+    every request (used for rate limiting). Returns (results by id, error message by id).
+    """
+    results: Dict[int, Dict[str, Any]] = {}
+    errors: Dict[int, str] = {}
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    keys = {item[0]: review_cache_key(item[1], item[2]) for item in items}
+    uncached = []
+    for item in items:
+        cached = validate_enrichment(await llm_cache.lookup(keys[item[0]]))
+        if cached is not None:
+            results[item[0]] = cached
+        else:
+            uncached.append(item)
+
+    async def run(batch, retries_left):
+        try:
+            async with semaphore:
+                if before_call is not None:
+                    await before_call()
+                batch_results = await _enrich_batch_once(batch)
+        except LLMError as e:
+            if e.retryable and retries_left > 0:
+                await run(batch, retries_left - 1)
+            else:
+                for item in batch:
+                    errors[item[0]] = str(e)
+            return
+
+        for review_id, result in batch_results.items():
+            await llm_cache.store(keys[review_id], result)
+        results.update(batch_results)
+        remaining = [item for item in batch if item[0] not in batch_results]
+        if len(remaining) > 1:
+            # Retry only the failed items, in halves so one bad review can't sink the rest
+            middle = len(remaining) // 2
+            await asyncio.gather(run(remaining[:middle], BATCH_RETRIES), run(remaining[middle:], BATCH_RETRIES))
+        elif remaining and retries_left > 0:
+            await run(remaining, retries_left - 1)
+        elif remaining:
+            errors[remaining[0][0]] = "missing or invalid result in batch response"
+
+    await asyncio.gather(*(run(batch, BATCH_RETRIES) for batch in pack_batches(uncached, token_budget)))
+    return results, errors
+
+# --- Analytics prompts ---
+
+async def summarize_chunk(text: str, level: int) -> str:
+    # Map step of summarizer.py: compact notes on one chunk of reviews (level 0) or of earlier notes
+    source = "customer reviews (date, star rating, text)" if level == 0 else "sets of notes, each summarizing a batch of customer reviews"
+    prompt = f"""
+    Below are {source} for a business.
+
+    {text}
+
+    Write compact notes (max 120 words) covering: the main complaints and praise with rough counts,
+    recurring themes, and anything unusual. Keep concrete details (dishes, staff behaviour, wait times, prices).
+    Return only the notes.
+    """
+    return await _chat(prompt, temperature=0.2, json_mode=False)
+
+async def generate_weekly_insight(current_text: str, prev_text: str) -> str:
+    # Inputs come from summarizer.condense: raw review lines, or notes covering all of them
+    prompt = f"""
+    Analyze these two weeks of reviews for a business.
+    
+    Current Week:
+    {current_text}
+    
+    Previous Week:
+    {prev_text}
+    
+    Generate a short 2-sentence summary comparing performance. 
+    Highlight: New complaints, repeated issues, or improvements.
+    Style: "This week customers complained mostly about..., while..."
+    """
+    key = make_key(WEEKLY_INSIGHT_PROMPT_VERSION, MODEL, current_text, prev_text)
+    return await llm_cache.get_or_compute(key, lambda: _chat(prompt, json_mode=False))
+
+async def summarize_month(month: str, reviews_text: str) -> Dict[str, Any]:
+    prompt = f"""
+    Analyze these reviews (or notes summarizing all of them) for {month}:
+    {reviews_text}
+    
+    Provide a JSON with:
+    1. "summary": Short paragraph summary.
+    2. "complaints": Top complaints.
+    3. "highlights": Positive highlights.
+    4. "actions": Recommended actions.
+    """
+    key = make_key(MONTHLY_REPORT_PROMPT_VERSION, MODEL, month, reviews_text)
+    return await llm_cache.get_or_compute(key, lambda: _chat_json(prompt, temperature=None))
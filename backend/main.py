@@ -6,30 +6,47 @@ load_dotenv()
 
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
-from database import create_db_and_tables
-from routers import reviews, analytics, auth
+from database import async_engine
+from migrate import check_schema
+from routers import reviews, analytics, auth, monitoring
+import enrichment
+from llm_client import llm_client
+from insights import weekly_insight
+from reports import report_store
+from columnar import column_store
+from events import broker
+from data_version import data_version
+import cluster
+from metrics import MetricsMiddleware
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    create_db_and_tables()
-    
-    # Auto-create default admin if not exists
-    from sqlmodel import Session, select
-    from database import engine
-    from models import Admin
-    from auth import get_password_hash
-    
-    with Session(engine) as session:
-        existing_admin = session.exec(select(Admin).where(Admin.username == "admin")).first()
-        if not existing_admin:
-            hashed_pwd = get_password_hash("password123")
-            new_admin = Admin(username="admin", hashed_password=hashed_pwd)
-            session.add(new_admin)
-            session.commit()
-            print("✅ Default admin user created (admin/password123)")
+    # Schema changes are an explicit `python migrate.py` step; startup only refuses to run on an old schema
+    check_schema()
+
+    await llm_client.start()
+    enrichment.worker_pool.start()
+    broker.start()
+    await data_version.start()
+    column_store.start()
+    # Singleton background work runs in one worker only (a lone worker is always the leader)
+    cluster.leader.on_elected(weekly_insight.schedule_refresh)
+    cluster.leader.on_elected(report_store.start)
+    await cluster.start()
             
     yield
 
+    await cluster.stop()
+    await data_version.stop()
+    broker.stop()
+    await report_store.stop()
+    await weekly_insight.stop()
+    await column_store.stop()
+    await enrichment.worker_pool.stop()
+    await llm_client.close()
+    # Pooled aiosqlite connections each hold a thread; close them before exit
+    await async_engine.dispose()
+
 app = FastAPI(lifespan=lifespan, title="Review Dashboard API")
 
 # Configure CORS
@@ -39,11 +56,15 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Profile-File", "ETag"],
 )
+# Route latency, SQL per request and optional profiling; see GET /metrics
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(reviews.router)
 app.include_router(analytics.router)
 app.include_router(auth.router)
+app.include_router(monitoring.router)
 
 @app.get("/")
 def read_root():
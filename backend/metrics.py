@@ -0,0 +1,312 @@
+import contextvars
+import cProfile
+import io
+import os
+import pstats
+import random
+import threading
+import time
+from bisect import bisect_left
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event
+
+# Prometheus text exposition, kept dependency-free: a handful of counters, gauges and histograms
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 500)
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+SLOW_QUERY_SAMPLE_RATE = float(os.getenv("SLOW_QUERY_SAMPLE_RATE", "1.0"))
+PROFILING_ENABLED = os.getenv("REQUEST_PROFILING", "").lower() in ("1", "true", "yes")
+PROFILES_DIR = os.getenv("PROFILES_DIR", "profiles")
+PROFILE_HEADER = b"x-profile"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+INF_LABEL = 'le="+Inf"'
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [f"{self.name}{_labels(self.label_names, k)} {_number(v)}" for k, v in items]
+
+
+class Gauge(Metric):
+    """
+    Value read at scrape time from a callback returning {label values: value}.
+
+    kind="counter" exposes a monotonic total kept elsewhere (e.g. LLMCache.misses).
+    """
+
+    def __init__(self, name: str, help_text: str, labels: Iterable[str] = (), collect: Callable[[], Dict] = None,
+                 kind: str = "gauge"):
+        super().__init__(name, help_text, labels)
+        self.collect = collect
+        self.kind = kind
+
+    def render(self) -> List[str]:
+        values = self.collect() if self.collect else {}
+        return self.header() + [f"{self.name}{_labels(self.label_names, k)} {_number(v)}" for k, v in sorted(values.items())]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Iterable[str] = (), buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple[str, ...], List] = {} # labels -> [bucket counts..., sum, count]
+
+    def observe(self, value: float, *labels: str):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        lines = self.header()
+        for labels, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = 'le="%s"' % _number(bound)
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_bucket{_labels(self.label_names, labels, INF_LABEL)} {series[-1]}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {_number(series[-2])}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {series[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, *args, **kwargs) -> Counter:
+        return self.register(Counter(*args, **kwargs))
+
+    def gauge(self, *args, **kwargs) -> Gauge:
+        return self.register(Gauge(*args, **kwargs))
+
+    def histogram(self, *args, **kwargs) -> Histogram:
+        return self.register(Histogram(*args, **kwargs))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_requests = registry.counter("http_requests_total", "HTTP requests by route and status", ("method", "route", "status"))
+http_duration = registry.histogram("http_request_duration_seconds", "HTTP request latency", ("method", "route"))
+http_in_flight = 0
+
+db_statements = registry.counter("db_statements_total", "SQL statements executed, by route (\"background\" outside requests)", ("route",))
+db_duration = registry.histogram("db_statement_duration_seconds", "SQL statement latency", ("route",))
+db_statements_per_request = registry.histogram(
+    "db_statements_per_request", "SQL statements issued by one request", ("route",), buckets=COUNT_BUCKETS)
+db_time_per_request = registry.histogram("db_time_per_request_seconds", "Time a request spent in SQL", ("route",))
+db_slow_queries = registry.counter("db_slow_queries_total", "SQL statements slower than SLOW_QUERY_MS", ("route",))
+
+llm_duration = registry.histogram("llm_request_duration_seconds", "LLM chat completion latency, retries included", ("outcome",))
+llm_tokens = registry.counter("llm_tokens_total", "Tokens reported by the LLM provider", ("kind",))
+llm_errors = registry.counter("llm_errors_total", "Failed LLM calls by reason", ("reason",))
+llm_fallbacks = registry.counter("llm_fallbacks_total", "Reviews given placeholder AI text instead of an LLM result", ("reason",))
+
+
+# --- Per-request context ---
+
+_route_templates: Dict[Any, str] = {}
+
+
+def route_name(scope) -> str:
+    """Path template (/reviews/{review_id}/notes) of the matched route, never the raw path, to bound cardinality."""
+    endpoint = scope.get("endpoint") # set by the router once it has matched
+    if endpoint is None:
+        return "unmatched"
+    if not _route_templates:
+        for route in getattr(scope.get("app"), "routes", []):
+            if hasattr(route, "endpoint"):
+                _route_templates[route.endpoint] = route.path
+    return _route_templates.get(endpoint, "unmatched")
+
+
+class RequestStats:
+    __slots__ = ("scope", "statements", "sql_seconds")
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.statements = 0
+        self.sql_seconds = 0.0
+
+    @property
+    def route(self) -> str:
+        return route_name(self.scope)
+
+
+current_request: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar("current_request", default=None)
+
+
+# --- SQL hooks ---
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_start"].pop()
+    elapsed = time.perf_counter() - started
+    stats = current_request.get()
+    route = stats.route if stats is not None else "background"
+    if stats is not None:
+        stats.statements += 1
+        stats.sql_seconds += elapsed
+    db_statements.inc(route)
+    db_duration.observe(elapsed, route)
+
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        db_slow_queries.inc(route)
+        if random.random() < SLOW_QUERY_SAMPLE_RATE:
+            print(f"Slow query ({elapsed * 1000:.0f}ms, {route}): {' '.join(statement.split())[:500]}")
+
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute; drop its start time
+    starts = exception_context.connection.info.get("query_start") if exception_context.connection is not None else None
+    if starts:
+        starts.pop()
+
+
+def instrument_engine(sync_engine):
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
+
+
+# --- ASGI middleware ---
+
+_profile_lock = threading.Lock()
+
+
+class MetricsMiddleware:
+    """
+    Times every HTTP request, counts its SQL statements and adds a Server-Timing header.
+
+    With REQUEST_PROFILING=1, a request carrying an `X-Profile: 1` header runs under cProfile;
+    the stats land in PROFILES_DIR and the file name comes back in `X-Profile-File`.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        global http_in_flight
+        stats = RequestStats(scope)
+        token = current_request.set(stats)
+        started = time.perf_counter()
+        status = 500
+        profile_path = None
+        profiler = None
+        if PROFILING_ENABLED and dict(scope.get("headers") or []).get(PROFILE_HEADER) and _profile_lock.acquire(blocking=False):
+            # One profiled request at a time: cProfile sees the whole thread, so overlap would mix stacks
+            os.makedirs(PROFILES_DIR, exist_ok=True)
+            profile_path = os.path.join(PROFILES_DIR, f"{datetime.utcnow():%Y%m%dT%H%M%S%f}.prof")
+            profiler = cProfile.Profile()
+            profiler.enable()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", (
+                    f'db;dur={stats.sql_seconds * 1000:.1f};desc="{stats.statements} queries", app;dur={elapsed_ms:.1f}'
+                ).encode()))
+                if profile_path:
+                    headers.append((b"x-profile-file", os.path.basename(profile_path).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        http_in_flight += 1
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_in_flight -= 1
+            elapsed = time.perf_counter() - started
+            route = stats.route
+            method = scope.get("method", "")
+            http_requests.inc(method, route, str(status))
+            http_duration.observe(elapsed, method, route)
+            db_statements_per_request.observe(stats.statements, route)
+            db_time_per_request.observe(stats.sql_seconds, route)
+            current_request.reset(token)
+            if profiler is not None:
+                profiler.disable()
+                _profile_lock.release()
+                profiler.dump_stats(profile_path)
+                summary = io.StringIO()
+                pstats.Stats(profiler, stream=summary).sort_stats("cumulative").print_stats(15)
+                print(f"Profiled {method} {route} ({elapsed * 1000:.0f}ms) -> {profile_path}\n{summary.getvalue()}")
+
+
+registry.gauge("http_requests_in_flight", "HTTP requests being served", collect=lambda: {(): http_in_flight})
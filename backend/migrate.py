@@ -0,0 +1,142 @@
+import argparse
+import importlib
+import os
+import re
+import sys
+import time
+from typing import List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+load_dotenv()
+
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session, text
+from database import engine
+from migrations import MigrationContext
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+MIGRATION_FILE_RE = re.compile(r"^(\d{4})_(\w+)\.py$")
+BATCH_SIZE = int(os.getenv("MIGRATION_BATCH_SIZE", "5000"))
+
+SETUP_SQL = [
+    """
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        name VARCHAR NOT NULL,
+        applied_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        duration_ms INTEGER NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS schema_migration_progress (
+        version INTEGER NOT NULL,
+        step VARCHAR NOT NULL,
+        cursor,
+        updated_at DATETIME NOT NULL,
+        PRIMARY KEY (version, step)
+    )
+    """,
+]
+VERSION_SQL = text("SELECT MAX(version) FROM schema_version")
+RECORD_SQL = text("INSERT INTO schema_version (version, name, duration_ms) VALUES (:version, :name, :duration_ms)")
+CLEAR_PROGRESS_SQL = text("DELETE FROM schema_migration_progress WHERE version = :version")
+
+
+class SchemaOutOfDate(RuntimeError):
+    pass
+
+
+def available_migrations() -> List[Tuple[int, str]]:
+    """(version, module name) of every migration file, in order."""
+    found = []
+    for name in os.listdir(MIGRATIONS_DIR):
+        match = MIGRATION_FILE_RE.match(name)
+        if match:
+            found.append((int(match.group(1)), name[:-len(".py")]))
+    return sorted(found)
+
+
+def latest_version() -> int:
+    migrations = available_migrations()
+    return migrations[-1][0] if migrations else 0
+
+
+def current_version(session: Session) -> int:
+    try:
+        return session.exec(VERSION_SQL).one()[0] or 0
+    except OperationalError:
+        return 0 # no schema_version table: a new or pre-migrations database
+
+
+def check_schema():
+    """Startup guard: one query, no DDL. Raises SchemaOutOfDate unless the database is at the code's version."""
+    expected = latest_version()
+    with Session(engine) as session:
+        version = current_version(session)
+    if version < expected:
+        raise SchemaOutOfDate(
+            f"Database schema is at version {version}, this code needs {expected}. "
+            f"Run `python migrate.py` from backend/ first."
+        )
+    if version > expected:
+        raise SchemaOutOfDate(f"Database schema is at version {version}, newer than this code ({expected}).")
+
+
+def upgrade(target: Optional[int] = None, batch_size: int = BATCH_SIZE) -> int:
+    """Apply pending migrations up to target (default: all); returns how many ran."""
+    with Session(engine) as session:
+        for statement in SETUP_SQL:
+            session.exec(text(statement))
+        session.commit()
+
+        version = current_version(session)
+        pending = [(v, name) for v, name in available_migrations() if v > version and (target is None or v <= target)]
+        if not pending:
+            print(f"Schema is up to date (version {version})")
+            return 0
+
+        total_started = time.monotonic()
+        for v, name in pending:
+            print(f"Applying {name}...")
+            started = time.monotonic()
+            module = importlib.import_module(f"migrations.{name}")
+            module.upgrade(MigrationContext(session, v, batch_size))
+            duration_ms = int((time.monotonic() - started) * 1000)
+            session.exec(RECORD_SQL, params={"version": v, "name": name, "duration_ms": duration_ms})
+            session.exec(CLEAR_PROGRESS_SQL, params={"version": v})
+            session.commit()
+            print(f"Applied {name} in {duration_ms / 1000:.2f}s")
+        print(f"✅ Schema at version {pending[-1][0]} ({len(pending)} migrations, {time.monotonic() - total_started:.1f}s)")
+        return len(pending)
+
+
+def status():
+    with Session(engine) as session:
+        version = current_version(session)
+        try:
+            applied = {row[0]: row for row in session.exec(
+                text("SELECT version, name, applied_at, duration_ms FROM schema_version ORDER BY version")).all()}
+        except OperationalError:
+            applied = {}
+    for v, name in available_migrations():
+        row = applied.get(v)
+        state = f"applied {row[2]} ({row[3]} ms)" if row else "pending"
+        print(f"{v:04d} {name[5:]:<32} {state}")
+    print(f"Database at version {version}, latest is {latest_version()}")
+
+
+if __name__ == "__main__":
+    # Usage: python migrate.py [--status] [--to N] [--batch-size 5000]
+    parser = argparse.ArgumentParser(description="Apply versioned schema migrations to reviews.db.")
+    parser.add_argument("--status", action="store_true", help="List migrations and whether they are applied")
+    parser.add_argument("--to", type=int, default=None, help="Stop after this version")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Rows per backfill transaction")
+    args = parser.parse_args()
+
+    engine.echo = False
+    if args.status:
+        status()
+    else:
+        upgrade(args.to, args.batch_size)
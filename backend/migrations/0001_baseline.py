@@ -0,0 +1,116 @@
+from sqlmodel import text
+
+# Tables as they stood when migrations were introduced, frozen here so later model changes never alter
+# what this step creates. IF NOT EXISTS: tables of an older database are left alone (0002 adds their columns).
+TABLES_SQL = [
+    """
+    CREATE TABLE IF NOT EXISTS review (
+        rating INTEGER NOT NULL,
+        content VARCHAR NOT NULL,
+        response VARCHAR,
+        summary VARCHAR,
+        "suggestedAction" VARCHAR,
+        sentiment VARCHAR,
+        aspects VARCHAR,
+        id INTEGER NOT NULL,
+        "createdAt" DATETIME NOT NULL,
+        enrichment_status VARCHAR,
+        PRIMARY KEY (id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS admin (
+        id INTEGER NOT NULL,
+        username VARCHAR NOT NULL,
+        hashed_password VARCHAR NOT NULL,
+        PRIMARY KEY (id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS adminnote (
+        id INTEGER NOT NULL,
+        review_id INTEGER NOT NULL,
+        admin_id INTEGER,
+        content VARCHAR NOT NULL,
+        created_at DATETIME NOT NULL,
+        PRIMARY KEY (id),
+        FOREIGN KEY(review_id) REFERENCES review (id),
+        FOREIGN KEY(admin_id) REFERENCES admin (id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS review_aspect (
+        review_id INTEGER NOT NULL,
+        aspect VARCHAR NOT NULL,
+        PRIMARY KEY (review_id, aspect),
+        FOREIGN KEY(review_id) REFERENCES review (id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS review_rollup (
+        id INTEGER NOT NULL,
+        grain VARCHAR NOT NULL,
+        bucket VARCHAR NOT NULL,
+        rating INTEGER NOT NULL,
+        sentiment VARCHAR NOT NULL,
+        aspect VARCHAR NOT NULL,
+        count INTEGER NOT NULL,
+        PRIMARY KEY (id),
+        CONSTRAINT uq_review_rollup_key UNIQUE (grain, aspect, sentiment, rating, bucket)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS enrichment_job (
+        id INTEGER NOT NULL,
+        review_id INTEGER NOT NULL,
+        status VARCHAR NOT NULL,
+        attempts INTEGER NOT NULL,
+        next_attempt_at DATETIME NOT NULL,
+        last_error VARCHAR,
+        created_at DATETIME NOT NULL,
+        updated_at DATETIME NOT NULL,
+        PRIMARY KEY (id),
+        UNIQUE (review_id),
+        FOREIGN KEY(review_id) REFERENCES review (id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS insight_snapshot (
+        id INTEGER NOT NULL,
+        kind VARCHAR NOT NULL,
+        window_start DATETIME NOT NULL,
+        window_end DATETIME NOT NULL,
+        high_water_id INTEGER NOT NULL,
+        summary VARCHAR NOT NULL,
+        generated_at DATETIME NOT NULL,
+        PRIMARY KEY (id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS summary_chunk (
+        id INTEGER NOT NULL,
+        "key" VARCHAR NOT NULL,
+        level INTEGER NOT NULL,
+        item_count INTEGER NOT NULL,
+        first_review_id INTEGER,
+        last_review_id INTEGER,
+        summary VARCHAR NOT NULL,
+        created_at DATETIME NOT NULL,
+        last_used_at DATETIME NOT NULL,
+        PRIMARY KEY (id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS data_version (
+        id INTEGER NOT NULL,
+        version INTEGER NOT NULL,
+        PRIMARY KEY (id)
+    )
+    """,
+]
+
+
+def upgrade(ctx):
+    for statement in TABLES_SQL:
+        ctx.session.exec(text(statement))
+    ctx.session.commit()
@@ -0,0 +1,5 @@
+def upgrade(ctx):
+    # Databases created before the AI fields were stored on the review row
+    ctx.add_column("review", "sentiment", "VARCHAR")
+    ctx.add_column("review", "aspects", "VARCHAR")
+    ctx.add_column("review", "enrichment_status", "VARCHAR")
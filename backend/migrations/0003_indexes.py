@@ -0,0 +1,19 @@
+# Older databases only had the tables; build whatever is missing, one index at a time
+INDEXES = [
+    ("ix_admin_username", "CREATE UNIQUE INDEX ix_admin_username ON admin (username)"),
+    ("ix_adminnote_review_id_created_at", "CREATE INDEX ix_adminnote_review_id_created_at ON adminnote (review_id, created_at)"),
+    ("ix_enrichment_job_status_next_attempt_at",
+     "CREATE INDEX ix_enrichment_job_status_next_attempt_at ON enrichment_job (status, next_attempt_at)"),
+    ("ix_insight_snapshot_kind", "CREATE UNIQUE INDEX ix_insight_snapshot_kind ON insight_snapshot (kind)"),
+    ("ix_review_createdAt", 'CREATE INDEX "ix_review_createdAt" ON review ("createdAt")'),
+    ("ix_review_rating_createdAt", 'CREATE INDEX "ix_review_rating_createdAt" ON review (rating, "createdAt")'),
+    ("ix_review_sentiment_createdAt", 'CREATE INDEX "ix_review_sentiment_createdAt" ON review (sentiment, "createdAt")'),
+    ("ix_review_aspect_aspect_review_id", "CREATE INDEX ix_review_aspect_aspect_review_id ON review_aspect (aspect, review_id)"),
+    ("ix_summary_chunk_key", 'CREATE UNIQUE INDEX ix_summary_chunk_key ON summary_chunk ("key")'),
+    ("ix_summary_chunk_last_used_at", "CREATE INDEX ix_summary_chunk_last_used_at ON summary_chunk (last_used_at)"),
+]
+
+
+def upgrade(ctx):
+    for name, ddl in INDEXES:
+        ctx.create_index(name, ddl)
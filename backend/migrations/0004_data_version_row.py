@@ -0,0 +1,7 @@
+from sqlmodel import text
+
+
+def upgrade(ctx):
+    # Row behind the HTTP cache validators (see data_version.py)
+    ctx.session.exec(text("INSERT OR IGNORE INTO data_version (id, version) VALUES (1, 0)"))
+    ctx.session.commit()
@@ -0,0 +1,20 @@
+from sqlmodel import text
+from migrations import ids_after, id_range
+
+# Copy of the legacy JSON review.aspects column into review_aspect (INSERT OR IGNORE: re-running a batch is harmless)
+INSERT_SQL = text("""
+    INSERT OR IGNORE INTO review_aspect (review_id, aspect)
+    SELECT review.id, CAST(je.value AS TEXT)
+    FROM review, json_each(review.aspects) AS je
+    WHERE review.id BETWEEN :first AND :last
+      AND json_valid(review.aspects) AND json_type(review.aspects) = 'array'
+      AND je.value IS NOT NULL AND je.value != ''
+""")
+
+
+def upgrade(ctx):
+    ctx.backfill(
+        "review_aspect",
+        fetch=lambda session, after, limit: session.exec(ids_after("review", after, limit, "aspects IS NOT NULL")).all(),
+        apply=lambda session, rows: session.exec(INSERT_SQL, params=dict(zip(("first", "last"), id_range(rows)))),
+    )
@@ -0,0 +1,36 @@
+from sqlmodel import text
+
+# rollups.rebuild() as it stood for this migration: one row per (grain, bucket, rating, sentiment),
+# aspect '' for the review totals, plus one per aspect from review_aspect (filled by 0006)
+REBUILD_SQL = [
+    f"""
+    INSERT INTO review_rollup (grain, bucket, rating, sentiment, aspect, count)
+    SELECT '{grain}', strftime('{fmt}', "createdAt"), rating, COALESCE(sentiment, ''), '', COUNT(*)
+    FROM review
+    GROUP BY 2, 3, 4
+    """
+    for grain, fmt in (("day", "%Y-%m-%d"), ("month", "%Y-%m"))
+] + [
+    f"""
+    INSERT INTO review_rollup (grain, bucket, rating, sentiment, aspect, count)
+    SELECT '{grain}', strftime('{fmt}', review."createdAt"), review.rating,
+           COALESCE(review.sentiment, ''), review_aspect.aspect, COUNT(*)
+    FROM review_aspect
+    JOIN review ON review.id = review_aspect.review_id
+    GROUP BY 2, 3, 4, 5
+    """
+    for grain, fmt in (("day", "%Y-%m-%d"), ("month", "%Y-%m"))
+]
+
+
+def upgrade(ctx):
+    # Databases created before rollups existed get a one-time build; a database that has rollups keeps them
+    if ctx.session.exec(text("SELECT 1 FROM review_rollup LIMIT 1")).first() is not None:
+        return
+    if ctx.session.exec(text("SELECT 1 FROM review LIMIT 1")).first() is None:
+        return
+    for statement in REBUILD_SQL:
+        ctx.session.exec(text(statement))
+    ctx.session.commit()
+    rows = ctx.session.exec(text("SELECT COUNT(*) FROM review_rollup")).one()[0]
+    ctx.log(f"built review rollups ({rows} rows)")
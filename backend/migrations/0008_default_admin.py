@@ -0,0 +1,14 @@
+from passlib.hash import bcrypt
+from sqlmodel import text
+
+
+def upgrade(ctx):
+    # Used to happen (with a bcrypt hash) on every startup; now once, when the database has no admin at all
+    if ctx.session.exec(text("SELECT 1 FROM admin LIMIT 1")).first() is not None:
+        return
+    ctx.session.exec(
+        text("INSERT INTO admin (username, hashed_password) VALUES (:username, :hashed_password)"),
+        params={"username": "admin", "hashed_password": bcrypt.hash("password123")},
+    )
+    ctx.session.commit()
+    ctx.log("created default admin user (admin/password123)")
@@ -0,0 +1,15 @@
+from sqlmodel import text
+
+
+def upgrade(ctx):
+    # Message table for multi-worker serving (cluster.py)
+    ctx.session.exec(text("""
+        CREATE TABLE IF NOT EXISTS bus_event (
+            id INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT,
+            origin VARCHAR NOT NULL,
+            channel VARCHAR NOT NULL,
+            payload VARCHAR NOT NULL,
+            created_at DATETIME NOT NULL
+        )
+    """))
+    ctx.session.commit()
@@ -0,0 +1,31 @@
+from sqlmodel import text
+
+# New reviews are picked up by id (they only ever append); updates and deletes of the columns
+# held here are logged by triggers, so every writer (ORM, bulk Core statements, CLI scripts,
+# other workers) is covered without application code having to remember it.
+SETUP_SQL = [
+    """
+    CREATE TABLE IF NOT EXISTS review_change (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        review_id INTEGER NOT NULL,
+        changed_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS review_change_au AFTER UPDATE OF "createdAt", rating, sentiment, aspects ON review BEGIN
+        INSERT INTO review_change (review_id) VALUES (new.id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS review_change_ad AFTER DELETE ON review BEGIN
+        INSERT INTO review_change (review_id) VALUES (old.id);
+    END
+    """,
+]
+
+
+def upgrade(ctx):
+    # Trigger-fed log of review updates/deletes that keeps the in-memory column store current (columnar.py)
+    for statement in SETUP_SQL:
+        ctx.session.exec(text(statement))
+    ctx.session.commit()
@@ -0,0 +1,11 @@
+from sqlmodel import text
+
+
+def upgrade(ctx):
+    # Workers lease the jobs they claim and renew the lease while processing; any worker takes over an expired one
+    ctx.add_column("enrichment_job", "lease_expires_at", "DATETIME")
+    # Jobs an older version left "processing" have no live worker behind them: expire them now
+    ctx.session.exec(text(
+        "UPDATE enrichment_job SET lease_expires_at = updated_at WHERE status = 'processing' AND lease_expires_at IS NULL"
+    ))
+    ctx.session.commit()
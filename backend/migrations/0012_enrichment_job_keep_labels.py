@@ -0,0 +1,3 @@
+def upgrade(ctx):
+    # Jobs for reviews the classifier labelled confidently only fill in the LLM's text fields
+    ctx.add_column("enrichment_job", "keep_labels", "BOOLEAN NOT NULL DEFAULT 0")
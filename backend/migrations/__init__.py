@@ -0,0 +1,101 @@
+"""
+Versioned schema migrations, applied in order by `python migrate.py`.
+
+Each NNNN_name.py module defines `upgrade(ctx: MigrationContext)`. A migration is not one
+transaction: index builds and backfill batches commit as they go so the database stays
+usable, which means every step must be safe to re-run after an interruption (the helpers
+below check before they change anything, and backfills resume from their last batch).
+
+A migration's DDL is written out in the migration itself (literal SQL), never taken from the
+models or app modules: those describe the latest schema, and a migration must create the same
+thing whenever it runs. 0001 creates the tables with columns that older databases get from 0002,
+so column and index steps must tolerate finding them already there.
+"""
+import time
+from typing import Any, Callable, List, Optional, Sequence
+
+from sqlmodel import Session, text
+
+PROGRESS_SQL = text("SELECT cursor FROM schema_migration_progress WHERE version = :version AND step = :step")
+SAVE_PROGRESS_SQL = text("""
+    INSERT INTO schema_migration_progress (version, step, cursor, updated_at)
+    VALUES (:version, :step, :cursor, CURRENT_TIMESTAMP)
+    ON CONFLICT (version, step) DO UPDATE SET cursor = excluded.cursor, updated_at = excluded.updated_at
+""")
+
+
+class MigrationContext:
+    def __init__(self, session: Session, version: int, batch_size: int):
+        self.session = session
+        self.version = version
+        self.batch_size = batch_size
+
+    def log(self, message: str):
+        print(f"  [{self.version:04d}] {message}")
+
+    def column_exists(self, table: str, column: str) -> bool:
+        rows = self.session.exec(text(f'PRAGMA table_info("{table}")')).all()
+        return any(row[1] == column for row in rows)
+
+    def add_column(self, table: str, column: str, ddl_type: str):
+        if self.column_exists(table, column):
+            return
+        self.session.exec(text(f'ALTER TABLE "{table}" ADD COLUMN "{column}" {ddl_type}'))
+        self.session.commit()
+        self.log(f"added {table}.{column}")
+
+    def create_index(self, name: str, ddl: str):
+        """
+        Build one index in its own short transaction.
+
+        SQLite has no concurrent index builds: writers wait (busy timeout) while it runs, readers
+        carry on under WAL. Building indexes one at a time keeps each of those pauses short.
+        """
+        exists = self.session.exec(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = :name"), params={"name": name}
+        ).first()
+        if exists:
+            return
+        started = time.monotonic()
+        self.session.exec(text(ddl))
+        self.session.commit()
+        self.log(f"built index {name} ({time.monotonic() - started:.2f}s)")
+
+    def backfill(self, step: str, fetch: Callable[[Session, Any, int], Sequence], apply: Callable[[Session, Sequence], Any],
+                 key: Callable[[Any], Any] = lambda row: row[0]) -> int:
+        """
+        Keyset-batched data backfill that resumes where an interrupted run stopped.
+
+        fetch(session, after, limit) returns the next rows ordered by key (after is None at first);
+        apply(session, rows) writes them. Each batch commits together with its progress cursor.
+        """
+        row = self.session.exec(PROGRESS_SQL, params={"version": self.version, "step": step}).first()
+        after = row[0] if row else None
+        if after is not None:
+            self.log(f"{step}: resuming after {after}")
+        done = 0
+        started = time.monotonic()
+        while True:
+            rows = fetch(self.session, after, self.batch_size)
+            if not rows:
+                break
+            apply(self.session, rows)
+            after = key(rows[-1])
+            self.session.exec(SAVE_PROGRESS_SQL, params={"version": self.version, "step": step, "cursor": after})
+            self.session.commit()
+            done += len(rows)
+            if done % (self.batch_size * 10) == 0:
+                self.log(f"{step}: {done} rows ({done / max(time.monotonic() - started, 1e-6):.0f} rows/s)")
+        if done:
+            self.log(f"{step}: {done} rows in {time.monotonic() - started:.1f}s")
+        return done
+
+
+def ids_after(table: str, after: Optional[int], limit: int, where: str = "1") -> text:
+    # Helper for fetch callbacks: the next `limit` ids of `table` matching `where`
+    return text(f'SELECT id FROM "{table}" WHERE id > :after AND ({where}) ORDER BY id LIMIT :limit').bindparams(
+        after=after or 0, limit=limit)
+
+
+def id_range(rows: Sequence) -> List[int]:
+    return [rows[0][0], rows[-1][0]]
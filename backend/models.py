@@ -1,5 +1,6 @@
-from typing import Optional
+from typing import List, Optional
 from sqlmodel import Field, SQLModel
+from sqlalchemy import Index, UniqueConstraint
 from datetime import datetime
 
 class ReviewBase(SQLModel):
@@ -12,8 +13,16 @@ class ReviewBase(SQLModel):
     aspects: Optional[str] = None   # JSON list of aspects
 
 class Review(ReviewBase, table=True):
+    # Match the filter shapes in filters.py: date range alone or with an equality filter
+    __table_args__ = (
+        Index("ix_review_createdAt", "createdAt"),
+        Index("ix_review_sentiment_createdAt", "sentiment", "createdAt"),
+        Index("ix_review_rating_createdAt", "rating", "createdAt"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     createdAt: datetime = Field(default_factory=datetime.utcnow)
+    enrichment_status: Optional[str] = None # deferred, pending, processing, done, failed, classified (None for legacy rows)
 
 class ReviewCreate(ReviewBase):
     createdAt: Optional[datetime] = None
@@ -21,6 +30,21 @@ class ReviewCreate(ReviewBase):
 class ReviewRead(ReviewBase):
     id: int
     createdAt: datetime
+    enrichment_status: Optional[str] = None
+
+class ReviewPage(SQLModel):
+    # Cursor-paginated GET /reviews/ response
+    items: List[ReviewRead]
+    next_cursor: Optional[str] = None
+
+class ReviewReadWithNotes(ReviewRead):
+    # GET /reviews/?include_notes=true
+    note_count: int = 0
+    latest_note: Optional[str] = None # preview of the newest note
+    latest_note_at: Optional[datetime] = None
+
+class ReviewPageWithNotes(ReviewPage):
+    items: List[ReviewReadWithNotes]
 
 class Admin(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
@@ -28,8 +52,115 @@ class Admin(SQLModel, table=True):
     hashed_password: str
 
 class AdminNote(SQLModel, table=True):
+    # Notes are always read per review, newest first
+    __table_args__ = (Index("ix_adminnote_review_id_created_at", "review_id", "created_at"),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     review_id: int = Field(foreign_key="review.id")
     admin_id: Optional[int] = Field(foreign_key="admin.id") # Optional to keep it simple if logic changes
     content: str
     created_at: datetime = Field(default_factory=datetime.utcnow)
+
+class NoteCreate(SQLModel):
+    content: str
+
+class BulkNoteItem(NoteCreate):
+    review_id: int
+
+class BulkNoteCreate(SQLModel):
+    notes: List[BulkNoteItem]
+
+class ReviewRollup(SQLModel, table=True):
+    # Pre-aggregated review counters, maintained by rollups.py
+    __tablename__ = "review_rollup"
+    __table_args__ = (
+        UniqueConstraint("grain", "aspect", "sentiment", "rating", "bucket", name="uq_review_rollup_key"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    grain: str       # "day" (YYYY-MM-DD buckets) or "month" (YYYY-MM buckets)
+    bucket: str
+    rating: int
+    sentiment: str = ""  # "" while the review has no sentiment yet
+    aspect: str = ""     # "" rows count every review once, other rows count per aspect
+    count: int = 0
+
+class ReviewAspect(SQLModel, table=True):
+    # One row per (review, aspect); mirrors the JSON list in Review.aspects for indexed filtering
+    __tablename__ = "review_aspect"
+    __table_args__ = (
+        Index("ix_review_aspect_aspect_review_id", "aspect", "review_id"),
+    )
+
+    review_id: int = Field(foreign_key="review.id", primary_key=True)
+    aspect: str = Field(primary_key=True)
+
+class EnrichmentJob(SQLModel, table=True):
+    # Durable LLM enrichment queue drained by enrichment.EnrichmentWorkerPool
+    __tablename__ = "enrichment_job"
+    __table_args__ = (
+        Index("ix_enrichment_job_status_next_attempt_at", "status", "next_attempt_at"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    review_id: int = Field(foreign_key="review.id", unique=True)
+    status: str = "pending" # pending, processing, done, failed
+    attempts: int = 0
+    next_attempt_at: datetime = Field(default_factory=datetime.utcnow)
+    last_error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    lease_expires_at: Optional[datetime] = None # while "processing"; any worker may reclaim the job after it
+    keep_labels: bool = False # sentiment/aspects came from a confident classifier; the LLM adds only text
+
+class EnrichmentStatusRead(SQLModel):
+    review_id: int
+    status: Optional[str] = None
+    attempts: int = 0
+    last_error: Optional[str] = None
+    next_attempt_at: Optional[datetime] = None
+    review: ReviewRead
+
+class InsightSnapshot(SQLModel, table=True):
+    # Last generated AI insight per kind, with the data it was built from
+    __tablename__ = "insight_snapshot"
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    kind: str = Field(index=True, unique=True) # "weekly"
+    window_start: datetime
+    window_end: datetime
+    high_water_id: int = 0 # max(review.id) when generated
+    summary: str
+    generated_at: datetime = Field(default_factory=datetime.utcnow)
+
+class SummaryChunk(SQLModel, table=True):
+    # Map-step summaries from summarizer.py, keyed by a hash of the prompt version and the chunk's text
+    __tablename__ = "summary_chunk"
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    key: str = Field(index=True, unique=True)
+    level: int = 0 # 0: summarizes review lines, 1+: summarizes lower-level summaries
+    item_count: int
+    first_review_id: Optional[int] = None
+    last_review_id: Optional[int] = None
+    summary: str
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    last_used_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+
+class DataVersion(SQLModel, table=True):
+    # Single-row counter bumped in every transaction that changes reviews or notes (HTTP cache validator)
+    __tablename__ = "data_version"
+
+    id: int = Field(default=1, primary_key=True)
+    version: int = 0
+
+class BusEvent(SQLModel, table=True):
+    # Cross-worker messages in multi-process mode (see cluster.py); AUTOINCREMENT so ids are never reused after pruning
+    __tablename__ = "bus_event"
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    origin: str # worker that published it; workers skip their own messages
+    channel: str
+    payload: str # JSON
+    created_at: datetime = Field(default_factory=datetime.utcnow)
@@ -0,0 +1,59 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from sqlalchemy import literal, tuple_
+from models import Review
+
+# Sort keys usable with cursors; every one ends in the unique id so positions are total
+SORTS = ("id", "createdAt")
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(sort: str, review) -> str:
+    position: Dict[str, Any] = {"s": sort, "id": review.id}
+    if sort == "createdAt":
+        position["c"] = review.createdAt.isoformat()
+    raw = json.dumps(position, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str) -> Optional[Dict[str, Any]]:
+    """Position after which the next page starts; None for an empty cursor (first page)."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        position = json.loads(raw)
+        if not isinstance(position, dict):
+            raise InvalidCursor("malformed cursor: not an object")
+        if position.get("s") != sort or not isinstance(position.get("id"), int):
+            raise InvalidCursor("cursor does not match the requested sort")
+        if sort == "createdAt":
+            position["c"] = datetime.fromisoformat(position["c"])
+        return position
+    except InvalidCursor:
+        raise
+    except (ValueError, TypeError, KeyError) as e:
+        raise InvalidCursor(f"malformed cursor: {e}") from e
+
+
+def order_newest_first(query, sort: str):
+    if sort == "createdAt":
+        return query.order_by(Review.createdAt.desc(), Review.id.desc())
+    return query.order_by(Review.id.desc())
+
+
+def after_cursor(query, position: Optional[Dict[str, Any]]):
+    # Seek past the last row seen instead of counting rows with OFFSET
+    if position is None:
+        return query
+    if "c" in position:
+        return query.where(
+            tuple_(Review.createdAt, Review.id) < tuple_(literal(position["c"], Review.createdAt.type), literal(position["id"]))
+        )
+    return query.where(Review.id < position["id"])
@@ -0,0 +1,29 @@
+from typing import Any, Dict
+
+from fpdf import FPDF
+
+
+def render_pdf(month: str, stats: Dict[str, Any], sections: Dict[str, Any]) -> bytes:
+    # Runs in a worker process: only plain data in, PDF bytes out
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font('helvetica', 'B', 20)
+    pdf.cell(0, 10, f'Monthly Report: {month}', new_x="LMARGIN", new_y="NEXT", align='C')
+    pdf.ln(10)
+
+    pdf.set_font('helvetica', '', 12)
+    pdf.cell(0, 10, f'Total Reviews: {stats["total"]}   |   Average Rating: {stats["avg"]:.2f} / 5', new_x="LMARGIN", new_y="NEXT")
+    pdf.cell(0, 10, f'Sentiment: {stats["pos"]} Positive, {stats["neu"]} Neutral, {stats["neg"]} Negative', new_x="LMARGIN", new_y="NEXT")
+    pdf.ln(10)
+
+    def section(title, body):
+        pdf.set_font('helvetica', 'B', 14)
+        pdf.cell(0, 10, title, new_x="LMARGIN", new_y="NEXT")
+        pdf.set_font('helvetica', '', 11)
+        pdf.multi_cell(0, 7, str(body))
+        pdf.ln(5)
+
+    for title, body in sections.items():
+        section(title, body)
+
+    return bytes(pdf.output())
@@ -0,0 +1,249 @@
+import asyncio
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import case
+from sqlmodel import Session, select, func
+from database import engine
+from models import Review, ReviewRollup
+from filters import apply_review_filters
+from data_version import data_version
+from report_pdf import render_pdf
+import llm_service
+import summarizer
+import columnar
+
+REPORTS_DIR = os.getenv("REPORTS_DIR", "reports")
+RENDER_WORKERS = int(os.getenv("REPORT_RENDER_WORKERS", "2"))
+SCHEDULE_INTERVAL_SECONDS = int(os.getenv("REPORT_SCHEDULE_SECONDS", "3600"))
+# Closed months rendered ahead of time (newest first); older ones render on first download
+PRERENDER_MONTHS = int(os.getenv("REPORT_PRERENDER_MONTHS", "3"))
+# Bump when the PDF layout changes so old artifacts are not served
+REPORT_LAYOUT_VERSION = "monthly-report-v1"
+
+MONTH_RE = re.compile(r"^\d{4}-\d{2}$")
+UNFILTERED = {"min_rating": None, "search": None, "sentiment": None, "aspect": None}
+
+
+def report_stats_query(month: str, filters: Dict[str, Any]):
+    return apply_review_filters(
+        select(
+            func.count(Review.id),
+            func.sum(Review.rating),
+            func.sum(case((Review.rating >= 4, 1), else_=0)),
+            func.sum(case((Review.rating == 3, 1), else_=0)),
+            func.sum(case((Review.rating <= 2, 1), else_=0)),
+        ),
+        filters["min_rating"], filters["search"], month, filters["sentiment"], filters["aspect"],
+    )
+
+
+def report_stats(session: Session, month: str, filters: Dict[str, Any]) -> Dict[str, Any]:
+    return stats_from_row(session.exec(report_stats_query(month, filters)).one())
+
+
+def stats_from_row(row) -> Dict[str, Any]:
+    """Aggregates for the report header."""
+    total, rating_sum, pos, neu, neg = row
+    return {
+        "total": total,
+        "avg": (rating_sum or 0) / total if total else 0,
+        "pos": pos or 0,
+        "neu": neu or 0,
+        "neg": neg or 0,
+    }
+
+
+def artifact_key(month: str, filters: Dict[str, Any], version: int):
+    """
+    (filter key, data key) for an artifact: same month + filters + data version => same PDF.
+
+    Read the version before the data: a write in between then only costs a re-render.
+    """
+    filter_key = hashlib.sha256(json.dumps([month, filters], sort_keys=True).encode()).hexdigest()[:12]
+    data = [REPORT_LAYOUT_VERSION, bool(llm_service.API_KEY), version]
+    data_key = hashlib.sha256(json.dumps(data).encode()).hexdigest()[:16]
+    return filter_key, data_key
+
+
+def artifact_path(month: str, filter_key: str, data_key: str) -> str:
+    return os.path.join(REPORTS_DIR, f"report_{month}_{filter_key}_{data_key}.pdf")
+
+
+def make_etag(filter_key: str, data_key: str) -> str:
+    return f'"{filter_key}-{data_key}"'
+
+
+def is_partial(path: str) -> bool:
+    return path.endswith(".partial.pdf")
+
+
+def load_review_lines(month: str, filters: Dict[str, Any]) -> List[summarizer.Item]:
+    # Every review in scope; summarizer.condense fits them into the prompt
+    with Session(engine) as session:
+        query = apply_review_filters(
+            select(Review.id, Review.createdAt, Review.rating, Review.content), filters["min_rating"], filters["search"],
+            month, filters["sentiment"], filters["aspect"],
+        )
+        rows = session.exec(query.order_by(Review.id)).all()
+    return [(review_id, f"- {created_at:%Y-%m-%d} {rating} stars: {content}") for review_id, created_at, rating, content in rows]
+
+
+def closed_months(limit: int) -> List[str]:
+    """The latest `limit` months with reviews, excluding the current one."""
+    current_month = datetime.utcnow().strftime("%Y-%m")
+    with Session(engine) as session:
+        return session.exec(
+            select(ReviewRollup.bucket)
+            .where(ReviewRollup.grain == "month")
+            .where(ReviewRollup.bucket < current_month)
+            .distinct()
+            .order_by(ReviewRollup.bucket.desc())
+            .limit(limit)
+        ).all()
+
+
+def unfiltered_stats(month: str) -> Dict[str, Any]:
+    with Session(engine) as session:
+        return report_stats(session, month, UNFILTERED)
+
+
+class ReportStore:
+    """Renders monthly PDFs in a process pool and keeps them on disk, one file per data version."""
+
+    def __init__(self, workers: int = RENDER_WORKERS):
+        self.workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._scheduler: Optional[asyncio.Task] = None
+
+    def _pool(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # Not fork: the server has threads (aiosqlite, to_thread) whose locks a fork would copy mid-use
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    async def get_or_render(self, month: str, filters: Dict[str, Any], version: int, stats: Dict[str, Any]) -> str:
+        """Path of the PDF for this data version, rendering it once even when requested concurrently."""
+        filter_key, data_key = artifact_key(month, filters, version)
+        path = artifact_path(month, filter_key, data_key)
+        if os.path.exists(path):
+            return path
+
+        pending = self._inflight.get(path)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[path] = future
+        try:
+            result = await self._render(month, filters, stats, path, f"report_{month}_{filter_key}_")
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            self._inflight.pop(path, None)
+
+    async def _render(self, month: str, filters: Dict[str, Any], stats: Dict[str, Any], path: str, prefix: str) -> str:
+
+        sections = {
+            "AI Executive Summary": "AI Summary unavailable",
+            "Top Complaints": "N/A",
+            "Positive Highlights": "N/A",
+            "Recommended Actions": "N/A",
+        }
+        complete = True
+        if llm_service.API_KEY:
+            try:
+                lines = await asyncio.to_thread(load_review_lines, month, filters)
+                data = await llm_service.summarize_month(month, await summarizer.condense(lines))
+                sections = {
+                    "AI Executive Summary": data.get("summary", ""),
+                    "Top Complaints": data.get("complaints", ""),
+                    "Positive Highlights": data.get("highlights", ""),
+                    "Recommended Actions": data.get("actions", ""),
+                }
+            except Exception:
+                complete = False
+
+        loop = asyncio.get_running_loop()
+        pdf_bytes = await loop.run_in_executor(self._pool(), render_pdf, month, stats, sections)
+
+        os.makedirs(REPORTS_DIR, exist_ok=True)
+        if not complete:
+            # Don't keep a report whose AI section failed; the next download retries the LLM
+            path = path[:-len(".pdf")] + ".partial.pdf"
+        tmp_path = f"{path}.{os.getpid()}.tmp" # other workers may be writing the same report
+        with open(tmp_path, "wb") as f:
+            f.write(pdf_bytes)
+        os.replace(tmp_path, path)
+        if complete:
+            self._prune(prefix, keep=path)
+        return path
+
+    def _prune(self, prefix: str, keep: str):
+        # Older data versions of the same month + filters are never served again
+        for name in os.listdir(REPORTS_DIR):
+            path = os.path.join(REPORTS_DIR, name)
+            if name.startswith(prefix) and path != keep and not name.endswith(".tmp"):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    async def prerender_completed_months(self):
+        """Render the unfiltered report of the latest closed months that are not on disk yet."""
+        if not llm_service.API_KEY or PRERENDER_MONTHS <= 0:
+            return # without the AI sections a report is cheap enough to render on request
+        rendered = 0
+        for month in await asyncio.to_thread(closed_months, PRERENDER_MONTHS):
+            version = data_version.value
+            if os.path.exists(artifact_path(month, *artifact_key(month, UNFILTERED, version))):
+                continue
+            stats = await asyncio.to_thread(unfiltered_stats, month)
+            if not stats["total"]:
+                continue
+            await self.get_or_render(month, UNFILTERED, version, stats)
+            rendered += 1
+        if rendered:
+            print(f"Pre-rendered {rendered} monthly reports")
+
+    async def _schedule(self):
+        while True:
+            try:
+                await self.prerender_completed_months()
+                pruned = await asyncio.to_thread(summarizer.prune_chunks)
+                if pruned:
+                    print(f"Pruned {pruned} unused summary chunks")
+                await asyncio.to_thread(columnar.prune_change_log)
+            except Exception as e:
+                print(f"Report pre-rendering failed: {e}")
+            await asyncio.sleep(SCHEDULE_INTERVAL_SECONDS)
+
+    def start(self):
+        self._scheduler = asyncio.create_task(self._schedule())
+
+    async def stop(self):
+        if self._scheduler is not None:
+            self._scheduler.cancel()
+            await asyncio.gather(self._scheduler, return_exceptions=True)
+            self._scheduler = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+report_store = ReportStore()
@@ -0,0 +1,91 @@
+import os
+import threading
+from collections import Counter, OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+from data_version import data_version
+from llm_cache import make_key
+
+MAX_ITEMS = int(os.getenv("RESPONSE_CACHE_ITEMS", "1024"))
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    # If-None-Match uses weak comparison: W/"x" matches "x"
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in [tag[2:] if tag.startswith("W/") else tag for tag in tags]
+
+
+class ResponseCache:
+    """
+    Serialized JSON bodies of read endpoints keyed by (endpoint, normalized params, data version).
+
+    Any write bumps the version, so stale entries are never served; they simply age out of the LRU.
+    """
+
+    def __init__(self, max_items: int = MAX_ITEMS):
+        self.max_items = max_items
+        self._entries: "OrderedDict[tuple, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits: Counter = Counter()
+        self.misses: Counter = Counter()
+        self.not_modified: Counter = Counter()
+
+    def get(self, key: tuple) -> Optional[bytes]:
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+            return body
+
+    def put(self, key: tuple, body: bytes):
+        with self._lock:
+            self._entries[key] = body
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_items:
+                self._entries.popitem(last=False)
+
+    async def respond(self, request: Request, endpoint: str, params: Dict[str, Any],
+                      compute: Callable[[], Awaitable[Any]], cache_control: str = "no-cache") -> Response:
+        """304 when the client's ETag is current, else the cached body, else compute() once."""
+        # Read the version first: whatever compute() sees is at least this new
+        version = data_version.value
+        params_key = make_key(endpoint, sorted((name, value) for name, value in params.items() if value is not None))
+        etag = f'"v{version}-{params_key[:16]}"'
+        headers = {"ETag": etag, "Cache-Control": cache_control}
+
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            self.not_modified[endpoint] += 1
+            return Response(status_code=304, headers=headers)
+
+        key = (params_key, version)
+        body = self.get(key)
+        if body is None:
+            self.misses[endpoint] += 1
+            body = JSONResponse(jsonable_encoder(await compute())).body
+            self.put(key, body)
+        else:
+            self.hits[endpoint] += 1
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    def stats(self) -> Dict[str, Any]:
+        endpoints = {}
+        for endpoint in sorted(set(self.hits) | set(self.misses) | set(self.not_modified)):
+            served = self.hits[endpoint] + self.not_modified[endpoint]
+            requests = served + self.misses[endpoint]
+            endpoints[endpoint] = {
+                "hits": self.hits[endpoint],
+                "not_modified": self.not_modified[endpoint],
+                "misses": self.misses[endpoint],
+                "hit_rate": round(served / requests, 4) if requests else 0.0,
+            }
+        with self._lock:
+            items = len(self._entries)
+        return {"data_version": data_version.value, "items": items, "endpoints": endpoints}
+
+
+response_cache = ResponseCache()
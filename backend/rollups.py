@@ -0,0 +1,171 @@
+import json
+import sys
+from collections import Counter
+from datetime import datetime
+from typing import Iterable, List, Optional, Tuple
+
+from sqlmodel import Session, select, func, text
+from models import Review, ReviewRollup
+import events
+
+# Rollup buckets: every review is counted once per grain under aspect "" and once more
+# per aspect it mentions, so unfiltered and aspect-filtered dashboards read disjoint rows.
+GRAINS = {
+    "day": "%Y-%m-%d",
+    "month": "%Y-%m",
+}
+
+UPSERT_SQL = text("""
+    INSERT INTO review_rollup (grain, bucket, rating, sentiment, aspect, count)
+    VALUES (:grain, :bucket, :rating, :sentiment, :aspect, :delta)
+    ON CONFLICT (grain, aspect, sentiment, rating, bucket)
+    DO UPDATE SET count = count + excluded.count
+""")
+
+
+def parse_aspects(raw: Optional[str]) -> List[str]:
+    if not raw:
+        return []
+    try:
+        aspects = json.loads(raw)
+    except (TypeError, ValueError):
+        return []
+    if not isinstance(aspects, list):
+        return []
+    return sorted({str(a) for a in aspects if a})
+
+
+def review_dimensions(review: Review) -> Tuple:
+    """Snapshot of the fields a review contributes to the rollups."""
+    return (review.createdAt, review.rating, review.sentiment or "", tuple(parse_aspects(review.aspects)))
+
+
+def _rollup_keys(dims: Tuple) -> Iterable[Tuple]:
+    created_at, rating, sentiment, aspects = dims
+    for grain, fmt in GRAINS.items():
+        bucket = created_at.strftime(fmt)
+        yield (grain, bucket, rating, sentiment, "")
+        for aspect in aspects:
+            yield (grain, bucket, rating, sentiment, aspect)
+
+
+def apply_dimensions(session: Session, dims_with_delta: Iterable[Tuple[Tuple, int]]):
+    # Collapse into one upsert per rollup key so a batch of reviews costs one executemany
+    dims_with_delta = list(dims_with_delta)
+    events.record_metric_changes(session, dims_with_delta) # pushed to live dashboards on commit
+    deltas = Counter()
+    for dims, delta in dims_with_delta:
+        for key in _rollup_keys(dims):
+            deltas[key] += delta
+
+    params = [
+        {"grain": grain, "bucket": bucket, "rating": rating, "sentiment": sentiment, "aspect": aspect, "delta": delta}
+        for (grain, bucket, rating, sentiment, aspect), delta in deltas.items()
+        if delta != 0
+    ]
+    if params:
+        session.exec(UPSERT_SQL, params=params)
+
+
+def apply_review(session: Session, review: Review, delta: int = 1):
+    apply_dimensions(session, [(review_dimensions(review), delta)])
+
+
+def record_enrichment(session: Session, before: Tuple, review: Review):
+    # Enrichment changes sentiment/aspects: move the review from its old buckets to the new ones
+    after = review_dimensions(review)
+    if before != after:
+        apply_dimensions(session, [(before, -1), (after, 1)])
+
+
+def rebuild(session: Session) -> int:
+    """Recompute every rollup row from the review table with set-based SQL."""
+    session.exec(text("DELETE FROM review_rollup"))
+    for grain, fmt in GRAINS.items():
+        session.exec(text(f"""
+            INSERT INTO review_rollup (grain, bucket, rating, sentiment, aspect, count)
+            SELECT '{grain}', strftime('{fmt}', "createdAt"), rating, COALESCE(sentiment, ''), '', COUNT(*)
+            FROM review
+            GROUP BY 2, 3, 4
+        """))
+        session.exec(text(f"""
+            INSERT INTO review_rollup (grain, bucket, rating, sentiment, aspect, count)
+            SELECT '{grain}', strftime('{fmt}', review."createdAt"), review.rating,
+                   COALESCE(review.sentiment, ''), review_aspect.aspect, COUNT(*)
+            FROM review_aspect
+            JOIN review ON review.id = review_aspect.review_id
+            GROUP BY 2, 3, 4, 5
+        """))
+    session.commit()
+    return session.exec(select(func.count()).select_from(ReviewRollup)).one()
+
+
+def day_aligned(value: Optional[datetime]) -> bool:
+    # Day rollups can answer a date range only when both bounds fall on midnight
+    return value is None or value == datetime(value.year, value.month, value.day)
+
+
+def monthly_rating_counts(
+    session: Session,
+    rating: Optional[int] = None,
+    sentiment: Optional[str] = None,
+    aspect: Optional[str] = None,
+    month: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+) -> List[Tuple[str, int, int]]:
+    """(month, rating, count) rows for the dashboard, read from month-grain rollups.
+
+    With a (day-aligned) start/end range the day-grain rows are summed per month instead.
+    """
+    return session.exec(monthly_rating_counts_query(rating, sentiment, aspect, month, start, end)).all()
+
+
+def monthly_rating_counts_query(
+    rating: Optional[int] = None,
+    sentiment: Optional[str] = None,
+    aspect: Optional[str] = None,
+    month: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+):
+    if start or end:
+        grain = "day"
+        bucket = func.substr(ReviewRollup.bucket, 1, 7)
+    else:
+        grain = "month"
+        bucket = ReviewRollup.bucket
+
+    query = (
+        select(bucket, ReviewRollup.rating, func.sum(ReviewRollup.count))
+        .where(ReviewRollup.grain == grain)
+        .where(ReviewRollup.aspect == (aspect or ""))
+        .group_by(bucket, ReviewRollup.rating)
+        .having(func.sum(ReviewRollup.count) > 0)
+    )
+    if rating:
+        query = query.where(ReviewRollup.rating == rating)
+    if sentiment:
+        query = query.where(ReviewRollup.sentiment == sentiment)
+    if month:
+        query = query.where(bucket == month)
+    if start:
+        query = query.where(ReviewRollup.bucket >= start.strftime(GRAINS["day"]))
+    if end:
+        query = query.where(ReviewRollup.bucket < end.strftime(GRAINS["day"]))
+    return query
+
+
+if __name__ == "__main__":
+    # Usage: python rollups.py rebuild
+    from database import engine
+    from migrate import check_schema
+
+    if len(sys.argv) < 2 or sys.argv[1] != "rebuild":
+        print("Usage: python rollups.py rebuild")
+        sys.exit(1)
+
+    check_schema()
+    with Session(engine) as session:
+        rows = rebuild(session)
+    print(f"✅ Rebuilt review rollups ({rows} rows)")
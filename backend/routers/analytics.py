@@ -1,74 +1,137 @@
-from fastapi import APIRouter, Depends
-from sqlmodel import Session, select, text
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from sqlmodel import select, text
+from sqlmodel.ext.asyncio.session import AsyncSession
 from database import get_session
-from models import Review, Admin
-from auth import get_current_user
+from models import Review, Admin, ReviewAspect
+from auth import get_current_user, get_current_user_from_query
 
 router = APIRouter(prefix="/analytics", tags=["analytics"])
 
-from typing import Optional
+import asyncio
+from typing import Literal, Optional
+from datetime import datetime
+from collections import defaultdict
 from sqlalchemy import func
+import rollups
+from filters import apply_review_filters, month_range
+import aspects
+from response_cache import etag_matches, response_cache
+from data_version import data_version
+from columnar import column_store
 
 @router.get("/dashboard")
 async def get_dashboard_metrics(
+    request: Request,
     min_rating: Optional[int] = None,
     search: Optional[str] = None,
     month: Optional[str] = None,
     sentiment: Optional[str] = None,
     aspect: Optional[str] = None,
-    session: Session = Depends(get_session), 
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    session: AsyncSession = Depends(get_session), 
     current_user: Admin = Depends(get_current_user)
 ):
-    # Base Query
-    query = select(Review)
-    
-    if min_rating:
-        query = query.where(Review.rating == min_rating)
-        
-    if search:
-        query = query.where(Review.content.contains(search))
-
+    async def compute():
+        if not search and rollups.day_aligned(start) and rollups.day_aligned(end):
+            # Answered from the pre-aggregated rollups, independent of the number of reviews
+            query = rollups.monthly_rating_counts_query(
+                rating=min_rating, sentiment=sentiment, aspect=aspect, month=month, start=start, end=end
+            )
+            buckets = (await session.exec(query)).all()
+        else:
+            # Free-text search and sub-day ranges can't be pre-aggregated: aggregate in SQL instead of loading rows
+            month_col = func.strftime('%Y-%m', Review.createdAt)
+            query = select(month_col, Review.rating, func.count()).group_by(month_col, Review.rating)
+            query = apply_review_filters(query, min_rating, search, month, sentiment, aspect, start, end)
+            buckets = (await session.exec(query)).all()
+        return metrics_from_buckets(buckets)
+
+    # Unchanged data since the last poll: 304 or a cached body, no aggregation
+    params = {"min_rating": min_rating, "search": search, "month": month, "sentiment": sentiment,
+              "aspect": aspect, "start": start, "end": end}
+    return await response_cache.respond(request, "dashboard", params, compute, cache_control="private, no-cache")
+
+@router.get("/timeseries")
+async def get_timeseries(
+    request: Request,
+    grain: Literal["day", "week", "month"] = "day",
+    min_rating: Optional[int] = None,
+    month: Optional[str] = None,
+    sentiment: Optional[str] = None,
+    aspect: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    current_user: Admin = Depends(get_current_user)
+):
+    """
+    Count, average rating, rating and sentiment breakdowns per bucket over any date range, with
+    trailing 7- and 30-day average ratings. Answered from the in-memory column store (no SQL
+    beyond catching up with recent writes); buckets are whole UTC days, so start/end are
+    widened to midnight. Free-text search is not supported here.
+    """
     if month:
-        query = query.where(func.strftime('%Y-%m', Review.createdAt) == month)
+        bounds = month_range(month)
+        if bounds is None:
+            raise HTTPException(status_code=400, detail="month must be YYYY-MM")
+        start, end = max(start or bounds[0], bounds[0]), min(end or bounds[1], bounds[1])
 
-    if sentiment:
-        query = query.where(Review.sentiment == sentiment)
+    async def compute():
+        try:
+            return await asyncio.to_thread(
+                column_store.timeseries, data_version.value, grain, start, end, min_rating, sentiment, aspect
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
-    if aspect:
-        query = query.where(Review.aspects.contains(aspect))
-        
-    # Execute query
-    total_reviews = session.exec(query).all()
-    count = len(total_reviews)
-    
-    # Average Rating
-    avg_rating = sum(r.rating for r in total_reviews) / count if count > 0 else 0
+    params = {"grain": grain, "min_rating": min_rating, "sentiment": sentiment, "aspect": aspect, "start": start, "end": end}
+    return await response_cache.respond(request, "timeseries", params, compute, cache_control="private, no-cache")
+
+@router.get("/aspects")
+async def get_aspect_counts(
+    min_rating: Optional[int] = None,
+    search: Optional[str] = None,
+    month: Optional[str] = None,
+    sentiment: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    session: AsyncSession = Depends(get_session),
+    current_user: Admin = Depends(get_current_user)
+):
+    query = aspects.aspect_count_query()
+    if min_rating or search or month or sentiment or start or end:
+        query = query.join(Review, Review.id == ReviewAspect.review_id)
+        query = apply_review_filters(query, min_rating, search, month, sentiment, start=start, end=end)
+
+    return [{"aspect": aspect, "count": count} for aspect, count in (await session.exec(query)).all()]
+
+def metrics_from_buckets(buckets):
+    # buckets: (month, rating, count) rows
+    count = 0
+    total_rating = 0
     
     # Rating Distribution (1-5 stars)
     distribution = {i: 0 for i in range(1, 6)}
-    for r in total_reviews:
-        distribution[r.rating] += 1
-        
-    # Monthly Trend (Python Aggregation)
-    from collections import defaultdict
-    from datetime import datetime
-
     monthly_stats = defaultdict(lambda: {"count": 0, "total_rating": 0, "positive": 0, "neutral": 0, "negative": 0})
     
-    for r in total_reviews:
-        # Assuming r.createdAt is a datetime object
-        month_key = r.createdAt.strftime('%Y-%m')
+    for month_key, rating, n in buckets:
+        count += n
+        total_rating += rating * n
+        distribution[rating] = distribution.get(rating, 0) + n
         
         stats = monthly_stats[month_key]
-        stats["count"] += 1
-        stats["total_rating"] += r.rating
+        stats["count"] += n
+        stats["total_rating"] += rating * n
         
-        if r.rating >= 4:
-            stats["positive"] += 1
-        elif r.rating == 3:
-            stats["neutral"] += 1
+        if rating >= 4:
+            stats["positive"] += n
+        elif rating == 3:
+            stats["neutral"] += n
         else:
-            stats["negative"] += 1
+            stats["negative"] += n
+
+    avg_rating = total_rating / count if count > 0 else 0
 
     monthly_trend = []
     for month in sorted(monthly_stats.keys()):
@@ -77,6 +140,7 @@ async def get_dashboard_metrics(
             "month": month,
             "count": stats["count"],
             "avg_rating": round(stats["total_rating"] / stats["count"], 2) if stats["count"] > 0 else 0,
+            "total_rating": stats["total_rating"], # lets live clients re-average after a delta
             "positive": stats["positive"],
             "neutral": stats["neutral"],
             "negative": stats["negative"]
@@ -85,66 +149,48 @@ async def get_dashboard_metrics(
     return {
         "total_reviews": count,
         "average_rating": round(avg_rating, 2),
+        "total_rating": total_rating,
         "rating_distribution": distribution,
         "monthly_trend": monthly_trend
     }
 
-from datetime import timedelta, datetime
-from llm_service import process_review_with_llm # Note: we might need a new function for summary
-from groq import Groq
-import os
+from events import sse_stream
+
+@router.get("/stream")
+async def stream_dashboard_events(request: Request, current_user: Admin = Depends(get_current_user_from_query)):
+    """
+    Server-Sent Events for open dashboards: review.created, review.enriched, reviews.imported,
+    metrics.delta and insight.updated. Clients apply the deltas to what they already fetched.
+    """
+    return StreamingResponse(
+        sse_stream(request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+import llm_service
+from llm_cache import llm_cache
+from insights import weekly_insight
 
 @router.get("/weekly-insight")
-async def get_weekly_insight(session: Session = Depends(get_session), current_user: Admin = Depends(get_current_user)):
-    today = datetime.utcnow()
-    last_week = today - timedelta(days=7)
-    prev_week = today - timedelta(days=14)
-    
-    # helper
-    def get_reviews_between(start, end):
-        q = select(Review).where(Review.createdAt >= start).where(Review.createdAt < end)
-        return session.exec(q).all()
+async def get_weekly_insight(session: AsyncSession = Depends(get_session), current_user: Admin = Depends(get_current_user)):
+    if not llm_service.API_KEY:
+        return {"summary": "AI Insights unavailable (key missing).", "stale": False, "refreshing": False}
 
-    current_reviews = get_reviews_between(last_week, today)
-    prev_reviews = get_reviews_between(prev_week, last_week)
-    
-    current_text = "\n".join([f"- {r.rating}/5: {r.content}" for r in current_reviews])
-    prev_text = "\n".join([f"- {r.rating}/5: {r.content}" for r in prev_reviews])
-    
-    API_KEY = os.getenv("GROQ_API_KEY")
-    if not API_KEY:
-        return {"summary": "AI Insights unavailable (key missing)."}
-        
-    client = Groq(api_key=API_KEY)
-    
-    prompt = f"""
-    Analyze these two weeks of reviews for a business.
-    
-    Current Week:
-    {current_text[:2000]} # Truncate to avoid context limit
-    
-    Previous Week:
-    {prev_text[:2000]}
-    
-    Generate a short 2-sentence summary comparing performance. 
-    Highlight: New complaints, repeated issues, or improvements.
-    Style: "This week customers complained mostly about..., while..."
-    """
-    
-    try:
-        completion = client.chat.completions.create(
-            messages=[{"role": "user", "content": prompt}],
-            model="llama-3.3-70b-versatile",
-            temperature=0.5
-        )
-        summary = completion.choices[0].message.content
-        return {"summary": summary}
-    except Exception as e:
-        return {"summary": "Could not generate insight."}
-
-from fastapi.responses import Response
-from fpdf import FPDF
-import io
+    # Served from the stored snapshot; regeneration happens in the background when stale
+    return await weekly_insight.get(session)
+
+@router.get("/llm-cache")
+async def get_llm_cache_stats(current_user: Admin = Depends(get_current_user)):
+    return await asyncio.to_thread(llm_cache.stats)
+
+@router.get("/response-cache")
+async def get_response_cache_stats(current_user: Admin = Depends(get_current_user)):
+    return response_cache.stats()
+
+from fastapi import Header
+from fastapi.responses import Response, FileResponse
+import reports
 
 @router.get("/report/{month}")
 async def generate_monthly_report(
@@ -153,101 +199,25 @@ async def generate_monthly_report(
     search: Optional[str] = None,
     sentiment: Optional[str] = None,
     aspect: Optional[str] = None,
-    session: Session = Depends(get_session), 
+    if_none_match: Optional[str] = Header(default=None),
+    session: AsyncSession = Depends(get_session), 
     current_user: Admin = Depends(get_current_user)
 ):
-    # 1. Fetch Data
-    query = select(Review).where(func.strftime('%Y-%m', Review.createdAt) == month)
-    
-    if min_rating:
-        query = query.where(Review.rating == min_rating)
-    
-    if search:
-        query = query.where(Review.content.contains(search))
-        
-    if sentiment:
-        query = query.where(Review.sentiment == sentiment)
-        
-    if aspect:
-        query = query.where(Review.aspects.contains(aspect))
+    if not reports.MONTH_RE.match(month):
+        return Response(content="No data for this month", media_type="text/plain", status_code=404)
 
-    reviews = session.exec(query).all()
-    
-    if not reviews:
+    # 1. Validate against the data version: a matching ETag needs no query at all
+    filters = {"min_rating": min_rating, "search": search, "sentiment": sentiment, "aspect": aspect}
+    version = data_version.value
+    etag = reports.make_etag(*reports.artifact_key(month, filters, version))
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    stats = reports.stats_from_row((await session.exec(reports.report_stats_query(month, filters))).one())
+    if not stats["total"]:
         return Response(content="No data for this month", media_type="text/plain", status_code=404)
 
-    total = len(reviews)
-    avg = sum(r.rating for r in reviews) / total if total > 0 else 0
-    
-    pos = sum(1 for r in reviews if r.rating >= 4)
-    neu = sum(1 for r in reviews if r.rating == 3)
-    neg = sum(1 for r in reviews if r.rating <= 2)
-    
-    # 2. AI Summary of the month
-    reviews_text = "\n".join([f"- {r.rating} stars: {r.content}" for r in reviews[:30]]) # limit context
-    
-    ai_summary = "AI Summary unavailable"
-    top_complaints = "N/A"
-    highlights = "N/A"
-    actions = "N/A"
-
-    API_KEY = os.getenv("GROQ_API_KEY")
-    if API_KEY:
-        client = Groq(api_key=API_KEY)
-        prompt = f"""
-        Analyze these reviews for {month}:
-        {reviews_text[:3000]}
-        
-        Provide a JSON with:
-        1. "summary": Short paragraph summary.
-        2. "complaints": Top complaints.
-        3. "highlights": Positive highlights.
-        4. "actions": Recommended actions.
-        """
-        try:
-            completion = client.chat.completions.create(
-                messages=[{"role": "user", "content": prompt}],
-                model="llama-3.3-70b-versatile",
-                response_format={"type": "json_object"}
-            )
-            import json
-            data = json.loads(completion.choices[0].message.content)
-            ai_summary = data.get("summary", "")
-            top_complaints = data.get("complaints", "")
-            highlights = data.get("highlights", "")
-            actions = data.get("actions", "")
-        except Exception:
-            pass
-
-    # 3. PDF Gen
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_font('helvetica', 'B', 20)
-    pdf.cell(0, 10, f'Monthly Report: {month}', new_x="LMARGIN", new_y="NEXT", align='C')
-    pdf.ln(10)
-    
-    pdf.set_font('helvetica', '', 12)
-    pdf.cell(0, 10, f'Total Reviews: {total}   |   Average Rating: {avg:.2f} / 5', new_x="LMARGIN", new_y="NEXT")
-    pdf.cell(0, 10, f'Sentiment: {pos} Positive, {neu} Neutral, {neg} Negative', new_x="LMARGIN", new_y="NEXT")
-    pdf.ln(10)
-    
-    def section(title, body):
-        pdf.set_font('helvetica', 'B', 14)
-        pdf.cell(0, 10, title, new_x="LMARGIN", new_y="NEXT")
-        pdf.set_font('helvetica', '', 11)
-        pdf.multi_cell(0, 7, str(body))
-        pdf.ln(5)
-
-    section("AI Executive Summary", ai_summary)
-    section("Top Complaints", top_complaints)
-    section("Positive Highlights", highlights)
-    section("Recommended Actions", actions)
-    
-    pdf_bytes = pdf.output()
-    
-    # Return PDF
-    return Response(
-        content=bytes(pdf_bytes), 
-        media_type="application/pdf", 
-        headers={"Content-Disposition": f"attachment; filename=report_{month}.pdf"}
-    )
+    # 2. Serve the stored artifact, rendering it off the event loop if needed
+    path = await reports.report_store.get_or_render(month, filters, version, stats)
+    headers = {"Cache-Control": "no-store"} if reports.is_partial(path) else {"ETag": etag, "Cache-Control": "private, no-cache"}
+    return FileResponse(path, media_type="application/pdf", filename=f"report_{month}.pdf", headers=headers)
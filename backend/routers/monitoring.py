@@ -0,0 +1,56 @@
+import os
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import PlainTextResponse
+from sqlmodel import select, func
+from sqlmodel.ext.asyncio.session import AsyncSession
+from database import get_session
+from models import EnrichmentJob
+from metrics import registry
+from data_version import data_version
+import cluster
+from events import broker
+from insights import weekly_insight
+from llm_cache import llm_cache
+from response_cache import response_cache
+
+router = APIRouter(tags=["monitoring"])
+
+# Optional shared secret for scrapers: Authorization: Bearer <METRICS_TOKEN>
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+QUEUED_STATUSES = ("pending", "processing", "failed")
+_queue_depths = {}
+
+registry.gauge("enrichment_jobs", "Enrichment jobs by status (done jobs are not counted)", ("status",),
+               collect=lambda: {(status,): _queue_depths.get(status, 0) for status in QUEUED_STATUSES})
+registry.gauge("sse_subscribers", "Dashboards connected to /analytics/stream", collect=lambda: {(): broker.subscriber_count})
+registry.gauge("weekly_insight_refreshing", "1 while the weekly insight is being regenerated",
+               collect=lambda: {(): int(weekly_insight.refreshing)})
+registry.gauge("cluster_leader", "1 in the worker that runs scheduled background work (reports, weekly insight)",
+               collect=lambda: {(): int(cluster.leader.is_leader)})
+registry.gauge("data_version", "Current data version (bumped by review and note writes)", collect=lambda: {(): data_version.value})
+registry.gauge("llm_cache_lookups_total", "LLM result cache lookups", ("result",), kind="counter", collect=lambda: {
+    ("memory_hit",): llm_cache.memory_hits, ("disk_hit",): llm_cache.disk_hits, ("miss",): llm_cache.misses,
+})
+registry.gauge("response_cache_requests_total", "Cached read endpoint requests", ("endpoint", "result"), kind="counter",
+               collect=lambda: {
+                   (endpoint, result): counts[endpoint]
+                   for result, counts in (("hit", response_cache.hits), ("not_modified", response_cache.not_modified),
+                                          ("miss", response_cache.misses))
+                   for endpoint in list(counts)
+               })
+
+
+@router.get("/metrics", include_in_schema=False)
+async def prometheus_metrics(request: Request, session: AsyncSession = Depends(get_session)):
+    if METRICS_TOKEN and request.headers.get("authorization") != f"Bearer {METRICS_TOKEN}":
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+
+    # Queue depth is the one value that needs a query; the status index keeps it an index range count
+    rows = (await session.exec(
+        select(EnrichmentJob.status, func.count()).where(EnrichmentJob.status.in_(QUEUED_STATUSES)).group_by(EnrichmentJob.status)
+    )).all()
+    _queue_depths.clear()
+    _queue_depths.update(dict(rows))
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
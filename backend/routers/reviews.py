@@ -1,73 +1,282 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from sqlmodel import Session, select, func
-from typing import List, Optional
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import List, Literal, Optional
+import json
+import time
 from database import get_session
-from models import Review, ReviewCreate, ReviewRead
-from llm_service import process_review_with_llm
+from models import (
+    Admin, Review, ReviewCreate, ReviewRead, ReviewPage, ReviewReadWithNotes, ReviewPageWithNotes,
+    EnrichmentJob, EnrichmentStatusRead,
+)
+import enrichment
+import rollups
+from aspects import set_review_aspects
+from auth import get_current_user
+import ingest
+import export
+from events import broker
+from response_cache import response_cache
+from filters import apply_review_filters
+from classifier import fast_classifier, MIN_CONFIDENCE
+from datetime import datetime
 
 router = APIRouter(prefix="/reviews", tags=["reviews"])
 
+def record_new_review(session: Session, review: Review, keep_labels: bool = False):
+    # Sync bookkeeping, run on the request's connection
+    set_review_aspects(session, review.id, rollups.parse_aspects(review.aspects))
+    rollups.apply_review(session, review)
+    enrichment.enqueue(session, review, keep_labels)
+
 @router.post("/", response_model=ReviewRead)
-async def create_review(review: ReviewCreate, session: Session = Depends(get_session)):
+async def create_review(review: ReviewCreate, session: AsyncSession = Depends(get_session)):
     # 1. Save initial review
     review_data = review.dict(exclude_unset=True)
     if review.createdAt is None:
         review_data.pop("createdAt", None)
         
     db_review = Review(**review_data)
+    confident = False
+    if db_review.sentiment is None:
+        # Instant labels so the review counts in sentiment/aspect views now. Confident ones are kept and
+        # the LLM only writes the summary, action and response; uncertain ones are replaced by its labels
+        labels = fast_classifier.labels(db_review.rating, db_review.content)
+        db_review.sentiment = labels["sentiment"]
+        db_review.aspects = json.dumps(labels["aspects"])
+        confident = labels["confidence"] >= MIN_CONFIDENCE
     session.add(db_review)
-    session.commit()
-    session.refresh(db_review)
-
-    # 2. Process with LLM
-    try:
-        ai_result = await process_review_with_llm(review.rating, review.content)
-        
-        db_review.summary = ai_result.get("summary")
-        db_review.suggestedAction = ai_result.get("suggestedAction")
-        db_review.response = ai_result.get("response")
-        db_review.sentiment = ai_result.get("sentiment")
-        
-        aspects_list = ai_result.get("aspects", [])
-        import json
-        db_review.aspects = json.dumps(aspects_list) if isinstance(aspects_list, list) else json.dumps([])
-        
-        session.add(db_review)
-        session.commit()
-        session.refresh(db_review)
-    except Exception as e:
-        print(f"Error processing LLM: {e}")
-        # Start fresh just in case
-        session.refresh(db_review)
+    await session.flush()
+    # 2. Aspect rows, rollups and the enrichment job in the same transaction; workers fill in the AI fields
+    await session.run_sync(record_new_review, db_review, confident)
+    await session.commit()
+    await session.refresh(db_review)
+    enrichment.worker_pool.notify()
+    broker.publish("review.created", ReviewRead.model_validate(db_review))
         
     return db_review
 
-from models import AdminNote
-from datetime import datetime
+@router.post("/bulk")
+async def bulk_create_reviews(
+    request: Request,
+    format: Optional[Literal["csv", "ndjson"]] = Query(None, description="Defaults from Content-Type (text/csv or application/x-ndjson)"),
+    batch_size: int = Query(ingest.BATCH_SIZE, ge=1, le=10000),
+    enrich: Literal["backfill", "queue", "classify", "none"] = "backfill",
+    session: AsyncSession = Depends(get_session),
+    current_user: Admin = Depends(get_current_user)
+):
+    # Streams the body: rows are parsed, validated and inserted batch by batch, never buffered whole
+    fmt = format or ingest.format_from_content_type(request.headers.get("content-type"))
+    if fmt is None:
+        raise HTTPException(status_code=415, detail="Send text/csv or application/x-ndjson, or pass ?format=")
+
+    parser = ingest.StreamParser(fmt)
+    report = ingest.IngestReport()
+    pending = []
+
+    async def flush(final: bool = False):
+        for batch in ingest.take_batches(pending, batch_size, final):
+            report.inserted += await session.run_sync(ingest.insert_batch, batch, enrich)
+            await session.commit()
+
+    async for chunk in request.stream():
+        ingest.collect(parser.feed(chunk), pending, report)
+        await flush()
+    ingest.collect(parser.finish(), pending, report)
+    await flush(final=True)
+
+    if enrich in ("queue", "classify") and report.inserted:
+        enrichment.worker_pool.notify()
+    if report.inserted:
+        # Too many rows to push one by one; open dashboards refetch their review lists
+        broker.publish("reviews.imported", {"inserted": report.inserted})
+    return report.as_dict()
+
+@router.get("/export")
+async def export_reviews(
+    format: Literal["csv", "ndjson", "parquet"] = "csv",
+    min_rating: Optional[int] = None,
+    search: Optional[str] = None,
+    month: Optional[str] = None,
+    sentiment: Optional[str] = None,
+    aspect: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    current_user: Admin = Depends(get_current_user)
+):
+    if format == "parquet" and not export.parquet_available():
+        raise HTTPException(status_code=501, detail="Parquet export needs pyarrow installed on the server")
+
+    query = apply_review_filters(export.export_query(), min_rating, search, month, sentiment, aspect, start, end)
+    media_type, extension = export.FORMATS[format]
+    return StreamingResponse(
+        export.CHUNK_WRITERS[format](query),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename=reviews.{extension}"},
+    )
+
+@router.get("/{review_id}/enrichment", response_model=EnrichmentStatusRead)
+async def get_enrichment_status(
+    review_id: int,
+    wait: float = Query(0, ge=0, le=30, description="Seconds to wait for enrichment to finish (long-poll)"),
+    session: AsyncSession = Depends(get_session)
+):
+    review = await session.get(Review, review_id)
+    if not review:
+        raise HTTPException(status_code=404, detail="Review not found")
+
+    deadline = time.monotonic() + wait
+    while review.enrichment_status not in enrichment.TERMINAL_STATUSES:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0 or review.enrichment_status not in ("pending", "processing"):
+            break
+        await enrichment.worker_pool.wait_for(review_id, min(remaining, 1.0))
+        session.expire_all()
+        review = await session.get(Review, review_id)
+
+    job = (await session.exec(select(EnrichmentJob).where(EnrichmentJob.review_id == review_id))).first()
+    return EnrichmentStatusRead(
+        review_id=review_id,
+        status=review.enrichment_status,
+        attempts=job.attempts if job else 0,
+        last_error=job.last_error if job else None,
+        next_attempt_at=job.next_attempt_at if job and job.status == "pending" else None,
+        review=ReviewRead.model_validate(review),
+    )
+
+from models import AdminNote, NoteCreate, BulkNoteCreate
+from typing import Dict
+
+MAX_NOTE_IDS = 200
+MAX_BULK_NOTES = 500
+NOTE_PREVIEW_CHARS = 120
+
+def parse_ids(ids: str) -> List[int]:
+    try:
+        parsed = sorted({int(part) for part in ids.split(",") if part.strip()})
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be comma-separated integers")
+    if not parsed:
+        raise HTTPException(status_code=400, detail="ids must not be empty")
+    if len(parsed) > MAX_NOTE_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_NOTE_IDS} ids per request")
+    return parsed
+
+async def missing_review_ids(session: AsyncSession, review_ids: List[int]) -> List[int]:
+    found = set((await session.exec(select(Review.id).where(Review.id.in_(review_ids)))).all())
+    return [review_id for review_id in review_ids if review_id not in found]
+
+@router.get("/notes", response_model=Dict[int, List[AdminNote]])
+async def get_admin_notes_bulk(
+    request: Request,
+    ids: str = Query(..., description=f"Comma-separated review ids (at most {MAX_NOTE_IDS})"),
+    session: AsyncSession = Depends(get_session),
+    current_user: Admin = Depends(get_current_user)
+):
+    # Notes of a whole page of reviews in one request; every requested id gets a (possibly empty) list
+    review_ids = parse_ids(ids)
+
+    async def compute():
+        statement = (
+            select(AdminNote)
+            .where(AdminNote.review_id.in_(review_ids))
+            .order_by(AdminNote.review_id, AdminNote.created_at.desc(), AdminNote.id.desc())
+        )
+        notes: Dict[int, List[AdminNote]] = {review_id: [] for review_id in review_ids}
+        for note in (await session.exec(statement)).all():
+            notes[note.review_id].append(note)
+        return notes
+
+    return await response_cache.respond(request, "notes", {"ids": ",".join(map(str, review_ids))}, compute)
+
+@router.post("/notes", response_model=List[AdminNote])
+async def add_admin_notes_bulk(
+    body: BulkNoteCreate,
+    session: AsyncSession = Depends(get_session),
+    current_user: Admin = Depends(get_current_user)
+):
+    if not body.notes:
+        return []
+    if len(body.notes) > MAX_BULK_NOTES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_NOTES} notes per request")
+    missing = await missing_review_ids(session, sorted({item.review_id for item in body.notes}))
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Reviews not found: {', '.join(map(str, missing))}")
+
+    now = datetime.utcnow()
+    notes = [AdminNote(review_id=item.review_id, admin_id=current_user.id, content=item.content, created_at=now)
+             for item in body.notes]
+    session.add_all(notes)
+    await session.commit()
+    for note in notes:
+        await session.refresh(note)
+    return notes
 
 @router.post("/{review_id}/notes", response_model=AdminNote)
-async def add_admin_note(review_id: int, note_content: str, admin_id: Optional[int] = None, session: Session = Depends(get_session)):
-    review = session.get(Review, review_id)
+async def add_admin_note(
+    review_id: int,
+    body: NoteCreate,
+    session: AsyncSession = Depends(get_session),
+    current_user: Admin = Depends(get_current_user)
+):
+    review = await session.get(Review, review_id)
     if not review:
         raise HTTPException(status_code=404, detail="Review not found")
-    
-    # In a real app, admin_id would come from current_user dependency
-    note = AdminNote(review_id=review_id, admin_id=admin_id, content=note_content, created_at=datetime.utcnow())
+
+    note = AdminNote(review_id=review_id, admin_id=current_user.id, content=body.content, created_at=datetime.utcnow())
     session.add(note)
-    session.commit()
-    session.refresh(note)
+    await session.commit()
+    await session.refresh(note)
     return note
 
 @router.get("/{review_id}/notes", response_model=List[AdminNote])
-async def get_admin_notes(review_id: int, session: Session = Depends(get_session)):
-    statement = select(AdminNote).where(AdminNote.review_id == review_id).order_by(AdminNote.created_at.desc())
-    notes = session.exec(statement).all()
-    return notes
+async def get_admin_notes(review_id: int, request: Request, session: AsyncSession = Depends(get_session)):
+    async def compute():
+        statement = (
+            select(AdminNote).where(AdminNote.review_id == review_id)
+            .order_by(AdminNote.created_at.desc(), AdminNote.id.desc()) # bulk-added notes share a timestamp
+        )
+        return (await session.exec(statement)).all()
+
+    return await response_cache.respond(request, "notes", {"review_id": review_id}, compute)
+
+async def note_summaries(session: AsyncSession, review_ids: List[int]) -> Dict[int, tuple]:
+    """(count, newest note preview, newest created_at) per review that has notes, in one grouped query."""
+    if not review_ids:
+        return {}
+    newest_first = (AdminNote.created_at.desc(), AdminNote.id.desc()) # same order as GET /reviews/{id}/notes
+    ranked = (
+        select(
+            AdminNote.review_id,
+            func.count().over(partition_by=AdminNote.review_id).label("note_count"),
+            func.row_number().over(partition_by=AdminNote.review_id, order_by=newest_first).label("position"),
+            func.substr(AdminNote.content, 1, NOTE_PREVIEW_CHARS).label("preview"),
+            AdminNote.created_at,
+        )
+        .where(AdminNote.review_id.in_(review_ids))
+        .subquery()
+    )
+    statement = select(ranked.c.review_id, ranked.c.note_count, ranked.c.preview, ranked.c.created_at).where(ranked.c.position == 1)
+    rows = (await session.exec(statement)).all()
+    return {review_id: (count, preview, latest_at) for review_id, count, preview, latest_at in rows}
+
+async def with_notes(session: AsyncSession, reviews: List[Review]) -> List[ReviewReadWithNotes]:
+    summaries = await note_summaries(session, [review.id for review in reviews])
+    items = []
+    for review in reviews:
+        count, preview, latest_at = summaries.get(review.id, (0, None, None))
+        items.append(ReviewReadWithNotes(**ReviewRead.model_validate(review).model_dump(),
+                                         note_count=count, latest_note=preview, latest_note_at=latest_at))
+    return items
 
-from typing import Optional
+from typing import Union
+import fulltext
+import pagination
 
-@router.get("/", response_model=List[ReviewRead])
+@router.get("/", response_model=Union[ReviewPageWithNotes, ReviewPage, List[ReviewReadWithNotes], List[ReviewRead]])
 async def read_reviews(
+    request: Request,
     offset: int = 0, 
     limit: int = 20, 
     min_rating: Optional[int] = None,
@@ -75,25 +284,55 @@ async def read_reviews(
     month: Optional[str] = None,
     sentiment: Optional[str] = None,
     aspect: Optional[str] = None,
-    session: Session = Depends(get_session)
+    order: Literal["newest", "relevance"] = "newest",
+    cursor: Optional[str] = Query(None, description="Pass an empty cursor for the first page; returns {items, next_cursor}"),
+    sort: Literal["id", "createdAt"] = Query("id", description="createdAt pages filtered lists straight off the (filter, createdAt) indexes; id suits unfiltered lists"),
+    start: Optional[datetime] = Query(None, description="Only reviews created at or after this time"),
+    end: Optional[datetime] = Query(None, description="Only reviews created before this time"),
+    include_notes: bool = Query(False, description="Add note_count and a preview of the newest admin note to each review"),
+    session: AsyncSession = Depends(get_session)
 ):
-    query = select(Review).order_by(Review.id.desc())
-    
-    if min_rating:
-        query = query.where(Review.rating == min_rating)
-        
-    if search:
-        query = query.where(Review.content.contains(search))
-
-    if month:
-        # SQLite specific: strftime('%Y-%m', createdAt)
-        query = query.where(func.strftime('%Y-%m', Review.createdAt) == month)
-    
-    if sentiment:
-        query = query.where(Review.sentiment == sentiment)
-
-    if aspect:
-        query = query.where(Review.aspects.contains(aspect))
+    params = {"offset": offset, "limit": limit, "min_rating": min_rating, "search": search, "month": month,
+              "sentiment": sentiment, "aspect": aspect, "order": order, "cursor": cursor, "sort": sort,
+              "start": start, "end": end, "include_notes": include_notes}
+    # Repeated polls of an unchanged list are answered with 304 or a cached body
+    return await response_cache.respond(request, "reviews", params, lambda: list_reviews(session, **params))
+
+async def list_reviews(session: AsyncSession, offset: int, limit: int, min_rating: Optional[int], search: Optional[str],
+                       month: Optional[str], sentiment: Optional[str], aspect: Optional[str], order: str,
+                       cursor: Optional[str], sort: str, start: Optional[datetime], end: Optional[datetime],
+                       include_notes: bool = False):
+    query = select(Review)
+
+    if cursor is not None:
+        # Keyset pagination: constant cost at any depth, stable while new reviews arrive
+        if order == "relevance":
+            raise HTTPException(status_code=400, detail="Cursor pagination is not supported with order=relevance")
+        try:
+            position = pagination.decode_cursor(cursor, sort)
+        except pagination.InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=f"Invalid cursor: {e}")
+
+        query = pagination.order_newest_first(query, sort)
+        query = pagination.after_cursor(query, position)
+        query = apply_review_filters(query, min_rating, search, month, sentiment, aspect, start, end, paged=True)
+        rows = (await session.exec(query.limit(limit + 1))).all()
+        items = rows[:limit]
+        next_cursor = pagination.encode_cursor(sort, items[-1]) if len(rows) > limit else None
+        if include_notes:
+            return ReviewPageWithNotes(items=await with_notes(session, items), next_cursor=next_cursor)
+        return ReviewPage(items=[ReviewRead.model_validate(review) for review in items], next_cursor=next_cursor)
+
+    if search and order == "relevance":
+        # BM25 ranking joins the FTS index directly instead of filtering by id
+        query = fulltext.order_by_relevance(query, search)
+        search = None
+    else:
+        query = pagination.order_newest_first(query, sort)
+
+    query = apply_review_filters(query, min_rating, search, month, sentiment, aspect, start, end, paged=True)
         
-    reviews = session.exec(query.offset(offset).limit(limit)).all()
-    return reviews
+    reviews = (await session.exec(query.offset(offset).limit(limit))).all()
+    if include_notes:
+        return await with_notes(session, reviews)
+    return [ReviewRead.model_validate(review) for review in reviews]
@@ -42,6 +42,7 @@ import random
 from datetime import datetime, timedelta
 from database import engine
 from models import Review
+import rollups
 
 def seed_reviews():
     print(f"Reading {CSV_PATH}...")
@@ -76,9 +77,11 @@ def seed_reviews():
                     response="Seeded response."
                 )
                 session.add(review)
+                rollups.apply_review(session, review)
                 
             session.commit()
             print(f"✅ Successfully seeded {len(reviews)} reviews with historical dates.")
+            print("ℹ️  Run `python backfill.py` to generate AI summaries for the seeded reviews.")
         
     except Exception as e:
         print(f"❌ Error seeding reviews: {e}")
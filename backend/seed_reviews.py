@@ -4,11 +4,12 @@ import random
 from datetime import datetime, timedelta
 import json
 from sqlmodel import Session, select
-from database import engine, create_db_and_tables
+from database import engine
+from migrate import check_schema
 from models import Review
-
-# Aspect options
-ASPECTS = ["Food", "Service", "Ambience", "Price", "Cleanliness", "Location"]
+import rollups
+from aspects import set_review_aspects
+from classifier import fast_classifier
 
 def seed_reviews():
     print("🌱 Seeding database with reviews from yelp.csv...")
@@ -28,8 +29,8 @@ def seed_reviews():
         print(f"Error reading CSV: {e}")
         return
 
-    # Create DB tables if not exist
-    create_db_and_tables()
+    # The schema comes from `python migrate.py`
+    check_schema()
 
     with Session(engine) as session:
         for i, row in enumerate(selected_rows):
@@ -37,22 +38,15 @@ def seed_reviews():
                 stars = int(row.get("stars", 5))
                 text = row.get("text", "")
                 
-                # Infer Sentiment
-                if stars >= 4:
-                    sentiment = "Positive"
-                elif stars <= 2:
-                    sentiment = "Negative"
-                else:
-                    sentiment = "Neutral"
-                    
+                # Sentiment and aspects from the local classifier (lexicon until a model is trained)
+                labels = fast_classifier.labels(stars, text)
+                sentiment = labels["sentiment"]
+                review_aspects = labels["aspects"]
+
                 # Randomize Date (Last 12 months)
                 days_ago = random.randint(0, 365)
                 fake_date = datetime.now() - timedelta(days=days_ago)
                 
-                # Randomize Aspects (1 to 3 aspects)
-                num_aspects = random.randint(1, 3)
-                review_aspects = random.sample(ASPECTS, num_aspects)
-                
                 new_review = Review(
                     content=text[:1000],  # Fixed field name
                     rating=stars,         # Fixed field name
@@ -62,12 +56,16 @@ def seed_reviews():
                     createdAt=fake_date   # Fixed field name
                 )
                 session.add(new_review)
+                session.flush()
+                set_review_aspects(session, new_review.id, review_aspects)
+                rollups.apply_review(session, new_review)
             except Exception as e:
                 print(f"Skipping row {i}: {e}")
                 continue
         
         session.commit()
         print(f"✅ Successfully added {len(selected_rows)} reviews to the database!")
+        print("ℹ️  Run `python backfill.py` to generate AI summaries for the seeded reviews.")
 
 if __name__ == "__main__":
     seed_reviews()
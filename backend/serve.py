@@ -0,0 +1,49 @@
+import argparse
+import os
+import sys
+
+from dotenv import load_dotenv
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+load_dotenv()
+
+try:
+    import fcntl # noqa: F401 - leader election (cluster.py) needs flock
+except ImportError:
+    fcntl = None
+
+
+def default_workers() -> int:
+    return int(os.getenv("WEB_CONCURRENCY") or os.cpu_count() or 1)
+
+
+if __name__ == "__main__":
+    # Usage: python serve.py [--host 0.0.0.0] [--port 8000] [--workers N]
+    parser = argparse.ArgumentParser(description="Serve the API with one worker process per core.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=default_workers(),
+                        help="Worker processes (default: WEB_CONCURRENCY, else the number of cores)")
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument("--no-access-log", action="store_true")
+    args = parser.parse_args()
+
+    workers = max(args.workers, 1)
+    if workers > 1 and fcntl is None:
+        print("Multi-worker mode needs flock (not available on Windows); serving with one worker")
+        workers = 1
+    # Read by every worker at import (cluster.py); set before anything imports it
+    os.environ["WEB_CONCURRENCY"] = str(workers)
+
+    import uvicorn
+    from database import engine
+    from migrate import check_schema
+
+    engine.echo = False
+    check_schema()
+    if workers > 1:
+        engine.dispose() # workers open their own connections
+
+    print(f"Serving on http://{args.host}:{args.port} with {workers} worker{'s' if workers > 1 else ''}")
+    uvicorn.run("main:app", host=args.host, port=args.port, workers=workers, log_level=args.log_level,
+                access_log=not args.no_access_log)
@@ -0,0 +1,153 @@
+import asyncio
+import os
+import zlib
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import delete
+from sqlalchemy.dialects.sqlite import insert
+from sqlmodel import Session, select, update
+from database import engine
+from models import SummaryChunk
+from llm_cache import make_key
+import llm_service
+
+# Map-reduce summarization: every in-scope review is read, in chunks, instead of the first few thousand characters.
+# Token budgets use llm_service.estimate_tokens (~4 characters per token).
+CHUNK_TOKENS = int(os.getenv("SUMMARY_CHUNK_TOKENS", "3000"))
+INPUT_TOKENS = int(os.getenv("SUMMARY_INPUT_TOKENS", "3000")) # what condense() may hand to a final prompt
+CONCURRENCY = int(os.getenv("SUMMARY_CONCURRENCY", "4"))
+CHUNK_TTL_DAYS = int(os.getenv("SUMMARY_CHUNK_TTL_DAYS", "90"))
+MAX_LEVELS = 4
+# Chunk boundaries are anchored to the reviews themselves: a chunk may end after a review whose
+# id hashes to an anchor (about one in ANCHOR_ITEMS) once it holds MIN_CHUNK_ITEMS, and must end
+# when the token budget is full. Overlapping windows (the rolling week moves every day, filtered
+# reports share a month) cut their common reviews into the same chunks, whatever review they
+# start at, so they share stored chunk summaries.
+ANCHOR_ITEMS = int(os.getenv("SUMMARY_CHUNK_ANCHOR_ITEMS", "32"))
+MIN_CHUNK_ITEMS = max(1, ANCHOR_ITEMS // 4)
+
+# (review id, or None for a note from a lower level; text)
+Item = Tuple[Optional[int], str]
+
+
+def is_anchor(review_id: Optional[int]) -> bool:
+    # A hash, not id % n: filtered windows hold sparse ids, and anchors must stay about 1 in n
+    return review_id is not None and zlib.crc32(review_id.to_bytes(8, "little")) % ANCHOR_ITEMS == 0
+
+
+def pack_chunks(items: Sequence[Item], token_budget: int) -> List[List[Item]]:
+    """
+    Pack items, in the given (id) order, into chunks within token_budget, ending chunks at
+    anchors where possible.
+
+    Two windows starting at different reviews cut their first chunks differently, but they
+    reach the same boundary at the first anchor where both have MIN_CHUNK_ITEMS, and from there
+    their chunks, and keys, match. New reviews likewise only change the tail. Notes from lower
+    levels carry no id and are packed by budget alone.
+    """
+    chunks, current, used = [], [], 0
+    for item in items:
+        cost = llm_service.estimate_tokens(item[1])
+        if current and used + cost > token_budget:
+            chunks.append(current)
+            current, used = [], 0
+        current.append(item)
+        used += cost
+        if len(current) >= MIN_CHUNK_ITEMS and is_anchor(item[0]):
+            chunks.append(current)
+            current, used = [], 0
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def chunk_key(level: int, text: str) -> str:
+    return make_key(llm_service.SUMMARY_CHUNK_PROMPT_VERSION, llm_service.MODEL, level, text)
+
+
+def chunk_text(chunk: Sequence[Item]) -> str:
+    return "\n".join(text for _, text in chunk)
+
+
+def load_chunks(keys: List[str]) -> Dict[str, str]:
+    """Stored summaries for these keys; marks them used so pruning keeps them."""
+    if not keys:
+        return {}
+    with Session(engine) as session:
+        rows = session.exec(select(SummaryChunk.key, SummaryChunk.summary).where(SummaryChunk.key.in_(keys))).all()
+        if rows:
+            session.exec(update(SummaryChunk).where(SummaryChunk.key.in_([key for key, _ in rows]))
+                         .values(last_used_at=datetime.utcnow()))
+            session.commit()
+    return dict(rows)
+
+
+def save_chunk(key: str, level: int, chunk: Sequence[Item], summary: str):
+    review_ids = [review_id for review_id, _ in chunk if review_id is not None]
+    with Session(engine) as session:
+        # A concurrent generation may have stored the same chunk first; either copy will do
+        session.exec(insert(SummaryChunk).values(
+            key=key, level=level, item_count=len(chunk),
+            first_review_id=min(review_ids) if review_ids else None,
+            last_review_id=max(review_ids) if review_ids else None,
+            summary=summary, created_at=datetime.utcnow(), last_used_at=datetime.utcnow(),
+        ).on_conflict_do_nothing(index_elements=["key"]))
+        session.commit()
+
+
+def prune_chunks(ttl_days: int = CHUNK_TTL_DAYS) -> int:
+    """Drop summaries no generation has used for ttl_days (edited or deleted reviews, old filters)."""
+    with Session(engine) as session:
+        result = session.exec(delete(SummaryChunk).where(
+            SummaryChunk.last_used_at < datetime.utcnow() - timedelta(days=ttl_days)))
+        session.commit()
+        return result.rowcount
+
+
+def fits(items: Sequence[Item], token_budget: int) -> bool:
+    return sum(llm_service.estimate_tokens(text) for _, text in items) <= token_budget
+
+
+async def summarize_level(items: Sequence[Item], level: int, semaphore: asyncio.Semaphore) -> List[Item]:
+    """One map pass: a summary per chunk, reusing stored ones and summarizing the rest concurrently."""
+    chunks = pack_chunks(items, CHUNK_TOKENS)
+    texts = [chunk_text(chunk) for chunk in chunks]
+    keys = [chunk_key(level, text) for text in texts]
+    stored = await asyncio.to_thread(load_chunks, list(set(keys)))
+
+    async def summarize(key: str, chunk: Sequence[Item], text: str):
+        async with semaphore:
+            summary = await llm_service.summarize_chunk(text, level)
+        # Saved as soon as it exists, so a failed generation keeps its finished chunks
+        await asyncio.to_thread(save_chunk, key, level, chunk, summary)
+        stored[key] = summary
+
+    missing = {}
+    for key, chunk, text in zip(keys, chunks, texts):
+        if key not in stored and key not in missing:
+            missing[key] = (chunk, text)
+    results = await asyncio.gather(*(summarize(key, chunk, text) for key, (chunk, text) in missing.items()),
+                                   return_exceptions=True)
+    errors = [result for result in results if isinstance(result, BaseException)]
+    if errors:
+        raise errors[0]
+
+    if missing:
+        print(f"Summarized {len(missing)} of {len(chunks)} level-{level} chunks ({len(chunks) - len(missing)} reused)")
+    return [(None, stored[key]) for key in keys]
+
+
+async def condense(items: Sequence[Item], token_budget: int = INPUT_TOKENS) -> str:
+    """
+    Text covering every item that fits in token_budget: the review lines themselves when
+    they fit, otherwise notes reduced level by level until they do.
+    """
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+    level = 0
+    while not fits(items, token_budget) and level < MAX_LEVELS:
+        items = await summarize_level(items, level, semaphore)
+        level += 1
+    text = chunk_text(items)
+    # Safety net if the notes refuse to shrink
+    return text[:token_budget * 4]
@@ -0,0 +1,93 @@
+"""
+Shared test setup. database.py opens "reviews.db" relative to the working directory, so the
+whole session runs in a temporary directory holding a database migrated from scratch; this
+has to happen before any app module is imported.
+"""
+import os
+import tempfile
+
+WORK_DIR = tempfile.mkdtemp(prefix="reviews-tests-")
+os.chdir(WORK_DIR)
+os.environ["GROQ_API_KEY"] = "" # never call the real provider
+os.environ["LLM_CACHE_PATH"] = os.path.join(WORK_DIR, "llm_cache.db")
+os.environ["REPORTS_DIR"] = os.path.join(WORK_DIR, "reports")
+
+import json
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+from sqlmodel import Session, text
+
+import database
+import migrate
+import rollups
+from aspects import set_review_aspects
+from models import AdminNote, Review
+
+database.engine.echo = False
+migrate.upgrade()
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def client():
+    # The app without its lifespan: no background workers, scheduler or LLM client
+    from main import app
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+    # Pooled aiosqlite connections each hold a thread that would keep the test run from exiting
+    await database.async_engine.dispose()
+
+
+@pytest.fixture
+def session():
+    with Session(database.engine) as session:
+        yield session
+
+
+def clear_reviews():
+    # Empty the review tables and everything hanging off them
+    with Session(database.engine) as session:
+        for table in ("adminnote", "enrichment_job", "review_aspect", "review_rollup", "review"):
+            session.exec(text(f'DELETE FROM "{table}"'))
+        session.commit()
+
+
+@pytest.fixture
+def clean_reviews():
+    clear_reviews()
+
+
+SEED_START = datetime(2025, 1, 1)
+SEED_SENTIMENTS = ("Positive", "Neutral", "Negative", None)
+SEED_ASPECTS = ("Food", "Service", "Price", "Ambience")
+
+
+@pytest.fixture(scope="module")
+def seeded():
+    """300 reviews spread over 2025 with every rating, sentiment and aspect; a note on every tenth."""
+    clear_reviews()
+    with Session(database.engine) as session:
+        reviews = []
+        for i in range(300):
+            aspects = [SEED_ASPECTS[i % 4], SEED_ASPECTS[i % 3]]
+            reviews.append(Review(
+                rating=i % 5 + 1, content=f"review {i} about the food" if i % 2 else f"review {i} about the staff",
+                createdAt=SEED_START + timedelta(hours=29 * i), sentiment=SEED_SENTIMENTS[i % 4],
+                aspects=json.dumps(aspects), enrichment_status="done",
+            ))
+        session.add_all(reviews)
+        session.flush()
+        for review in reviews:
+            set_review_aspects(session, review.id, json.loads(review.aspects))
+            if review.id % 10 == 0:
+                session.add(AdminNote(review_id=review.id, content=f"note on {review.id}"))
+        ids = [review.id for review in reviews]
+        session.commit()
+        rollups.rebuild(session)
+    return ids
@@ -0,0 +1,33 @@
+import pytest
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+import auth
+import database
+from models import Admin
+
+pytestmark = pytest.mark.anyio
+
+
+def bearer(token: str):
+    return {"Authorization": f"Bearer {token}"}
+
+
+async def test_stream_token_only_opens_the_stream(client):
+    # "admin" is created by migration 0008
+    login_token = auth.create_access_token({"sub": "admin"})
+    response = await client.post("/auth/stream-token", headers=bearer(login_token))
+    assert response.status_code == 200, response.text
+    stream_token = response.json()["token"]
+
+    async with AsyncSession(database.async_engine) as session:
+        assert (await auth.get_current_user_from_query(stream_token, session)).username == "admin"
+
+    # Not usable as a bearer token, and the login token is not accepted in the stream URL
+    assert (await client.post("/auth/stream-token", headers=bearer(stream_token))).status_code == 401
+    assert (await client.get("/analytics/stream", params={"token": login_token})).status_code == 401
+
+
+async def test_expired_stream_token_is_rejected(client, monkeypatch):
+    monkeypatch.setattr(auth, "STREAM_TOKEN_EXPIRE_SECONDS", -1)
+    token = auth.create_stream_token(Admin(username="admin", hashed_password=""))
+    assert (await client.get("/analytics/stream", params={"token": token})).status_code == 401
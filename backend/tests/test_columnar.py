@@ -0,0 +1,61 @@
+import json
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlmodel import Session, func, select
+
+import database
+from aspects import set_review_aspects
+from columnar import ColumnStore, parse_ints
+from conftest import SEED_ASPECTS
+from models import Review, ReviewAspect
+
+
+def add_review(session: Session, aspects, day: int = 0) -> Review:
+    review = Review(rating=4, content="Good", createdAt=datetime(2025, 6, 1) + timedelta(days=day), aspects=json.dumps(aspects))
+    session.add(review)
+    session.flush()
+    set_review_aspects(session, review.id, aspects)
+    session.commit()
+    return review
+
+
+def test_parse_ints():
+    assert parse_ints("3,-1,42").tolist() == [3, -1, 42]
+    assert parse_ints(None).dtype == np.int64 and not len(parse_ints(""))
+
+
+def test_timeseries_matches_sql(seeded, session):
+    store = ColumnStore()
+    for aspect in (None,) + SEED_ASPECTS:
+        month = func.strftime("%Y-%m", Review.createdAt)
+        query = select(month, func.count(), func.sum(Review.rating))
+        if aspect:
+            query = query.join(ReviewAspect, ReviewAspect.review_id == Review.id).where(ReviewAspect.aspect == aspect)
+        expected = {bucket: (count, round(total / count, 2)) for bucket, count, total in session.exec(query.group_by(month)).all()}
+        result = store.timeseries(1, "month", aspect=aspect)
+        assert {b["bucket"]: (b["count"], b["avg_rating"]) for b in result["buckets"] if b["count"]} == expected, aspect
+
+
+def test_more_than_64_aspects(clean_reviews, session):
+    reviews = [add_review(session, [f"Aspect {i}", "Common"], day=i % 10) for i in range(70)]
+    store = ColumnStore()
+    assert store.timeseries(1, aspect="Aspect 69")["total_reviews"] == 1
+    assert store.timeseries(1, aspect="Aspect 3")["total_reviews"] == 1
+    assert store.timeseries(1, aspect="Common")["total_reviews"] == 70
+    assert store.timeseries(1, aspect="Unknown")["total_reviews"] == 0
+
+    # Kept current across syncs: an appended review, an edit and a deletion
+    add_review(session, ["Aspect 69", "Aspect 70"])
+    edited = session.get(Review, reviews[0].id)
+    edited.aspects = json.dumps(["Aspect 69"])
+    set_review_aspects(session, edited.id, ["Aspect 69"])
+    session.add(edited)
+    session.delete(session.get(Review, reviews[69].id))
+    session.exec(ReviewAspect.__table__.delete().where(ReviewAspect.review_id == reviews[69].id))
+    session.commit()
+
+    assert store.timeseries(2, aspect="Aspect 69")["total_reviews"] == 2
+    assert store.timeseries(2, aspect="Aspect 70")["total_reviews"] == 1
+    assert store.timeseries(2, aspect="Aspect 0")["total_reviews"] == 0
+    assert store.timeseries(2, aspect="Common")["total_reviews"] == 68
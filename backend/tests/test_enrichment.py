@@ -0,0 +1,212 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from sqlmodel import Session, select
+
+import database
+import enrichment
+import llm_service
+from classifier import fast_classifier
+from llm_cache import llm_cache
+from llm_client import LLMError
+from models import EnrichmentJob, Review
+
+pytestmark = pytest.mark.usefixtures("clean_reviews")
+
+
+def add_job(session: Session, **fields) -> EnrichmentJob:
+    review = Review(rating=4, content="Good food", createdAt=datetime(2025, 6, 1))
+    session.add(review)
+    session.flush()
+    enrichment.enqueue(session, review)
+    session.commit()
+    job = session.exec(select(EnrichmentJob).where(EnrichmentJob.review_id == review.id)).one()
+    for name, value in fields.items():
+        setattr(job, name, value)
+    session.add(job)
+    session.commit()
+    return job
+
+
+def test_claim_leases_the_oldest_due_job(session):
+    later = add_job(session, next_attempt_at=datetime.utcnow() - timedelta(seconds=10))
+    oldest = add_job(session, next_attempt_at=datetime.utcnow() - timedelta(seconds=60))
+    add_job(session, next_attempt_at=datetime.utcnow() + timedelta(minutes=5)) # backing off
+
+    job = enrichment.claim_next_job(session)
+    assert job.id == oldest.id
+    assert job.status == "processing"
+    assert job.lease_expires_at > datetime.utcnow() + timedelta(seconds=enrichment.LEASE_SECONDS - 5)
+    assert enrichment.claim_next_job(session).id == later.id
+    assert enrichment.claim_next_job(session) is None
+
+
+def test_expired_lease_is_reclaimed_by_any_worker(session):
+    live = add_job(session, status="processing", lease_expires_at=datetime.utcnow() + timedelta(seconds=30))
+    add_job(session) # due now, but a dead worker's job goes first
+    dead = add_job(session, status="processing", lease_expires_at=datetime.utcnow() - timedelta(seconds=1))
+
+    job = enrichment.claim_next_job(session)
+    assert job.id == dead.id
+    assert job.lease_expires_at > datetime.utcnow()
+    assert enrichment.claim_next_job(session).id not in (live.id, dead.id)
+    assert enrichment.claim_next_job(session) is None # a live lease is left alone
+
+
+def test_renew_lease_only_while_processing(session):
+    job = add_job(session, status="processing", lease_expires_at=datetime.utcnow() + timedelta(seconds=1))
+    assert enrichment.renew_lease(session, job.id)
+    session.refresh(job)
+    assert job.lease_expires_at > datetime.utcnow() + timedelta(seconds=enrichment.LEASE_SECONDS - 5)
+
+    job.status = "done"
+    session.add(job)
+    session.commit()
+    assert not enrichment.renew_lease(session, job.id)
+
+
+def test_late_finish_after_a_takeover_is_ignored(session):
+    job = add_job(session, status="done", attempts=1)
+    enrichment.worker_pool._finish(job.id, job.review_id, {"summary": "stale"}, None)
+    session.refresh(job)
+    assert job.attempts == 1
+    assert session.get(Review, job.review_id).summary is None
+
+
+@pytest.mark.anyio
+async def test_lease_is_renewed_while_the_llm_call_runs(monkeypatch):
+    monkeypatch.setattr(enrichment, "LEASE_SECONDS", 0.15)
+    renewals = []
+
+    async def slow_enrich(rating, content):
+        # Several heartbeats, then check the lease is still ahead of the clock
+        await asyncio.sleep(0.25)
+        with Session(database.engine) as session:
+            renewals.append(session.get(EnrichmentJob, job_id).lease_expires_at)
+        return {"summary": "ok", "sentiment": "Positive", "aspects": ["Food"]}
+
+    monkeypatch.setattr(enrichment, "enrich_review", slow_enrich)
+    with Session(database.engine) as session:
+        add_job(session)
+        claimed = enrichment.claim_next_job(session)
+        job_id, review_id = claimed.id, claimed.review_id
+
+    await enrichment.worker_pool._process(job_id, review_id)
+
+    assert renewals[0] > datetime.utcnow() - timedelta(seconds=0.05)
+    with Session(database.engine) as session:
+        job = session.get(EnrichmentJob, job_id)
+        assert (job.status, job.lease_expires_at) == ("done", None)
+        assert session.get(Review, review_id).summary == "ok"
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("reply", [
+    {"summary": 3, "suggestedAction": "Thank them", "response": "Thanks!", "sentiment": "Positive", "aspects": []},
+    {"summary": "Liked it", "suggestedAction": "Thank them", "response": "Thanks!", "sentiment": "Ecstatic", "aspects": []},
+    {"summary": "Liked it", "suggestedAction": "Thank them", "response": ["Thanks!"], "sentiment": "Positive"},
+])
+async def test_malformed_single_result_is_never_cached(monkeypatch, reply):
+    async def chat_json(prompt, temperature=0.5):
+        return reply
+
+    monkeypatch.setattr(llm_service, "_chat_json", chat_json)
+    text = f"Malformed reply {len(str(reply))}"
+    with pytest.raises(LLMError) as raised:
+        await llm_service.enrich_review(4, text)
+    assert (raised.value.reason, raised.value.retryable) == ("invalid_result", True)
+    assert llm_cache.get(llm_service.review_cache_key(4, text)) is None
+
+    valid = {**reply, "summary": "Liked it", "response": "Thanks!", "sentiment": "Positive", "aspects": ["Food"]}
+    monkeypatch.setattr(llm_service, "_chat_json", lambda prompt, temperature=0.5: asyncio.sleep(0, valid))
+    assert (await llm_service.enrich_review(4, text))["sentiment"] == "Positive"
+    assert llm_cache.get(llm_service.review_cache_key(4, text))["aspects"] == ["Food"]
+
+
+@pytest.mark.anyio
+async def test_unexpected_errors_count_as_attempts(monkeypatch):
+    async def enrich(rating, content):
+        return {"summary": "ok", "suggestedAction": "none", "response": "Thanks", "sentiment": "Positive", "aspects": []}
+
+    def broken_apply(*args):
+        raise RuntimeError("apply failed")
+
+    monkeypatch.setattr(enrichment, "enrich_review", enrich)
+    monkeypatch.setattr(enrichment, "apply_result", broken_apply)
+    with Session(database.engine) as session:
+        job = add_job(session, status="processing", attempts=enrichment.MAX_ATTEMPTS - 2)
+        job_id, review_id = job.id, job.review_id
+
+    await enrichment.worker_pool._enrich(job_id, review_id)
+    with Session(database.engine) as session:
+        retried = session.get(EnrichmentJob, job_id)
+        assert (retried.status, retried.attempts, retried.lease_expires_at) == ("pending", enrichment.MAX_ATTEMPTS - 1, None)
+        assert "apply failed" in retried.last_error
+        retried.status = "processing"
+        session.add(retried)
+        session.commit()
+
+    await enrichment.worker_pool._enrich(job_id, review_id)
+    with Session(database.engine) as session:
+        assert session.get(EnrichmentJob, job_id).status == "failed"
+        assert session.get(Review, review_id).enrichment_status == "failed"
+
+
+def test_finish_drops_the_job_of_a_deleted_review(session):
+    job = add_job(session, status="processing")
+    job_id, review_id = job.id, job.review_id
+    session.delete(session.get(Review, review_id))
+    session.commit()
+    enrichment.worker_pool._finish(job_id, review_id, {"summary": "ok"}, None)
+    session.expire_all()
+    assert session.get(EnrichmentJob, job_id) is None
+
+
+@pytest.mark.anyio
+async def test_worker_survives_a_failed_claim(monkeypatch):
+    monkeypatch.setattr(enrichment, "POLL_INTERVAL_SECONDS", 0.01)
+    claims = []
+
+    def claim():
+        claims.append(1)
+        if len(claims) == 1:
+            raise RuntimeError("database is locked")
+        return None, None
+
+    pool = enrichment.EnrichmentWorkerPool(worker_count=1)
+    monkeypatch.setattr(pool, "_claim", claim)
+    pool.start()
+    try:
+        for _ in range(100):
+            if len(claims) >= 3:
+                break
+            await asyncio.sleep(0.01)
+        assert len(claims) >= 3 and not pool._tasks[0].done()
+    finally:
+        await pool.stop()
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("confidence, kept", [(0.95, True), (0.3, False)])
+async def test_confident_classifier_labels_survive_enrichment(client, monkeypatch, confidence, kept):
+    monkeypatch.setattr(enrichment.worker_pool, "notify", lambda: None)
+    monkeypatch.setattr(fast_classifier, "labels", lambda rating, text: {
+        "sentiment": "Positive", "aspects": ["Food"], "confidence": confidence,
+    })
+    response = await client.post("/reviews/", json={"rating": 5, "content": "Lovely pasta"})
+    assert response.status_code == 200, response.text
+    review_id = response.json()["id"]
+    with Session(database.engine) as session:
+        job = enrichment.claim_next_job(session)
+        assert (job.review_id, job.keep_labels) == (review_id, kept)
+        job_id = job.id
+
+    llm = {"summary": "Loved the pasta", "suggestedAction": "Thank them", "response": "Thanks!",
+           "sentiment": "Neutral", "aspects": ["Service"]}
+    enrichment.worker_pool._finish(job_id, review_id, llm, None)
+    with Session(database.engine) as session:
+        review = session.get(Review, review_id)
+        assert (review.summary, review.enrichment_status) == ("Loved the pasta", "done")
+        assert (review.sentiment, json.loads(review.aspects)) == (("Positive", ["Food"]) if kept else ("Neutral", ["Service"]))
@@ -0,0 +1,123 @@
+import json
+
+import pytest
+from sqlmodel import Session, select, text
+
+import ingest
+import rollups
+from auth import get_current_user
+from data_version import data_version
+from models import Admin, EnrichmentJob, Review
+
+pytestmark = pytest.mark.usefixtures("clean_reviews")
+
+CSV_BODY = (
+    "\ufeffstars,text,date,aspects,sentiment,summary\r\n"
+    '5,"Great pasta, friendly staff",2025-02-01T12:00:00,"[""Food"", ""Service""]",Positive,Loved it\r\n'
+    "7,Out of range,2025-02-02T12:00:00,,,\r\n"
+    '2,"Cold soup.\nSlow waiter",2025-02-03T12:00:00,"[""Food""]",Negative,\r\n'
+    "4,Nice terrace\r\n"
+    "3,Okay,2025-03-01T09:30:00,,,\r\n"
+    ",,,,,\r\n"
+    "1,Rude,2025-03-02T10:00:00,,Furious,\r\n"
+    "4,Good value,2025-03-05T18:00:00,,,\r\n"
+).encode()
+
+
+def parse(fmt: str, data: bytes, chunk_size: int = 1):
+    parser = ingest.StreamParser(fmt)
+    rows = []
+    for i in range(0, len(data), chunk_size):
+        rows.extend(parser.feed(data[i:i + chunk_size]))
+    rows.extend(parser.finish())
+    return rows
+
+
+def rollup_rows(session: Session):
+    return session.exec(text("SELECT grain, bucket, rating, sentiment, aspect, count FROM review_rollup ORDER BY 1, 2, 3, 4, 5")).all()
+
+
+@pytest.fixture
+async def admin_client(client):
+    from main import app
+    app.dependency_overrides[get_current_user] = lambda: Admin(id=1, username="admin", hashed_password="")
+    yield client
+    app.dependency_overrides.pop(get_current_user, None)
+
+
+def test_csv_parser_streams_byte_by_byte():
+    rows = parse("csv", CSV_BODY)
+    assert [number for number, _ in rows] == [1, 2, 3, 4, 5, 6, 7, 8]
+    assert rows[0][1] == {"rating": "5", "content": "Great pasta, friendly staff", "createdAt": "2025-02-01T12:00:00",
+                          "aspects": '["Food", "Service"]', "sentiment": "Positive", "summary": "Loved it"}
+    assert rows[2][1]["content"] == "Cold soup.\nSlow waiter" # quoted newline split across chunks
+    assert isinstance(rows[3][1], ValueError) # short row
+    assert rows[5][1] == {} # empty cells are "not set"
+    assert isinstance(parse("csv", b'rating,content\n5,"never closed\n')[-1][1], ValueError)
+
+
+def test_ndjson_parser_reports_bad_lines():
+    data = b'{"rating": 5, "content": "ok"}\n\nnot json\n[1, 2]\n{"rating": 4, "content": "last, no newline"}'
+    rows = parse("ndjson", data, chunk_size=7)
+    assert [number for number, _ in rows] == [1, 2, 3, 4]
+    assert isinstance(rows[1][1], ValueError) and isinstance(rows[2][1], ValueError)
+    assert rows[3][1]["content"] == "last, no newline"
+
+
+@pytest.mark.parametrize("raw, message", [
+    ({"rating": "7", "content": "x"}, "rating"),
+    ({"rating": "3", "content": "   "}, "content"),
+    ({"rating": "3", "content": "x", "sentiment": "Furious"}, "sentiment"),
+    ({"content": "x"}, "rating"),
+])
+def test_validate_row_rejects(raw, message):
+    with pytest.raises(ValueError, match=message):
+        ingest.validate_row(raw)
+
+
+@pytest.mark.anyio
+async def test_bulk_endpoint_imports_in_batches(admin_client, session):
+    version = data_version.value
+
+    async def body():
+        for i in range(0, len(CSV_BODY), 17):
+            yield CSV_BODY[i:i + 17]
+
+    response = await admin_client.post("/reviews/bulk", params={"batch_size": 2, "enrich": "queue"},
+                                       headers={"Content-Type": "text/csv"}, content=body())
+    assert response.status_code == 200, response.text
+    report = response.json()
+    assert (report["inserted"], report["failed"]) == (4, 4)
+    assert [error["row"] for error in report["errors"]] == [2, 4, 6, 7]
+
+    reviews = session.exec(select(Review).order_by(Review.id)).all()
+    assert [review.content for review in reviews] == ["Great pasta, friendly staff", "Cold soup.\nSlow waiter", "Okay", "Good value"]
+    assert reviews[1].sentiment == "Negative" and json.loads(reviews[1].aspects) == ["Food"]
+    assert all(review.sentiment for review in reviews) # classifier labels for the unlabelled rows
+    # Rows that already carry a summary and sentiment need no enrichment; the rest are queued
+    assert [review.enrichment_status for review in reviews] == ["done", "pending", "pending", "pending"]
+    assert sorted(session.exec(select(EnrichmentJob.review_id)).all()) == [review.id for review in reviews[1:]]
+
+    assert session.exec(text("SELECT aspect FROM review_aspect WHERE review_id = :id ORDER BY 1"),
+                        params={"id": reviews[0].id}).all() == [("Food",), ("Service",)]
+    assert session.exec(text("SELECT rowid FROM review_fts WHERE review_fts MATCH 'waiter'")).all() == [(reviews[1].id,)]
+    imported = rollup_rows(session)
+    rollups.rebuild(session)
+    assert imported == rollup_rows(session)
+    assert data_version.value > version # cached list responses are invalidated
+
+
+@pytest.mark.anyio
+async def test_bulk_endpoint_needs_a_format(admin_client):
+    response = await admin_client.post("/reviews/bulk", headers={"Content-Type": "text/plain"}, content=b"rating\n5\n")
+    assert response.status_code == 415
+
+
+def test_ingest_file_without_enrichment(tmp_path, session):
+    path = tmp_path / "reviews.ndjson"
+    path.write_text("\n".join(json.dumps({"rating": 1 + i % 5, "content": f"review {i}", "createdAt": "2025-05-01T00:00:00"})
+                              for i in range(5)) + "\nbroken\n")
+    report = ingest.ingest_file(session, str(path), "ndjson", batch_size=2, enrich="none")
+    assert (report.inserted, report.failed) == (5, 1)
+    assert session.exec(select(Review.enrichment_status, Review.sentiment).distinct()).all() == [(None, None)]
+    assert session.exec(select(EnrichmentJob)).all() == []
@@ -0,0 +1,36 @@
+from datetime import datetime
+
+import pytest
+from sqlmodel import Session, text
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+import cluster
+import database
+import insights
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def service(client, monkeypatch):
+    # client: disposes the async engine afterwards
+    with Session(database.engine) as session:
+        session.exec(text("DELETE FROM insight_snapshot"))
+        session.commit()
+    monkeypatch.setattr(insights.llm_service, "API_KEY", "test-key")
+    return insights.WeeklyInsightService()
+
+
+async def test_follower_without_a_snapshot_reports_refreshing(service, monkeypatch):
+    # The leader is generating the first insight; this worker has nothing to show yet but must keep the dashboard polling
+    monkeypatch.setattr(cluster.leader, "is_leader", False)
+    async with AsyncSession(database.async_engine) as session:
+        assert await service.get(session) == {"summary": None, "generated_at": None, "stale": True, "refreshing": True}
+
+
+async def test_failed_first_generation_stops_the_polling(service, monkeypatch):
+    monkeypatch.setattr(cluster.leader, "is_leader", True)
+    service._failed_at = datetime.utcnow() # within RETRY_AFTER_FAILURE_SECONDS: no new attempt
+    async with AsyncSession(database.async_engine) as session:
+        result = await service.get(session)
+    assert (result["summary"], result["refreshing"]) == ("Could not generate insight.", False)
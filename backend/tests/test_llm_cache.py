@@ -0,0 +1,56 @@
+import asyncio
+import threading
+
+import pytest
+
+from llm_cache import LLMCache
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return LLMCache(path=str(tmp_path / "llm_cache.db"), memory_items=2)
+
+
+def record_threads(cache, monkeypatch):
+    threads = []
+    for name in ("_disk_get", "_disk_set"):
+        original = getattr(cache, name)
+
+        def wrapped(*args, original=original):
+            threads.append(threading.get_ident())
+            return original(*args)
+
+        monkeypatch.setattr(cache, name, wrapped)
+    return threads
+
+
+async def test_sqlite_tier_runs_off_the_event_loop(cache, monkeypatch):
+    threads = record_threads(cache, monkeypatch)
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"summary": "ok"}
+
+    # Concurrent callers share one computation
+    results = await asyncio.gather(*(cache.get_or_compute("a", compute) for _ in range(3)))
+    assert results == [{"summary": "ok"}] * 3 and len(calls) == 1
+    assert threads and threading.get_ident() not in threads
+
+    threads.clear()
+    assert await cache.get_or_compute("a", compute) == {"summary": "ok"}
+    assert threads == [] # memory hit: no SQLite at all
+    assert cache.memory_hits == 1
+
+
+async def test_disk_tier_outlives_the_memory_tier(cache):
+    for key in ("a", "b", "c"):
+        await cache.store(key, key.upper())
+    assert len(cache._memory) == 2
+    assert await cache.lookup("a") == "A" # evicted from memory, read back from SQLite
+    assert (cache.disk_hits, cache.get("a"), cache.memory_hits) == (1, "A", 1)
+    assert await cache.lookup("missing") is None and cache.misses == 1
+    assert cache.stats()["disk_items"] == 3
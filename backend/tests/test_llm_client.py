@@ -0,0 +1,131 @@
+import asyncio
+import json
+import time
+
+import httpx
+import pytest
+
+import llm_client as llm_client_module
+from llm_client import CircuitBreaker, LLMClient, LLMError
+
+pytestmark = pytest.mark.anyio
+
+COMPLETION = {"choices": [{"message": {"content": "ok"}}], "usage": {"prompt_tokens": 3}}
+
+
+def make_client(handler, max_concurrency=4, failure_threshold=2) -> LLMClient:
+    client = LLMClient(base_url="http://llm.test", max_concurrency=max_concurrency, max_retries=2)
+    client.breaker = CircuitBreaker(failure_threshold=failure_threshold, reset_seconds=60)
+    client._http = httpx.AsyncClient(base_url=client.base_url, transport=httpx.MockTransport(handler))
+    client._semaphore = asyncio.Semaphore(max_concurrency)
+    return client
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(llm_client_module, "backoff_delay", lambda attempt, retry_after=None: 0)
+
+
+async def test_retries_transient_errors_then_succeeds():
+    statuses = iter([503, 429, 200])
+
+    def handler(request):
+        status = next(statuses)
+        return httpx.Response(status, json=COMPLETION if status == 200 else {})
+
+    client = make_client(handler)
+    assert await client.chat([], model="m") == ("ok", {"prompt_tokens": 3})
+    assert client.breaker.state == "closed"
+
+
+async def test_client_errors_are_not_retried():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(401, text="bad key")
+
+    client = make_client(handler)
+    with pytest.raises(LLMError) as raised:
+        await client.chat([], model="m")
+    assert not raised.value.retryable and raised.value.reason == "http_401"
+    assert len(calls) == 1
+    assert client.breaker.state == "closed" # the provider answered: it is up
+
+
+async def test_breaker_opens_and_fails_fast():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(503)
+
+    client = make_client(handler, failure_threshold=2)
+    for _ in range(2):
+        with pytest.raises(LLMError):
+            await client.chat([], model="m")
+    assert client.breaker.state == "open"
+
+    sent = len(calls)
+    with pytest.raises(LLMError) as raised:
+        await client.chat([], model="m")
+    assert raised.value.reason == "circuit_open"
+    assert len(calls) == sent
+
+
+async def test_half_open_trial_success_closes_breaker():
+    client = make_client(lambda request: httpx.Response(200, json=COMPLETION))
+    client.breaker.opened_at = time.monotonic() - 61
+    assert client.breaker.state == "half_open"
+    await client.chat([], model="m")
+    assert client.breaker.state == "closed"
+
+
+async def test_half_open_allows_one_trial_at_a_time():
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=60)
+    breaker.opened_at = time.monotonic() - 61
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+
+async def test_cancelled_trial_releases_half_open_slot():
+    release = asyncio.Event()
+
+    async def handler(request):
+        await release.wait()
+        return httpx.Response(200, json=COMPLETION)
+
+    client = make_client(handler)
+    client.breaker.opened_at = time.monotonic() - 61
+    trial = asyncio.create_task(client.chat([], model="m"))
+    await asyncio.sleep(0.01)
+    assert not client.breaker.allow() # the trial is in flight
+
+    trial.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await trial
+    assert client.breaker.state == "half_open"
+    release.set()
+    assert await client.chat([], model="m") == ("ok", {"prompt_tokens": 3})
+    assert client.breaker.state == "closed"
+
+
+async def test_backoff_does_not_hold_a_concurrency_slot(monkeypatch):
+    monkeypatch.setattr(llm_client_module, "backoff_delay", lambda attempt, retry_after=None: 0.3)
+    failed_once = set()
+
+    def handler(request):
+        caller = json.loads(request.content)["caller"]
+        if caller == "slow" and caller not in failed_once:
+            failed_once.add(caller)
+            return httpx.Response(503)
+        return httpx.Response(200, json=COMPLETION)
+
+    client = make_client(handler, max_concurrency=1)
+    slow = asyncio.create_task(client._attempts({"caller": "slow"}))
+    await asyncio.sleep(0.05) # slow has failed once and is backing off
+    fast = await asyncio.wait_for(client._attempts({"caller": "fast"}), timeout=0.2)
+    assert fast[0] == "ok" and not slow.done()
+    assert (await slow)[0] == "ok"
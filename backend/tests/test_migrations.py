@@ -0,0 +1,114 @@
+import pytest
+from sqlmodel import Session, SQLModel, create_engine, text
+
+import migrate
+import models # noqa: F401 - registers the tables on SQLModel.metadata
+import rollups
+from migrations import MigrationContext
+
+# Before the enrichment columns (0002) and every table added since
+LEGACY_REVIEW_SQL = """
+    CREATE TABLE review (
+        id INTEGER NOT NULL PRIMARY KEY, rating INTEGER NOT NULL, content VARCHAR NOT NULL,
+        response VARCHAR, summary VARCHAR, "suggestedAction" VARCHAR, "createdAt" DATETIME NOT NULL,
+        sentiment VARCHAR, aspects VARCHAR
+    )
+"""
+LEGACY_ROWS = [
+    (1, 5, "Lovely pasta and friendly staff", "Positive", '["Food", "Service"]', "2025-03-02 10:00:00"),
+    (2, 2, "Cold soup, slow waiter", "Negative", '["Food", "Service", ""]', "2025-03-15 19:30:00"),
+    (3, 3, "Fine", None, "not json", "2025-04-01 12:00:00"),
+]
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    # A database of its own, so migrations start from nothing (or from a hand-built legacy schema)
+    engine = create_engine(f"sqlite:///{tmp_path / 'migrate.db'}")
+    monkeypatch.setattr(migrate, "engine", engine)
+    yield engine
+    engine.dispose()
+
+
+def columns(session: Session, table: str):
+    return {row[1] for row in session.exec(text(f'PRAGMA table_info("{table}")')).all()}
+
+
+def test_new_database_reaches_the_model_schema(engine):
+    assert migrate.upgrade() == len(migrate.available_migrations())
+    migrate.check_schema()
+    with Session(engine) as session:
+        assert migrate.current_version(session) == migrate.latest_version()
+        indexes = {row[0] for row in session.exec(text("SELECT name FROM sqlite_master WHERE type = 'index'")).all()}
+        # The frozen DDL has to keep up with the models: a model change needs a migration
+        for table in SQLModel.metadata.sorted_tables:
+            assert columns(session, table.name) == {column.name for column in table.columns}, table.name
+            assert {index.name for index in table.indexes} <= indexes, table.name
+        assert session.exec(text("SELECT version FROM data_version")).all() == [(0,)]
+        assert session.exec(text("SELECT username FROM admin")).all() == [("admin",)]
+
+
+def test_rerun_is_a_no_op(engine):
+    migrate.upgrade()
+    with Session(engine) as session:
+        before = session.exec(text("SELECT type, name, sql FROM sqlite_master ORDER BY name")).all()
+    assert migrate.upgrade() == 0
+    with Session(engine) as session:
+        assert session.exec(text("SELECT type, name, sql FROM sqlite_master ORDER BY name")).all() == before
+        assert session.exec(text("SELECT COUNT(*) FROM admin")).one()[0] == 1
+
+
+def test_check_schema_refuses_an_older_database(engine):
+    with pytest.raises(migrate.SchemaOutOfDate):
+        migrate.check_schema()
+    migrate.upgrade(target=migrate.latest_version() - 1)
+    with pytest.raises(migrate.SchemaOutOfDate, match="python migrate.py"):
+        migrate.check_schema()
+    migrate.upgrade()
+    migrate.check_schema()
+
+
+def test_legacy_database_is_upgraded_in_place(engine):
+    with Session(engine) as session:
+        session.exec(text(LEGACY_REVIEW_SQL))
+        for row in LEGACY_ROWS:
+            session.exec(text(
+                'INSERT INTO review (id, rating, content, sentiment, aspects, "createdAt") VALUES (:id, :rating, :content, :sentiment, :aspects, :created)'
+            ), params=dict(zip(("id", "rating", "content", "sentiment", "aspects", "created"), row)))
+        session.commit()
+
+    migrate.upgrade(batch_size=2)
+
+    with Session(engine) as session:
+        assert "enrichment_status" in columns(session, "review")
+        assert session.exec(text("SELECT review_id, aspect FROM review_aspect ORDER BY 1, 2")).all() == [
+            (1, "Food"), (1, "Service"), (2, "Food"), (2, "Service"),
+        ]
+        assert session.exec(text("SELECT rowid FROM review_fts WHERE review_fts MATCH 'soup'")).all() == [(2,)]
+        # 0007 builds what rollups.rebuild() would
+        rollup_sql = text("SELECT grain, bucket, rating, sentiment, aspect, count FROM review_rollup ORDER BY 1, 2, 3, 4, 5")
+        built = session.exec(rollup_sql).all()
+        rollups.rebuild(session)
+        assert built and session.exec(rollup_sql).all() == built
+
+
+def test_backfill_resumes_after_an_interruption(engine):
+    migrate.upgrade()
+    rows = [(i,) for i in range(1, 8)]
+    applied = []
+
+    def fetch(session, after, limit):
+        return [row for row in rows if after is None or row[0] > after][:limit]
+
+    def failing_apply(session, batch):
+        if applied:
+            raise RuntimeError("interrupted")
+        applied.extend(batch)
+
+    with Session(engine) as session:
+        with pytest.raises(RuntimeError):
+            MigrationContext(session, 99, batch_size=3).backfill("step", fetch, failing_apply)
+    with Session(engine) as session:
+        # The first batch committed with its cursor; the rerun starts after it
+        assert MigrationContext(session, 99, batch_size=3).backfill("step", fetch, lambda session, batch: applied.extend(batch)) == 4
+    assert applied == rows
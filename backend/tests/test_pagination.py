@@ -0,0 +1,85 @@
+import base64
+from datetime import datetime
+
+import pytest
+from sqlmodel import Session, select
+
+import database
+import pagination
+from models import Review, ReviewAspect
+
+pytestmark = [pytest.mark.anyio, pytest.mark.usefixtures("seeded")]
+
+
+async def walk(client, **params):
+    """Every id of a cursor-paginated listing, page by page."""
+    ids, cursor, pages = [], "", 0
+    while cursor is not None:
+        response = await client.get("/reviews/", params={**params, "cursor": cursor})
+        assert response.status_code == 200, response.text
+        page = response.json()
+        ids.extend(item["id"] for item in page["items"])
+        cursor = page["next_cursor"]
+        pages += 1
+    return ids, pages
+
+
+def expected_ids(sort: str, min_rating=None, aspect=None):
+    query = pagination.order_newest_first(select(Review.id), sort)
+    if min_rating:
+        query = query.where(Review.rating == min_rating) # the API filter is an exact rating
+    if aspect:
+        query = query.join(ReviewAspect, ReviewAspect.review_id == Review.id).where(ReviewAspect.aspect == aspect)
+    with Session(database.engine) as session:
+        return session.exec(query).all()
+
+
+@pytest.mark.parametrize("sort", pagination.SORTS)
+@pytest.mark.parametrize("filters", [{}, {"min_rating": 4}, {"aspect": "Service"}, {"min_rating": 2, "aspect": "Food"}])
+async def test_pages_cover_the_listing_once_in_order(client, sort, filters):
+    ids, pages = await walk(client, sort=sort, limit=7, **filters)
+    expected = expected_ids(sort, **filters)
+    assert ids == expected
+    assert pages == len(expected) // 7 + 1
+
+
+async def test_new_reviews_do_not_shift_later_pages(client):
+    first = (await client.get("/reviews/", params={"cursor": "", "sort": "createdAt", "limit": 10})).json()
+    with Session(database.engine) as session:
+        newer = Review(rating=5, content="arrived while paging", createdAt=datetime(2030, 1, 1))
+        session.add(newer)
+        session.commit()
+        try:
+            rest, _ = await walk(client, sort="createdAt", limit=10)
+            second = (await client.get("/reviews/", params={"cursor": first["next_cursor"], "sort": "createdAt", "limit": 10})).json()
+        finally:
+            session.delete(newer)
+            session.commit()
+    assert rest[0] == newer.id
+    assert [item["id"] for item in second["items"]] == expected_ids("createdAt")[10:20]
+
+
+async def test_first_page_with_notes(client):
+    page = (await client.get("/reviews/", params={"cursor": "", "limit": 10, "include_notes": True})).json()
+    noted = [item for item in page["items"] if item["id"] % 10 == 0]
+    assert noted and all(item["note_count"] == 1 for item in noted)
+    assert all(item["note_count"] == 0 for item in page["items"] if item["id"] % 10)
+
+
+@pytest.mark.parametrize("params", [
+    {"cursor": "not-a-cursor"},
+    {"cursor": base64.urlsafe_b64encode(b"[1]").decode()}, # valid JSON, but not a position
+    {"cursor": pagination.encode_cursor("id", Review(id=5)), "sort": "createdAt"}, # from another sort
+    {"cursor": "", "order": "relevance", "search": "food"},
+])
+async def test_rejected_cursors(client, params):
+    response = await client.get("/reviews/", params=params)
+    assert response.status_code == 400
+
+
+def test_cursor_round_trip():
+    review = Review(id=42, createdAt=datetime(2025, 3, 4, 5, 6, 7, 89))
+    assert pagination.decode_cursor(pagination.encode_cursor("createdAt", review), "createdAt") == {
+        "s": "createdAt", "id": 42, "c": review.createdAt,
+    }
+    assert pagination.decode_cursor("", "id") is None
@@ -0,0 +1,116 @@
+"""
+EXPLAIN QUERY PLAN checks for every filtered query shape the endpoints issue, against a
+database built by the migrations (so the indexes are exactly the ones deployments get).
+"""
+import re
+from datetime import datetime
+
+import pytest
+from sqlalchemy import func
+from sqlmodel import select
+
+from database import engine
+from filters import apply_review_filters
+from models import AdminNote, Review, ReviewAspect
+import aspects
+import pagination
+import reports
+import rollups
+
+# A plan step that reads a whole table instead of seeking an index
+FULL_SCAN_RE = re.compile(r"^SCAN (review|adminnote|review_aspect|review_rollup)\b(?! USING (COVERING )?INDEX)")
+SORT_STEP = "USE TEMP B-TREE FOR ORDER BY"
+
+START = datetime(2025, 6, 1)
+END = datetime(2025, 7, 15)
+
+# Filter combinations of the paged review list (GET /reviews/?cursor=...&sort=createdAt)
+LIST_FILTERS = [
+    {},
+    {"month": "2025-06"},
+    {"start": START, "end": END},
+    {"min_rating": 5},
+    {"min_rating": 5, "month": "2025-06"},
+    {"sentiment": "Negative"},
+    {"sentiment": "Negative", "month": "2025-06"},
+    {"min_rating": 5, "sentiment": "Negative"},
+    {"aspect": "Food"},
+    {"aspect": "Food", "month": "2025-06"},
+    {"aspect": "Food", "min_rating": 2},
+]
+
+
+def page(sort, position=None, **filters):
+    query = pagination.after_cursor(pagination.order_newest_first(select(Review), sort), position)
+    return apply_review_filters(query, paged=True, **filters).limit(21)
+
+
+def dashboard_search(**filters):
+    month_col = func.strftime('%Y-%m', Review.createdAt)
+    query = select(month_col, Review.rating, func.count()).group_by(month_col, Review.rating)
+    return apply_review_filters(query, **filters)
+
+
+def aspects_filtered(**filters):
+    query = aspects.aspect_count_query().join(Review, Review.id == ReviewAspect.review_id)
+    return apply_review_filters(query, **filters)
+
+
+def label(filters):
+    return "+".join(filters) or "unfiltered"
+
+
+# Paged lists must come off an index (or the table's rowid order) in sort order, so a page stops
+# after `limit` rows; sorting would touch every matching review first
+PAGED_SHAPES = [
+    *[(f"GET /reviews/ sort=createdAt {label(f)}", page("createdAt", **f)) for f in LIST_FILTERS],
+    *[(f"GET /reviews/ sort=createdAt cursor {label(f)}", page("createdAt", {"c": END, "id": 10}, **f)) for f in LIST_FILTERS],
+    ("GET /reviews/ sort=id", page("id")),
+    ("GET /reviews/ sort=id cursor", page("id", {"id": 10})),
+    ("GET /reviews/ sort=id search", page("id", search="food")),
+    ("GET /reviews/ sort=id aspect", page("id", aspect="Food")),
+    ("GET /reviews/{id}/notes", select(AdminNote).where(AdminNote.review_id == 1).order_by(AdminNote.created_at.desc())),
+]
+
+# Must seek an index, but may sort or group what it finds: aggregates, full-text matches (the
+# FTS index yields its whole match set before any ordering) and id-sorted filtered lists (no
+# index orders a createdAt or equality filter by id; the dashboard pages by createdAt)
+OTHER_SHAPES = [
+    ("GET /reviews/ sort=createdAt search", page("createdAt", search="food")),
+    *[(f"GET /reviews/ sort=id {label(f)}", page("id", **f)) for f in LIST_FILTERS if f and f != {"aspect": "Food"}],
+    ("GET /analytics/dashboard rollups", rollups.monthly_rating_counts_query(sentiment="Positive", month="2025-06")),
+    ("GET /analytics/dashboard rollups start+end", rollups.monthly_rating_counts_query(aspect="Food", start=START, end=END)),
+    ("GET /analytics/dashboard search+month", dashboard_search(search="food", month="2025-06")),
+    ("GET /analytics/aspects month", aspects_filtered(month="2025-06")),
+    ("GET /analytics/aspects sentiment", aspects_filtered(sentiment="Negative")),
+    ("GET /analytics/report month", reports.report_stats_query("2025-06", reports.UNFILTERED)),
+    ("GET /analytics/report month+rating", reports.report_stats_query("2025-06", {**reports.UNFILTERED, "min_rating": 4})),
+    ("GET /analytics/report month+aspect", reports.report_stats_query("2025-06", {**reports.UNFILTERED, "aspect": "Food"})),
+]
+
+
+def explain(statement):
+    compiled = statement.compile(dialect=engine.dialect)
+    params = [compiled.params[name] for name in compiled.positiontup]
+    params = [str(p) if isinstance(p, datetime) else p for p in params]
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", tuple(params)).all()
+    return [row[3] for row in rows]
+
+
+@pytest.fixture(scope="module", autouse=True)
+def data(seeded):
+    # Plans are checked on a populated database, as deployments have
+    return seeded
+
+
+@pytest.mark.parametrize("name,statement", OTHER_SHAPES, ids=[name for name, _ in OTHER_SHAPES])
+def test_no_full_table_scan(name, statement):
+    plan = explain(statement)
+    assert not [step for step in plan if FULL_SCAN_RE.match(step)], "\n".join(plan)
+
+
+@pytest.mark.parametrize("name,statement", PAGED_SHAPES, ids=[name for name, _ in PAGED_SHAPES])
+def test_paged_lists_read_in_index_order(name, statement):
+    plan = explain(statement)
+    assert SORT_STEP not in plan, "\n".join(plan)
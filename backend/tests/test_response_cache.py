@@ -0,0 +1,82 @@
+from datetime import datetime
+
+import pytest
+from sqlmodel import Session, text
+
+import database
+from data_version import READ_SQL, data_version
+from models import AdminNote, Review
+from response_cache import etag_matches, response_cache
+
+pytestmark = [pytest.mark.anyio, pytest.mark.usefixtures("seeded")]
+
+PARAMS = {"cursor": "", "limit": 5, "include_notes": "true"}
+
+
+async def get_page(client, etag=None):
+    return await client.get("/reviews/", params=PARAMS, headers={"If-None-Match": etag} if etag else {})
+
+
+def persisted_version() -> int:
+    with Session(database.engine) as session:
+        return session.exec(READ_SQL).one()[0]
+
+
+def test_etag_matching():
+    assert etag_matches('"v3-abc"', '"v3-abc"')
+    assert etag_matches('W/"v3-abc", "other"', '"v3-abc"')
+    assert etag_matches("*", '"v3-abc"')
+    assert not etag_matches('"v2-abc"', '"v3-abc"')
+    assert not etag_matches(None, '"v3-abc"')
+
+
+async def test_unchanged_data_is_not_modified(client):
+    first = await get_page(client)
+    assert first.status_code == 200
+    assert first.headers["Cache-Control"] == "no-cache"
+    etag = first.headers["ETag"]
+
+    hits = response_cache.hits["reviews"]
+    assert (await get_page(client)).content == first.content
+    assert response_cache.hits["reviews"] == hits + 1
+
+    not_modified = await get_page(client, etag)
+    assert (not_modified.status_code, not_modified.content, not_modified.headers["ETag"]) == (304, b"", etag)
+
+    other = await client.get("/reviews/", params={**PARAMS, "limit": 6}, headers={"If-None-Match": etag})
+    assert other.status_code == 200 and other.headers["ETag"] != etag
+
+
+async def test_a_write_invalidates_the_etag(client):
+    first = await get_page(client)
+    newest = first.json()["items"][0]
+    with Session(database.engine) as session:
+        session.add(AdminNote(review_id=newest["id"], content="follow up"))
+        session.commit()
+    assert data_version.value == persisted_version()
+
+    changed = await get_page(client, first.headers["ETag"])
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != first.headers["ETag"]
+    assert changed.json()["items"][0]["note_count"] == newest["note_count"] + 1
+
+
+async def test_rolled_back_write_keeps_the_version(client):
+    version = data_version.value
+    with Session(database.engine) as session:
+        session.add(Review(rating=3, content="never committed", createdAt=datetime(2025, 1, 1)))
+        session.flush()
+        session.rollback()
+    assert data_version.value == version == persisted_version()
+
+
+async def test_writes_from_other_processes_are_picked_up_by_refresh(client):
+    etag = (await get_page(client)).headers["ETag"]
+    # A CLI script (bulk_import.py, backfill.py) bumps the persisted version without this process seeing a commit
+    with database.engine.begin() as conn:
+        conn.execute(text("UPDATE data_version SET version = version + 1 WHERE id = 1"))
+    assert (await get_page(client, etag)).status_code == 304
+
+    await data_version.refresh()
+    assert data_version.value == persisted_version()
+    assert (await get_page(client, etag)).status_code == 200
@@ -0,0 +1,33 @@
+import summarizer
+
+
+def items(first, last, words=12):
+    return [(review_id, f"- review {review_id}: " + "word " * words) for review_id in range(first, last)]
+
+
+def keys(chunks):
+    return [summarizer.chunk_key(0, summarizer.chunk_text(chunk)) for chunk in chunks]
+
+
+def test_chunks_fit_the_budget_and_keep_every_item():
+    lines = items(1, 2000, words=40)
+    chunks = summarizer.pack_chunks(lines, 1000)
+    assert [item for chunk in chunks for item in chunk] == lines
+    assert all(summarizer.fits(chunk, 1000) or len(chunk) == 1 for chunk in chunks)
+
+
+def test_overlapping_windows_share_chunks():
+    # A rolling window a day later: drops its first reviews, adds new ones at the end
+    monday = summarizer.pack_chunks(items(1000, 3000), 3000)
+    tuesday = keys(summarizer.pack_chunks(items(1290, 3310), 3000))
+    overlapping = [key for chunk, key in zip(monday, keys(monday)) if chunk[0][0] >= 1290]
+    # All but the first chunk or two of the overlap are reused
+    assert len(set(overlapping) & set(tuesday)) >= len(overlapping) - 2
+
+
+def test_sparse_filtered_windows_share_chunks():
+    # A filtered report: every third review, starting at different offsets into the month
+    lines = items(1, 6000)[::3]
+    full = keys(summarizer.pack_chunks(lines, 3000))
+    later = keys(summarizer.pack_chunks(lines[100:], 3000))
+    assert len(set(full) & set(later)) >= len(later) - 2
@@ -0,0 +1,195 @@
+import { useEffect } from 'react';
+import { QueryClient, QueryKey, useQueryClient } from '@tanstack/react-query';
+import { api } from './api';
+
+// One change to the review counters, as pushed by GET /analytics/stream
+interface MetricChange {
+    month: string;
+    rating: number;
+    sentiment: string;
+    aspects: string[];
+    delta: number;
+}
+
+// Query keys are ['analytics' | 'reviews', minRating, search, month, sentiment, aspect]
+function filtersOf(key: QueryKey) {
+    const [, minRating, search, month, sentiment, aspect] = key as [string, number | '', string, string, string, string];
+    return { minRating, search, month, sentiment, aspect };
+}
+
+function matchesChange(key: QueryKey, change: MetricChange) {
+    const f = filtersOf(key);
+    return (!f.minRating || change.rating === f.minRating)
+        && (!f.month || change.month === f.month)
+        && (!f.sentiment || change.sentiment === f.sentiment)
+        && (!f.aspect || change.aspects.includes(f.aspect));
+}
+
+function matchesReview(key: QueryKey, review: any) {
+    const f = filtersOf(key);
+    let aspects: string[] = [];
+    try {
+        aspects = JSON.parse(review.aspects || '[]');
+    } catch {
+        // unparsable aspects count as none, like the server's rollups
+    }
+    return (!f.minRating || review.rating === f.minRating)
+        && (!f.month || review.createdAt.slice(0, 7) === f.month)
+        && (!f.sentiment || review.sentiment === f.sentiment)
+        && (!f.aspect || aspects.includes(f.aspect));
+}
+
+function applyMetricChanges(metrics: any, changes: MetricChange[]) {
+    const distribution = { ...metrics.rating_distribution };
+    const months = new Map<string, any>(metrics.monthly_trend.map((m: any) => [m.month, { ...m }]));
+    let total = metrics.total_reviews;
+    let totalRating = metrics.total_rating;
+
+    for (const change of changes) {
+        total += change.delta;
+        totalRating += change.rating * change.delta;
+        distribution[change.rating] = (distribution[change.rating] || 0) + change.delta;
+
+        const bucket = months.get(change.month)
+            ?? { month: change.month, count: 0, avg_rating: 0, total_rating: 0, positive: 0, neutral: 0, negative: 0 };
+        bucket.count += change.delta;
+        bucket.total_rating += change.rating * change.delta;
+        bucket.avg_rating = bucket.count > 0 ? Math.round((bucket.total_rating / bucket.count) * 100) / 100 : 0;
+        const tone = change.rating >= 4 ? 'positive' : change.rating === 3 ? 'neutral' : 'negative';
+        bucket[tone] += change.delta;
+        months.set(change.month, bucket);
+    }
+
+    return {
+        ...metrics,
+        total_reviews: total,
+        total_rating: totalRating,
+        average_rating: total > 0 ? Math.round((totalRating / total) * 100) / 100 : 0,
+        rating_distribution: distribution,
+        monthly_trend: [...months.values()]
+            .filter(m => m.count > 0)
+            .sort((a, b) => a.month.localeCompare(b.month)),
+    };
+}
+
+function applyAspectChanges(counts: { aspect: string; count: number }[], changes: MetricChange[]) {
+    const byAspect = new Map(counts.map(c => [c.aspect, c.count]));
+    for (const change of changes) {
+        for (const aspect of change.aspects) {
+            byAspect.set(aspect, (byAspect.get(aspect) || 0) + change.delta);
+        }
+    }
+    return [...byAspect.entries()]
+        .filter(([, count]) => count > 0)
+        .map(([aspect, count]) => ({ aspect, count }))
+        .sort((a, b) => b.count - a.count || a.aspect.localeCompare(b.aspect));
+}
+
+function onMetricsDelta(queryClient: QueryClient, changes: MetricChange[]) {
+    for (const [key, metrics] of queryClient.getQueriesData<any>({ queryKey: ['analytics'] })) {
+        if (!metrics) continue;
+        if (filtersOf(key).search) {
+            // Full-text matches can't be decided client-side
+            queryClient.invalidateQueries({ queryKey: key, exact: true });
+            continue;
+        }
+        const matching = changes.filter(change => matchesChange(key, change));
+        if (matching.length) {
+            queryClient.setQueryData(key, applyMetricChanges(metrics, matching));
+        }
+    }
+    queryClient.setQueryData<{ aspect: string; count: number }[]>(
+        ['aspect-counts'], counts => counts && applyAspectChanges(counts, changes)
+    );
+}
+
+function onReviewCreated(queryClient: QueryClient, review: any) {
+    for (const [key, pages] of queryClient.getQueriesData<any>({ queryKey: ['reviews'] })) {
+        if (!pages) continue;
+        if (filtersOf(key).search) {
+            queryClient.invalidateQueries({ queryKey: key, exact: true });
+        } else if (matchesReview(key, review)) {
+            const [first, ...rest] = pages.pages;
+            queryClient.setQueryData(key, { ...pages, pages: [{ ...first, items: [review, ...first.items] }, ...rest] });
+        }
+    }
+}
+
+function onReviewEnriched(queryClient: QueryClient, review: any) {
+    for (const [key, pages] of queryClient.getQueriesData<any>({ queryKey: ['reviews'] })) {
+        if (!pages) continue;
+        const f = filtersOf(key);
+        if (f.sentiment || f.aspect) {
+            // Enrichment sets sentiment and aspects, which may move the review in or out of this list
+            queryClient.invalidateQueries({ queryKey: key, exact: true });
+            continue;
+        }
+        queryClient.setQueryData(key, {
+            ...pages,
+            pages: pages.pages.map((page: any) => ({
+                ...page,
+                // Merge: the pushed review lacks list-only fields such as note_count
+                items: page.items.map((item: any) => (item.id === review.id ? { ...item, ...review } : item)),
+            })),
+        });
+    }
+}
+
+const RECONNECT_DELAY_MS = 3000;
+
+// Keeps the dashboard's cached queries current from the server's event stream instead of refetching
+export function useLiveDashboard() {
+    const queryClient = useQueryClient();
+
+    useEffect(() => {
+        if (!localStorage.getItem('token')) return;
+
+        let source: EventSource | null = null;
+        let retry: ReturnType<typeof setTimeout> | undefined;
+        let closed = false;
+        let connectedBefore = false;
+        const refetchAll = () => queryClient.invalidateQueries();
+
+        const connect = async () => {
+            let streamToken: string;
+            try {
+                // Short-lived and only good for the stream: the login token never goes in a URL
+                streamToken = (await api.post('/auth/stream-token')).data.token;
+            } catch {
+                if (!closed) retry = setTimeout(connect, RECONNECT_DELAY_MS);
+                return;
+            }
+            if (closed) return;
+
+            const current = new EventSource(`${api.defaults.baseURL}/analytics/stream?token=${encodeURIComponent(streamToken)}`);
+            source = current;
+            const on = (type: string, handler: (data: any) => void) =>
+                current.addEventListener(type, (e) => handler(JSON.parse((e as MessageEvent).data)));
+
+            current.onopen = () => {
+                // Events sent while we were reconnecting are lost; catch up once
+                if (connectedBefore) refetchAll();
+                connectedBefore = true;
+            };
+            current.onerror = () => {
+                // The browser retries with the same URL by itself; once the token has expired it gives up
+                if (current.readyState === EventSource.CLOSED && !closed) {
+                    retry = setTimeout(connect, RECONNECT_DELAY_MS);
+                }
+            };
+            on('metrics.delta', (data) => onMetricsDelta(queryClient, data.changes));
+            on('review.created', (review) => onReviewCreated(queryClient, review));
+            on('review.enriched', (review) => onReviewEnriched(queryClient, review));
+            on('reviews.imported', () => queryClient.invalidateQueries({ queryKey: ['reviews'] }));
+            on('insight.updated', (insight) => queryClient.setQueryData(['weekly-insight'], insight));
+            on('resync', refetchAll);
+        };
+        connect();
+
+        return () => {
+            closed = true;
+            clearTimeout(retry);
+            source?.close();
+        };
+    }, [queryClient]);
+}
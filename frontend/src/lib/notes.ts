@@ -0,0 +1,53 @@
+import type { QueryClient } from '@tanstack/react-query';
+import { api } from './api';
+
+const MAX_IDS = 200; // server limit per GET /reviews/notes
+
+type Waiter = { resolve: (notes: any[]) => void; reject: (error: unknown) => void };
+let pending: Map<number, Waiter[]> | null = null;
+
+async function flush() {
+    const batch = pending!;
+    pending = null;
+    const ids = [...batch.keys()];
+    for (let i = 0; i < ids.length; i += MAX_IDS) {
+        const chunk = ids.slice(i, i + MAX_IDS);
+        try {
+            const res = await api.get(`/reviews/notes?ids=${chunk.join(',')}`);
+            for (const id of chunk) batch.get(id)!.forEach(w => w.resolve(res.data[id] ?? []));
+        } catch (error) {
+            for (const id of chunk) batch.get(id)!.forEach(w => w.reject(error));
+        }
+    }
+}
+
+// Notes of one review; requests made in the same tick share one GET /reviews/notes?ids=... call
+export function loadNotes(reviewId: number): Promise<any[]> {
+    return new Promise((resolve, reject) => {
+        if (!pending) {
+            pending = new Map();
+            setTimeout(flush, 0);
+        }
+        pending.set(reviewId, [...(pending.get(reviewId) ?? []), { resolve, reject }]);
+    });
+}
+
+// Puts a newly added note into the cached notes list and the note counts of cached review lists
+export function recordNoteAdded(queryClient: QueryClient, note: any) {
+    queryClient.setQueryData<any[]>(['notes', note.review_id], notes => notes && [note, ...notes]);
+    for (const [key, pages] of queryClient.getQueriesData<any>({ queryKey: ['reviews'] })) {
+        if (!pages) continue;
+        queryClient.setQueryData(key, {
+            ...pages,
+            pages: pages.pages.map((page: any) => ({
+                ...page,
+                items: page.items.map((item: any) => (item.id === note.review_id ? {
+                    ...item,
+                    note_count: (item.note_count ?? 0) + 1,
+                    latest_note: note.content,
+                    latest_note_at: note.created_at,
+                } : item)),
+            })),
+        });
+    }
+}
@@ -1,7 +1,9 @@
 import { useState } from 'react';
-import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query';
+import { useQuery, useInfiniteQuery, useMutation, useQueryClient } from '@tanstack/react-query';
 import { AreaChart, Area, XAxis, YAxis, Tooltip, ResponsiveContainer, BarChart, Bar, Cell } from 'recharts';
 import { api } from '../lib/api';
+import { useLiveDashboard } from '../lib/liveUpdates';
+import { loadNotes, recordNoteAdded } from '../lib/notes';
 import { Loader2, Search, Filter, Calendar, FileText, Download, MessageSquare, Plus, LogOut } from 'lucide-react';
 
 const COLORS = ['#ef4444', '#f97316', '#eab308', '#84cc16', '#22c55e'];
@@ -14,6 +16,9 @@ export default function AdminDashboard() {
     const [aspect, setAspect] = useState('');
     const [downloading, setDownloading] = useState(false);
 
+    // New reviews, enrichment results and metric deltas are pushed into the cached queries below
+    useLiveDashboard();
+
     const handleLogout = () => {
         localStorage.removeItem('token');
         window.location.href = '/login';
@@ -41,10 +46,19 @@ export default function AdminDashboard() {
         }
     });
 
-    const { data: reviews } = useQuery({
+    // Keyset pages: each "Load more" seeks past the last review seen instead of using an offset
+    const {
+        data: reviewPages,
+        fetchNextPage,
+        hasNextPage,
+        isFetchingNextPage
+    } = useInfiniteQuery({
         queryKey: ['reviews', minRating, search, month, sentiment, aspect],
-        queryFn: async () => {
+        queryFn: async ({ pageParam }) => {
             const params = new URLSearchParams();
+            params.append('cursor', pageParam);
+            params.append('sort', 'createdAt'); // filtered pages come straight off the (filter, createdAt) indexes
+            params.append('include_notes', 'true');
             if (minRating) params.append('min_rating', minRating.toString());
             if (search) params.append('search', search);
             if (month) params.append('month', month);
@@ -52,15 +66,28 @@ export default function AdminDashboard() {
             if (aspect) params.append('aspect', aspect);
 
             const res = await api.get(`/reviews/?${params.toString()}`);
-            return res.data;
-        }
+            return res.data as { items: any[]; next_cursor: string | null };
+        },
+        initialPageParam: '',
+        getNextPageParam: (lastPage) => lastPage.next_cursor ?? undefined
     });
+    const reviews = reviewPages?.pages.flatMap(page => page.items);
 
     const { data: weeklyInsight } = useQuery({
         queryKey: ['weekly-insight'],
         queryFn: async () => {
             const res = await api.get('/analytics/weekly-insight');
             return res.data;
+        },
+        // The server answers from a stored snapshot; poll until its background refresh finishes
+        refetchInterval: (query) => (query.state.data?.refreshing ? 5000 : false)
+    });
+
+    const { data: aspectCounts } = useQuery({
+        queryKey: ['aspect-counts'],
+        queryFn: async () => {
+            const res = await api.get('/analytics/aspects');
+            return res.data as { aspect: string; count: number }[];
         }
     });
 
@@ -298,11 +325,9 @@ export default function AdminDashboard() {
                                 className="glass-input w-full pl-10 appearance-none bg-slate-50 border-slate-200 cursor-pointer"
                             >
                                 <option value="">Aspect</option>
-                                <option value="Service">Service</option>
-                                <option value="Food">Food</option>
-                                <option value="Ambience">Ambience</option>
-                                <option value="Time">Waiting Time</option>
-                                <option value="Price">Price</option>
+                                {aspectCounts?.map(a => (
+                                    <option key={a.aspect} value={a.aspect}>{a.aspect} ({a.count})</option>
+                                ))}
                             </select>
                         </div>
                     </div>
@@ -313,6 +338,19 @@ export default function AdminDashboard() {
                         <ReviewItem key={review.id} review={review} />
                     ))}
                 </div>
+
+                {hasNextPage && (
+                    <div className="flex justify-center mt-6">
+                        <button
+                            onClick={() => fetchNextPage()}
+                            disabled={isFetchingNextPage}
+                            className="glass-button bg-slate-100 hover:bg-slate-200 text-slate-600 flex items-center gap-2 disabled:opacity-50"
+                        >
+                            {isFetchingNextPage && <Loader2 className="animate-spin" size={16} />}
+                            Load more
+                        </button>
+                    </div>
+                )}
             </div>
         </div>
     );
@@ -325,20 +363,18 @@ function ReviewItem({ review }: { review: any }) {
 
     const { data: notes } = useQuery({
         queryKey: ['notes', review.id],
-        queryFn: async () => {
-            if (!showNotes) return [];
-            const res = await api.get(`/reviews/${review.id}/notes`);
-            return res.data;
-        },
+        // The list already says which reviews have no notes; the rest are fetched together
+        queryFn: () => (review.note_count === 0 ? Promise.resolve([]) : loadNotes(review.id)),
         enabled: showNotes
     });
 
     const addNoteMutation = useMutation({
         mutationFn: async (content: string) => {
-            return api.post(`/reviews/${review.id}/notes?note_content=${encodeURIComponent(content)}`);
+            const res = await api.post(`/reviews/${review.id}/notes`, { content });
+            return res.data;
         },
-        onSuccess: () => {
-            queryClient.invalidateQueries({ queryKey: ['notes', review.id] });
+        onSuccess: (note) => {
+            recordNoteAdded(queryClient, note);
             setNewNote('');
         }
     });
@@ -358,8 +394,13 @@ function ReviewItem({ review }: { review: any }) {
             <div className="flex-1 space-y-2">
                 <div className="flex justify-between">
                     <p className="text-slate-700">{review.content}</p>
-                    <button onClick={() => setShowNotes(!showNotes)} className="text-slate-400 hover:text-blue-600 transition">
+                    <button
+                        onClick={() => setShowNotes(!showNotes)}
+                        title={review.latest_note ?? undefined}
+                        className="text-slate-400 hover:text-blue-600 transition flex items-start gap-0.5"
+                    >
                         <MessageSquare size={18} />
+                        {review.note_count > 0 && <span className="text-xs font-semibold">{review.note_count}</span>}
                     </button>
                 </div>
 
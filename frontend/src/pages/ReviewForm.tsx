@@ -22,6 +22,7 @@ export default function ReviewForm() {
         try {
             const res = await api.post('/reviews/', data);
             setResponse(res.data);
+            waitForReply(res.data);
         } catch (e) {
             console.error(e);
             alert('Failed to submit review');
@@ -30,6 +31,20 @@ export default function ReviewForm() {
         }
     };
 
+    // The AI reply is generated in the background; long-poll until it is ready
+    const waitForReply = async (review: any) => {
+        for (let attempt = 0; attempt < 6 && !['done', 'failed'].includes(review.enrichment_status); attempt++) {
+            try {
+                const res = await api.get(`/reviews/${review.id}/enrichment?wait=10`);
+                review = res.data.review;
+            } catch (e) {
+                console.error(e);
+                return;
+            }
+        }
+        setResponse((current: any) => (current?.id === review.id ? review : current));
+    };
+
     return (
         <div className="max-w-2xl mx-auto">
             <AnimatePresence mode="wait">
@@ -105,7 +120,7 @@ export default function ReviewForm() {
                             <CheckCircle size={64} className="text-emerald-400" />
                         </div>
                         <h2 className="text-2xl font-bold mb-2">Thank You!</h2>
-                        <p className="text-slate-300 mb-6">{response.response}</p>
+                        <p className="text-slate-300 mb-6">{response.response || 'We are preparing a personal reply to your review...'}</p>
 
                         <div className="bg-white/5 p-4 rounded-lg text-left text-sm text-slate-500 italic">
                             Your review helps us improve.